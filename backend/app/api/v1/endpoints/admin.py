@@ -1,34 +1,37 @@
 from fastapi import APIRouter, Depends, Query, HTTPException
 from fastapi.security import HTTPAuthorizationCredentials
+from typing import Optional
 from app.schemas.common import create_response, create_paginated_response
-from app.core.supabase import supabase_admin_client
-from app.middleware.auth import security, get_current_user, require_role
+from app.core.supabase import supabase_admin_client, run_query, get_db_pool_metrics
+from app.core.pagination import paginate, next_cursor
+from app.core.counts import CountMode, count_method, resolve_total, count_cache
+from app.core.cache import catalog_cache
+from app.core.security import password_hasher, token_cache
+from app.core.images import image_processor
+from app.core.scheduler import subscription_scheduler
+from app.core.pubsub import notification_broker
+from app.core.outbox import outbox_dispatcher
+from app.middleware.auth import security, get_current_user_claims, require_role
 
 router = APIRouter()
 
+# Counters maintained in the platform_stats table, summed over shards by the platform_stats_totals view
+PLATFORM_METRICS = ("users", "farmers", "consumers", "products", "orders")
+
 @router.get("/stats")
 async def get_platform_stats(
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     """Get platform statistics (Admin only)."""
     try:
-        user = await get_current_user(credentials)
+        user = await get_current_user_claims(credentials)
         await require_role(user, ["admin"])
         
-        # Get counts
-        total_users = supabase_admin_client.table("users").select("id", count="exact").execute()
-        total_farmers = supabase_admin_client.table("users").select("id", count="exact").eq("role", "farmer").execute()
-        total_consumers = supabase_admin_client.table("users").select("id", count="exact").eq("role", "consumer").execute()
-        total_products = supabase_admin_client.table("products").select("id", count="exact").execute()
-        total_orders = supabase_admin_client.table("orders").select("id", count="exact").execute()
-        
-        stats = {
-            "total_users": total_users.count or 0,
-            "total_farmers": total_farmers.count or 0,
-            "total_consumers": total_consumers.count or 0,
-            "total_products": total_products.count or 0,
-            "total_orders": total_orders.count or 0
-        }
+        # Counters are kept current by triggers, so one small read covers every metric
+        result = await run_query(supabase_admin_client.table("platform_stats_totals").select("metric, value"))
+        counters = {row["metric"]: row["value"] for row in result.data}
+        
+        stats = {f"total_{metric}": counters.get(metric, 0) for metric in PLATFORM_METRICS}
         
         return create_response(
             success=True,
@@ -48,32 +51,77 @@ async def get_platform_stats(
             errors={"server": str(e)}
         )
 
+@router.get("/stats/history")
+async def get_platform_stats_history(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    days: int = Query(30, ge=1, le=365)
+):
+    """Get daily platform totals and changes for charting growth (Admin only)."""
+    try:
+        user = await get_current_user_claims(credentials)
+        await require_role(user, ["admin"])
+        
+        result = await run_query(supabase_admin_client.rpc("platform_stats_history", {"p_days": days}))
+        
+        history = [
+            {
+                "day": point["day"],
+                "totals": {metric: point["totals"].get(metric, 0) for metric in PLATFORM_METRICS},
+                "changes": {metric: point["changes"].get(metric, 0) for metric in PLATFORM_METRICS}
+            }
+            for point in result.data or []
+        ]
+        
+        return create_response(
+            success=True,
+            message="Statistics history retrieved successfully",
+            data=history
+        )
+    except HTTPException as e:
+        return create_response(
+            success=False,
+            message=e.detail,
+            errors={"auth": e.detail}
+        )
+    except Exception as e:
+        return create_response(
+            success=False,
+            message="Failed to retrieve statistics history",
+            errors={"server": str(e)}
+        )
+
 @router.get("/farmers")
 async def get_all_farmers(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     page: int = Query(1, ge=1),
-    perPage: int = Query(20, ge=1, le=100)
+    perPage: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    count: CountMode = Query("exact")
 ):
     """Get all farmers (Admin only)."""
     try:
-        user = await get_current_user(credentials)
+        user = await get_current_user_claims(credentials)
         await require_role(user, ["admin"])
         
-        offset = (page - 1) * perPage
-        result = supabase_admin_client.table("users").select("*", count="exact").eq("role", "farmer").range(offset, offset + perPage - 1).execute()
+        query = supabase_admin_client.table("users").select("*", count=count_method(count)).eq("role", "farmer")
+        result = await run_query(paginate(query, "created_at", True, page, perPage, cursor))
         
         # Remove password hashes
         for farmer in result.data:
             farmer.pop("password_hash", None)
         
-        total = result.count if result.count else 0
+        total = await resolve_total(
+            result, count, "users", "farmer",
+            lambda: supabase_admin_client.table("users").select("id", count="exact").eq("role", "farmer").limit(1)
+        )
         
         return create_paginated_response(
             items=result.data,
             page=page,
             per_page=perPage,
             total=total,
-            message="Farmers retrieved successfully"
+            message="Farmers retrieved successfully",
+            next_cursor=next_cursor(result.data, "created_at", perPage)
         )
     except HTTPException as e:
         return create_response(
@@ -92,28 +140,34 @@ async def get_all_farmers(
 async def get_all_consumers(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     page: int = Query(1, ge=1),
-    perPage: int = Query(20, ge=1, le=100)
+    perPage: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    count: CountMode = Query("exact")
 ):
     """Get all consumers (Admin only)."""
     try:
-        user = await get_current_user(credentials)
+        user = await get_current_user_claims(credentials)
         await require_role(user, ["admin"])
         
-        offset = (page - 1) * perPage
-        result = supabase_admin_client.table("users").select("*", count="exact").eq("role", "consumer").range(offset, offset + perPage - 1).execute()
+        query = supabase_admin_client.table("users").select("*", count=count_method(count)).eq("role", "consumer")
+        result = await run_query(paginate(query, "created_at", True, page, perPage, cursor))
         
         # Remove password hashes
         for consumer in result.data:
             consumer.pop("password_hash", None)
         
-        total = result.count if result.count else 0
+        total = await resolve_total(
+            result, count, "users", "consumer",
+            lambda: supabase_admin_client.table("users").select("id", count="exact").eq("role", "consumer").limit(1)
+        )
         
         return create_paginated_response(
             items=result.data,
             page=page,
             per_page=perPage,
             total=total,
-            message="Consumers retrieved successfully"
+            message="Consumers retrieved successfully",
+            next_cursor=next_cursor(result.data, "created_at", perPage)
         )
     except HTTPException as e:
         return create_response(
@@ -132,24 +186,30 @@ async def get_all_consumers(
 async def get_all_orders(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     page: int = Query(1, ge=1),
-    perPage: int = Query(20, ge=1, le=100)
+    perPage: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    count: CountMode = Query("exact")
 ):
     """Get all orders (Admin only)."""
     try:
-        user = await get_current_user(credentials)
+        user = await get_current_user_claims(credentials)
         await require_role(user, ["admin"])
         
-        offset = (page - 1) * perPage
-        result = supabase_admin_client.table("orders").select("*", count="exact").order("created_at", desc=True).range(offset, offset + perPage - 1).execute()
+        query = supabase_admin_client.table("orders").select("*", count=count_method(count))
+        result = await run_query(paginate(query, "created_at", True, page, perPage, cursor))
         
-        total = result.count if result.count else 0
+        total = await resolve_total(
+            result, count, "orders", ("admin", None),
+            lambda: supabase_admin_client.table("orders").select("id", count="exact").limit(1)
+        )
         
         return create_paginated_response(
             items=result.data,
             page=page,
             per_page=perPage,
             total=total,
-            message="Orders retrieved successfully"
+            message="Orders retrieved successfully",
+            next_cursor=next_cursor(result.data, "created_at", perPage)
         )
     except HTTPException as e:
         return create_response(
@@ -163,3 +223,71 @@ async def get_all_orders(
             message="Failed to retrieve orders",
             errors={"server": str(e)}
         )
+
+@router.post("/subscriptions/fulfill")
+async def fulfill_subscriptions(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Place orders for every subscription due now (Admin only)."""
+    try:
+        user = await get_current_user_claims(credentials)
+        await require_role(user, ["admin"])
+        
+        totals = await subscription_scheduler.run_once()
+        
+        return create_response(
+            success=True,
+            message="Due subscriptions fulfilled",
+            data=totals
+        )
+    except HTTPException as e:
+        return create_response(
+            success=False,
+            message=e.detail,
+            errors={"auth": e.detail}
+        )
+    except Exception as e:
+        return create_response(
+            success=False,
+            message="Failed to fulfill subscriptions",
+            errors={"server": str(e)}
+        )
+
+@router.get("/metrics")
+async def get_runtime_metrics(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Get runtime metrics for this worker (Admin only)."""
+    try:
+        user = await get_current_user_claims(credentials)
+        await require_role(user, ["admin"])
+        
+        metrics = {
+            "db_pool": get_db_pool_metrics(),
+            "count_cache": count_cache.stats(),
+            "catalog_cache": catalog_cache.stats(),
+            "password_hasher": password_hasher.stats(),
+            "token_cache": token_cache.stats(),
+            "image_processor": image_processor.stats(),
+            "subscription_scheduler": subscription_scheduler.stats(),
+            "notification_broker": notification_broker.stats(),
+            "outbox_dispatcher": outbox_dispatcher.stats()
+        }
+        
+        return create_response(
+            success=True,
+            message="Metrics retrieved successfully",
+            data=metrics
+        )
+    except HTTPException as e:
+        return create_response(
+            success=False,
+            message=e.detail,
+            errors={"auth": e.detail}
+        )
+    except Exception as e:
+        return create_response(
+            success=False,
+            message="Failed to retrieve metrics",
+            errors={"server": str(e)}
+        )
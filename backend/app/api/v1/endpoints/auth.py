@@ -8,11 +8,12 @@ from app.schemas.user import (
 )
 from app.schemas.common import create_response
 from app.core.security import (
-    verify_password, get_password_hash,
+    verify_password_async, get_password_hash_async, PasswordHasherBusy,
     create_access_token, create_refresh_token,
     decode_token, verify_google_token
 )
-from app.core.supabase import supabase_admin_client
+from app.core.supabase import supabase_admin_client, run_query
+from app.core.counts import count_cache
 from app.middleware.auth import security, get_current_user
 from datetime import datetime
 import uuid
@@ -24,7 +25,7 @@ async def login(credentials: LoginRequest):
     """Login with email and password."""
     try:
         # Get user from database
-        result = supabase_admin_client.table("users").select("*").eq("email", credentials.email).execute()
+        result = await run_query(supabase_admin_client.table("users").select("*").eq("email", credentials.email))
         
         if not result.data:
             return create_response(
@@ -36,7 +37,7 @@ async def login(credentials: LoginRequest):
         user = result.data[0]
         
         # Verify password
-        if not verify_password(credentials.password, user["password_hash"]):
+        if not await verify_password_async(credentials.password, user["password_hash"]):
             return create_response(
                 success=False,
                 message="Invalid email or password",
@@ -59,6 +60,12 @@ async def login(credentials: LoginRequest):
                 "refreshToken": refresh_token
             }
         )
+    except PasswordHasherBusy:
+        return create_response(
+            success=False,
+            message="Server is busy, please try again",
+            errors={"server": "Too many concurrent sign-ins"}
+        )
     except Exception as e:
         return create_response(
             success=False,
@@ -71,7 +78,7 @@ async def register(user_data: UserCreate):
     """Register a new user."""
     try:
         # Check if user already exists
-        existing = supabase_admin_client.table("users").select("id").eq("email", user_data.email).execute()
+        existing = await run_query(supabase_admin_client.table("users").select("id").eq("email", user_data.email))
         
         if existing.data:
             return create_response(
@@ -81,7 +88,7 @@ async def register(user_data: UserCreate):
             )
         
         # Hash password
-        password_hash = get_password_hash(user_data.password)
+        password_hash = await get_password_hash_async(user_data.password)
         
         # Prepare user data
         new_user = {
@@ -99,7 +106,8 @@ async def register(user_data: UserCreate):
         }
         
         # Insert user
-        result = supabase_admin_client.table("users").insert(new_user).execute()
+        result = await run_query(supabase_admin_client.table("users").insert(new_user))
+        count_cache.invalidate("users")
         
         if not result.data:
             return create_response(
@@ -126,6 +134,12 @@ async def register(user_data: UserCreate):
                 "refreshToken": refresh_token
             }
         )
+    except PasswordHasherBusy:
+        return create_response(
+            success=False,
+            message="Server is busy, please try again",
+            errors={"server": "Too many concurrent sign-ins"}
+        )
     except Exception as e:
         return create_response(
             success=False,
@@ -138,7 +152,7 @@ async def google_auth(auth_data: GoogleAuthRequest):
     """Authenticate with Google OAuth."""
     try:
         # Verify Google token
-        google_user = verify_google_token(auth_data.token)
+        google_user = await verify_google_token(auth_data.token)
         
         if not google_user:
             return create_response(
@@ -148,7 +162,7 @@ async def google_auth(auth_data: GoogleAuthRequest):
             )
         
         # Check if user exists
-        result = supabase_admin_client.table("users").select("*").eq("email", google_user["email"]).execute()
+        result = await run_query(supabase_admin_client.table("users").select("*").eq("email", google_user["email"]))
         
         if result.data:
             # Existing user
@@ -166,7 +180,8 @@ async def google_auth(auth_data: GoogleAuthRequest):
                 "updated_at": datetime.utcnow().isoformat()
             }
             
-            result = supabase_admin_client.table("users").insert(new_user).execute()
+            result = await run_query(supabase_admin_client.table("users").insert(new_user))
+            count_cache.invalidate("users")
             
             if not result.data:
                 return create_response(
@@ -206,7 +221,8 @@ async def get_current_user_info(
 ):
     """Get current authenticated user."""
     try:
-        user = await get_current_user(credentials)
+        # Never answer a profile read from another worker's stale copy
+        user = await get_current_user(credentials, fresh=True)
         user.pop("password_hash", None)
         
         return create_response(
@@ -237,7 +253,7 @@ async def refresh_token(token_data: RefreshTokenRequest):
         user_id = payload.get("sub")
         
         # Get user to include role in new token
-        result = supabase_admin_client.table("users").select("id, role").eq("id", user_id).execute()
+        result = await run_query(supabase_admin_client.table("users").select("id, role").eq("id", user_id))
         
         if not result.data:
             return create_response(
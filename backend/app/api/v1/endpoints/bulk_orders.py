@@ -1,9 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.security import HTTPAuthorizationCredentials
+from typing import Optional
 from app.schemas.order import BulkOrderCreate, BulkOrderResponseCreate
 from app.schemas.common import create_response, create_paginated_response
-from app.core.supabase import supabase_admin_client
-from app.middleware.auth import security, get_current_user
+from app.core.supabase import supabase_admin_client, run_query
+from app.core.pagination import paginate, next_cursor
+from app.core.counts import CountMode, count_method, resolve_total, count_cache
+from app.core.outbox import outbox_dispatcher
+from app.middleware.auth import security, get_current_user, get_current_user_claims
 from datetime import datetime
 import uuid
 
@@ -18,41 +22,32 @@ async def create_bulk_order(
     try:
         user = await get_current_user(credentials)
         
-        # Create bulk order
-        order_id = str(uuid.uuid4())
-        new_order = {
-            "id": order_id,
-            "consumer_id": user["id"],
-            "business_name": bulk_order.business_name,
-            "business_type": bulk_order.business_type,
-            "business_location": bulk_order.business_location,
-            "budget_min": float(bulk_order.budget_min),
-            "budget_max": float(bulk_order.budget_max),
-            "status": "Pending",
-            "created_at": datetime.utcnow().isoformat(),
-            "updated_at": datetime.utcnow().isoformat()
-        }
-        
-        result = supabase_admin_client.table("bulk_orders").insert(new_order).execute()
-        
-        # Add items
-        for item in bulk_order.items:
-            bulk_item = {
-                "id": str(uuid.uuid4()),
-                "bulk_order_id": order_id,
-                "product_name": item.product_name,
-                "quantity": float(item.quantity),
-                "unit": item.unit,
-                "frequency": item.frequency
-            }
-            supabase_admin_client.table("bulk_order_items").insert(bulk_item).execute()
-        
-        # TODO: Notify farmers
+        # Create the bulk order and all of its items in one transactional round trip
+        result = await run_query(supabase_admin_client.rpc("create_bulk_order", {
+            "p_user_id": user["id"],
+            "p_business_name": bulk_order.business_name,
+            "p_business_type": bulk_order.business_type,
+            "p_business_location": bulk_order.business_location,
+            "p_budget_min": float(bulk_order.budget_min),
+            "p_budget_max": float(bulk_order.budget_max),
+            "p_items": [
+                {
+                    "product_name": item.product_name,
+                    "quantity": float(item.quantity),
+                    "unit": item.unit,
+                    "frequency": item.frequency
+                }
+                for item in bulk_order.items
+            ]
+        }))
+        count_cache.invalidate("bulk_orders")
+        
+        outbox_dispatcher.wake()
         
         return create_response(
             success=True,
             message="Bulk order request created",
-            data=result.data[0] if result.data else None
+            data=result.data
         )
     except Exception as e:
         return create_response(
@@ -65,28 +60,35 @@ async def create_bulk_order(
 async def get_bulk_orders(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     page: int = Query(1, ge=1),
-    perPage: int = Query(20, ge=1, le=100)
+    perPage: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    count: CountMode = Query("exact")
 ):
     """Get bulk orders (consumers see theirs, farmers see all pending)."""
     try:
         user = await get_current_user(credentials)
         
-        if user["role"] == "consumer":
-            query = supabase_admin_client.table("bulk_orders").select("*", count="exact").eq("consumer_id", user["id"])
-        else:  # farmer
-            query = supabase_admin_client.table("bulk_orders").select("*", count="exact").eq("status", "Pending")
+        def scoped(query):
+            if user["role"] == "consumer":
+                return query.eq("consumer_id", user["id"])
+            return query.eq("status", "Pending")  # farmer
         
-        offset = (page - 1) * perPage
-        result = query.order("created_at", desc=True).range(offset, offset + perPage - 1).execute()
+        query = scoped(supabase_admin_client.table("bulk_orders").select("*", count=count_method(count)))
+        result = await run_query(paginate(query, "created_at", True, page, perPage, cursor))
         
-        total = result.count if result.count else 0
+        scope = user["id"] if user["role"] == "consumer" else "Pending"
+        total = await resolve_total(
+            result, count, "bulk_orders", scope,
+            lambda: scoped(supabase_admin_client.table("bulk_orders").select("id", count="exact").limit(1))
+        )
         
         return create_paginated_response(
             items=result.data,
             page=page,
             per_page=perPage,
             total=total,
-            message="Bulk orders retrieved successfully"
+            message="Bulk orders retrieved successfully",
+            next_cursor=next_cursor(result.data, "created_at", perPage)
         )
     except Exception as e:
         return create_response(
@@ -104,7 +106,7 @@ async def get_bulk_order(
     try:
         user = await get_current_user(credentials)
         
-        order_result = supabase_admin_client.table("bulk_orders").select("*").eq("id", bulk_order_id).execute()
+        order_result = await run_query(supabase_admin_client.table("bulk_orders").select("*").eq("id", bulk_order_id))
         
         if not order_result.data:
             return create_response(
@@ -116,10 +118,10 @@ async def get_bulk_order(
         order = order_result.data[0]
         
         # Get items
-        items = supabase_admin_client.table("bulk_order_items").select("*").eq("bulk_order_id", bulk_order_id).execute()
+        items = await run_query(supabase_admin_client.table("bulk_order_items").select("*").eq("bulk_order_id", bulk_order_id))
         
         # Get responses
-        responses = supabase_admin_client.table("bulk_order_responses").select("*, users(full_name, farm_name)").eq("bulk_order_id", bulk_order_id).execute()
+        responses = await run_query(supabase_admin_client.table("bulk_order_responses").select("*, users(full_name, farm_name)").eq("bulk_order_id", bulk_order_id))
         
         order["items"] = items.data
         order["responses"] = responses.data
@@ -144,7 +146,7 @@ async def respond_to_bulk_order(
 ):
     """Farmer responds to bulk order."""
     try:
-        user = await get_current_user(credentials)
+        user = await get_current_user_claims(credentials)
         
         if user["role"] != "farmer":
             return create_response(
@@ -163,12 +165,13 @@ async def respond_to_bulk_order(
             "created_at": datetime.utcnow().isoformat()
         }
         
-        result = supabase_admin_client.table("bulk_order_responses").insert(new_response).execute()
+        result = await run_query(supabase_admin_client.table("bulk_order_responses").insert(new_response))
         
         # Update bulk order status
-        supabase_admin_client.table("bulk_orders").update({"status": "Responded"}).eq("id", bulk_order_id).execute()
+        await run_query(supabase_admin_client.table("bulk_orders").update({"status": "Responded"}).eq("id", bulk_order_id))
+        count_cache.invalidate("bulk_orders")
         
-        # TODO: Notify consumer
+        outbox_dispatcher.wake()
         
         return create_response(
             success=True,
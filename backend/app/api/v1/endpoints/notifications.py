@@ -1,12 +1,54 @@
 from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPAuthorizationCredentials
 from app.schemas.common import create_response
-from app.core.supabase import supabase_admin_client
-from app.middleware.auth import security, get_current_user
+from app.core.config import settings
+from app.core.supabase import supabase_admin_client, run_query
+from app.core.pubsub import notification_broker
+from app.middleware.auth import security, get_current_user, get_current_user_claims, get_token_payload
 from datetime import datetime
+from typing import Optional
+import asyncio
+import json
+import time
 
 router = APIRouter()
 
+# Delay EventSource-style clients wait before reconnecting a dropped stream
+STREAM_RETRY_MS = 5000
+
+async def notification_events(user_id: str, expires_at: Optional[float]):
+    """Server-Sent Events for one user, with keep-alive comments while idle.
+
+    Subscribes only once the response starts, so a client that leaves
+    before then never leaves a subscription behind. The stream ends when
+    the access token expires (expires_at, epoch seconds) and the client
+    reconnects with a fresh one.
+    """
+    subscription = None
+    try:
+        subscription = await notification_broker.subscribe(user_id)
+        yield f"retry: {STREAM_RETRY_MS}\n\n"
+        while True:
+            timeout = settings.NOTIFICATION_STREAM_HEARTBEAT_SECONDS
+            if expires_at is not None:
+                remaining = expires_at - time.time()
+                if remaining <= 0:
+                    break
+                timeout = min(timeout, remaining)
+            try:
+                notification = await subscription.get(timeout)
+            except asyncio.TimeoutError:
+                if expires_at is None or time.time() < expires_at:
+                    yield ": keepalive\n\n"
+                continue
+            if notification is None:
+                break  # Fell behind or lost the broker; the client reconnects and refetches
+            yield f"event: notification\nid: {notification.get('id', '')}\ndata: {json.dumps(notification, default=str)}\n\n"
+    finally:
+        if subscription is not None:
+            notification_broker.unsubscribe(subscription)
+
 @router.get("")
 async def get_notifications(
     credentials: HTTPAuthorizationCredentials = Depends(security),
@@ -22,7 +64,7 @@ async def get_notifications(
         if unread:
             query = query.eq("is_read", False)
         
-        result = query.order("created_at", desc=True).limit(limit).execute()
+        result = await run_query(query.order("created_at", desc=True).limit(limit))
         
         return create_response(
             success=True,
@@ -36,6 +78,38 @@ async def get_notifications(
             errors={"server": str(e)}
         )
 
+@router.get("/stream")
+async def stream_notifications(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Push the user's new notifications as Server-Sent Events.
+    
+    Only notifications created after connecting are sent; clients load
+    earlier ones with GET /notifications when the stream (re)connects.
+    The stream closes when the access token expires.
+    """
+    try:
+        user = await get_current_user_claims(credentials)
+        expires_at = get_token_payload(credentials).get("exp")
+        
+        return StreamingResponse(
+            notification_events(user["id"], expires_at),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    except HTTPException as e:
+        return create_response(
+            success=False,
+            message=e.detail,
+            errors={"auth": e.detail}
+        )
+    except Exception as e:
+        return create_response(
+            success=False,
+            message="Failed to open notification stream",
+            errors={"server": str(e)}
+        )
+
 @router.patch("/{notification_id}/read")
 async def mark_notification_read(
     notification_id: str,
@@ -45,7 +119,7 @@ async def mark_notification_read(
     try:
         user = await get_current_user(credentials)
         
-        result = supabase_admin_client.table("notifications").update({"is_read": True}).eq("id", notification_id).eq("user_id", user["id"]).execute()
+        result = await run_query(supabase_admin_client.table("notifications").update({"is_read": True}).eq("id", notification_id).eq("user_id", user["id"]))
         
         return create_response(
             success=True,
@@ -68,7 +142,7 @@ async def delete_notification(
     try:
         user = await get_current_user(credentials)
         
-        supabase_admin_client.table("notifications").delete().eq("id", notification_id).eq("user_id", user["id"]).execute()
+        await run_query(supabase_admin_client.table("notifications").delete().eq("id", notification_id).eq("user_id", user["id"]))
         
         return create_response(
             success=True,
@@ -1,20 +1,30 @@
 from fastapi import APIRouter, Depends, Query, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials
+from postgrest.exceptions import APIError
 from typing import Optional, List
 from app.schemas.order import CreateOrderRequest, UpdateOrderStatusRequest, OrderResponse, OrderItemResponse
 from app.schemas.common import create_response, create_paginated_response
-from app.core.supabase import supabase_admin_client
-from app.middleware.auth import security, get_current_user
+from app.core.config import settings
+from app.core.supabase import supabase_admin_client, run_query
+from app.core.pagination import paginate, next_cursor
+from app.core.counts import CountMode, count_method, resolve_total, count_cache
+from app.core.cache import invalidate_products
+from app.core.outbox import outbox_dispatcher
+from app.middleware.auth import security, get_current_user, get_current_user_claims
 from decimal import Decimal
-from datetime import datetime
-import uuid
-import random
 
 router = APIRouter()
 
-def generate_order_number() -> str:
-    """Generate unique order number."""
-    return f"AC-{random.randint(1000, 9999)}"
+def user_orders_query(user: dict, columns: str = "*", count: Optional[str] = None):
+    """Orders visible to a user: their own, those with their products, or all for admins."""
+    if user["role"] == "consumer":
+        return supabase_admin_client.table("orders").select(columns, count=count).eq("consumer_id", user["id"])
+    if user["role"] == "farmer":
+        # Orders containing the farmer's products
+        return supabase_admin_client.table("orders").select(
+            f"{columns}, order_items!inner(farmer_id)", count=count
+        ).eq("order_items.farmer_id", user["id"])
+    return supabase_admin_client.table("orders").select(columns, count=count)
 
 @router.post("")
 async def create_order(
@@ -25,126 +35,35 @@ async def create_order(
     try:
         user = await get_current_user(credentials)
         
-        # Get user's cart
-        cart_result = supabase_admin_client.table("carts").select("id").eq("user_id", user["id"]).execute()
-        
-        if not cart_result.data:
-            return create_response(
-                success=False,
-                message="Cart is empty",
-                errors={"cart": "No items in cart"}
-            )
-        
-        cart_id = cart_result.data[0]["id"]
-        
-        # Get cart items
-        items_result = supabase_admin_client.table("cart_items").select(
-            "*, products(id, name, price, farmer_id, stock_quantity)"
-        ).eq("cart_id", cart_id).execute()
-        
-        if not items_result.data:
-            return create_response(
-                success=False,
-                message="Cart is empty",
-                errors={"cart": "No items in cart"}
-            )
-        
-        # Calculate totals
-        subtotal = Decimal("0")
-        order_items = []
-        
-        for item in items_result.data:
-            product = item["products"]
-            
-            # Check stock
-            if product["stock_quantity"] < item["quantity"]:
-                return create_response(
-                    success=False,
-                    message="Insufficient stock",
-                    errors={"product": f"{product['name']} has insufficient stock"}
-                )
-            
-            item_subtotal = Decimal(str(product["price"])) * item["quantity"]
-            subtotal += item_subtotal
-            
-            order_items.append({
-                "product_id": product["id"],
-                "farmer_id": product["farmer_id"],
-                "quantity": item["quantity"],
-                "price_at_purchase": Decimal(str(product["price"])),
-                "subtotal": item_subtotal
-            })
-        
         # Calculate delivery fee
-        delivery_fee = Decimal("5.00") if order_data.delivery_type == "Delivery" else Decimal("0")
+        delivery_fee = settings.DELIVERY_FEE if order_data.delivery_type == "Delivery" else 0
         
         # Apply promo code discount (simplified)
-        discount = Decimal("0")
-        if order_data.promo_code:
-            discount = subtotal * Decimal("0.1")  # 10% discount
-        
-        total = subtotal + delivery_fee - discount
-        
-        # Create order
-        order_id = str(uuid.uuid4())
-        order_number = generate_order_number()
-        
-        new_order = {
-            "id": order_id,
-            "order_number": order_number,
-            "consumer_id": user["id"],
-            "delivery_type": order_data.delivery_type,
-            "delivery_address_id": order_data.delivery_address_id,
-            "status": "pending",
-            "subtotal": float(subtotal),
-            "delivery_fee": float(delivery_fee),
-            "promo_code": order_data.promo_code,
-            "discount": float(discount),
-            "total": float(total),
-            "created_at": datetime.utcnow().isoformat(),
-            "updated_at": datetime.utcnow().isoformat()
-        }
-        
-        order_result = supabase_admin_client.table("orders").insert(new_order).execute()
-        
-        if not order_result.data:
-            return create_response(
-                success=False,
-                message="Failed to create order",
-                errors={"server": "Database error"}
-            )
-        
-        # Create order items
-        for item in order_items:
-            order_item = {
-                "id": str(uuid.uuid4()),
-                "order_id": order_id,
-                "product_id": item["product_id"],
-                "farmer_id": item["farmer_id"],
-                "quantity": item["quantity"],
-                "price_at_purchase": float(item["price_at_purchase"]),
-                "subtotal": float(item["subtotal"])
-            }
-            supabase_admin_client.table("order_items").insert(order_item).execute()
-            
-            # Decrement product stock - update directly instead of using RPC
-            product_id = item["product_id"]
-            product_result = supabase_admin_client.table("products").select("stock_quantity").eq("id", product_id).execute()
-            if product_result.data:
-                current_stock = product_result.data[0]["stock_quantity"]
-                new_stock = max(0, current_stock - item["quantity"])
-                supabase_admin_client.table("products").update({"stock_quantity": new_stock}).eq("id", product_id).execute()
-        
-        # Clear cart
-        supabase_admin_client.table("cart_items").delete().eq("cart_id", cart_id).execute()
-        
-        # TODO: Send notifications to farmers
+        discount_rate = 0.1 if order_data.promo_code else 0  # 10% discount
+        
+        # Validate stock, create the order and items, decrement stock and
+        # clear the cart in one transactional round trip
+        result = await run_query(supabase_admin_client.rpc("checkout_cart", {
+            "p_user_id": user["id"],
+            "p_delivery_type": order_data.delivery_type,
+            "p_delivery_address_id": order_data.delivery_address_id,
+            "p_delivery_fee": delivery_fee,
+            "p_promo_code": order_data.promo_code,
+            "p_discount_rate": discount_rate
+        }))
+        count_cache.invalidate("orders")
+        
+        order = result.data
+        await invalidate_products(*(order.get("product_ids") or []))
+        
+        # Farmer and consumer notifications go out from the outbox the checkout wrote
+        outbox_dispatcher.wake()
         # TODO: Generate QR code
         
         return create_response(
             success=True,
             message="Order created successfully",
-            data={"order_id": order_id, "order_number": order_number}
+            data={"order_id": order["order_id"], "order_number": order["order_number"]}
         )
     except HTTPException as e:
         return create_response(
@@ -152,6 +71,31 @@ async def create_order(
             message=e.detail,
             errors={"auth": e.detail}
         )
+    except APIError as e:
+        if e.message == "CART_EMPTY":
+            return create_response(
+                success=False,
+                message="Cart is empty",
+                errors={"cart": "No items in cart"}
+            )
+        if e.message == "INSUFFICIENT_STOCK":
+            return create_response(
+                success=False,
+                message="Insufficient stock",
+                errors={"product": f"{e.details} has insufficient stock"}
+            )
+        if e.message == "PRODUCT_UNAVAILABLE":
+            return create_response(
+                success=False,
+                message="Product not available",
+                errors={"product": f"{e.details} is currently unavailable"}
+            )
+        print(f"Order creation error: {e.message}")  # Log the error
+        return create_response(
+            success=False,
+            message=f"Failed to create order: {e.message}",
+            errors={"server": e.message}
+        )
     except Exception as e:
         print(f"Order creation error: {str(e)}")  # Log the error
         return create_response(
@@ -164,35 +108,33 @@ async def create_order(
 async def get_orders(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     page: int = Query(1, ge=1),
-    perPage: int = Query(20, ge=1, le=100)
+    perPage: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    count: CountMode = Query("exact")
 ):
     """Get user's orders."""
     try:
         user = await get_current_user(credentials)
         
         # Build query based on role
-        if user["role"] == "consumer":
-            query = supabase_admin_client.table("orders").select("*", count="exact").eq("consumer_id", user["id"])
-        elif user["role"] == "farmer":
-            # Get orders containing farmer's products
-            query = supabase_admin_client.table("orders").select(
-                "*, order_items!inner(farmer_id)", count="exact"
-            ).eq("order_items.farmer_id", user["id"])
-        else:  # admin
-            query = supabase_admin_client.table("orders").select("*", count="exact")
+        query = user_orders_query(user, count=count_method(count))
         
         # Apply pagination
-        offset = (page - 1) * perPage
-        result = query.order("created_at", desc=True).range(offset, offset + perPage - 1).execute()
+        result = await run_query(paginate(query, "created_at", True, page, perPage, cursor))
         
-        total = result.count if result.count else 0
+        scope = None if user["role"] == "admin" else user["id"]
+        total = await resolve_total(
+            result, count, "orders", (user["role"], scope),
+            lambda: user_orders_query(user, "id", "exact").limit(1)
+        )
         
         return create_paginated_response(
             items=result.data,
             page=page,
             per_page=perPage,
             total=total,
-            message="Orders retrieved successfully"
+            message="Orders retrieved successfully",
+            next_cursor=next_cursor(result.data, "created_at", perPage)
         )
     except HTTPException as e:
         return create_response(
@@ -217,9 +159,9 @@ async def get_order(
         user = await get_current_user(credentials)
         
         # Get order
-        order_result = supabase_admin_client.table("orders").select(
+        order_result = await run_query(supabase_admin_client.table("orders").select(
             "*, users!orders_consumer_id_fkey(full_name), addresses(*)"
-        ).eq("id", order_id).execute()
+        ).eq("id", order_id))
         
         if not order_result.data:
             return create_response(
@@ -239,9 +181,9 @@ async def get_order(
             )
         
         # Get order items
-        items_result = supabase_admin_client.table("order_items").select(
+        items_result = await run_query(supabase_admin_client.table("order_items").select(
             "*, products(name), users!order_items_farmer_id_fkey(full_name, farm_name)"
-        ).eq("order_id", order_id).execute()
+        ).eq("order_id", order_id))
         
         # Format order items
         order_items = []
@@ -298,10 +240,10 @@ async def update_order_status(
 ):
     """Update order status."""
     try:
-        user = await get_current_user(credentials)
+        user = await get_current_user_claims(credentials)
         
         # Get order
-        order_result = supabase_admin_client.table("orders").select("consumer_id, status").eq("id", order_id).execute()
+        order_result = await run_query(supabase_admin_client.table("orders").select("consumer_id, status").eq("id", order_id))
         
         if not order_result.data:
             return create_response(
@@ -321,9 +263,9 @@ async def update_order_status(
             )
         
         # Update status
-        result = supabase_admin_client.table("orders").update({"status": status_update.status}).eq("id", order_id).execute()
+        result = await run_query(supabase_admin_client.table("orders").update({"status": status_update.status}).eq("id", order_id))
         
-        # TODO: Send notification to consumer
+        outbox_dispatcher.wake()
         
         return create_response(
             success=True,
@@ -350,10 +292,10 @@ async def cancel_order(
 ):
     """Cancel an order."""
     try:
-        user = await get_current_user(credentials)
+        user = await get_current_user_claims(credentials)
         
         # Get order
-        order_result = supabase_admin_client.table("orders").select("consumer_id, status").eq("id", order_id).execute()
+        order_result = await run_query(supabase_admin_client.table("orders").select("consumer_id, status").eq("id", order_id))
         
         if not order_result.data:
             return create_response(
@@ -381,10 +323,10 @@ async def cancel_order(
             )
         
         # Update status
-        supabase_admin_client.table("orders").update({"status": "Cancelled"}).eq("id", order_id).execute()
+        await run_query(supabase_admin_client.table("orders").update({"status": "Cancelled"}).eq("id", order_id))
         
         # TODO: Restore product stock
-        # TODO: Send notification
+        outbox_dispatcher.wake()
         
         return create_response(
             success=True,
@@ -1,72 +1,143 @@
-from fastapi import APIRouter, Depends, Query, HTTPException, status
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, status
 from fastapi.security import HTTPAuthorizationCredentials
 from typing import Optional, List
-from app.schemas.product import ProductCreate, ProductUpdate, ProductResponse
+from app.schemas.product import ProductCreate, ProductUpdate, ProductResponse, ImageSize
 from app.schemas.common import create_response, create_paginated_response
-from app.core.supabase import supabase_admin_client
-from app.middleware.auth import security, get_current_user, require_role
+from app.core.supabase import supabase_admin_client, run_query
+from app.core.pagination import paginate, next_cursor
+from app.core.counts import CountMode, count_method, resolve_total, count_cache
+from app.core.cache import catalog_cache, invalidate_products
+from app.core.http_cache import conditional_response, make_etag, latest_update
+from app.middleware.auth import security, get_current_user, get_current_user_claims, require_role
 from datetime import datetime
 import uuid
 
 router = APIRouter()
 
+# Keyset sort column and direction for each sortBy mode
+PRODUCT_SORTS = {
+    "recent": ("created_at", True),
+    "price_asc": ("price", False),
+    "price_desc": ("price", True),
+    "rating": ("rating", True)
+}
+
+# Prices and stock must never be served stale, so clients revalidate every
+# read; an unchanged catalog costs a 304 with no body
+CATALOG_CACHE_CONTROL = "no-cache"
+
+def with_image_size(product: dict, image_size: Optional[str]) -> dict:
+    """Point image_url at the requested variant when the product has one."""
+    variant = (product.get("image_variants") or {}).get(image_size)
+    return {**product, "image_url": variant} if variant else product
+
+def filter_products(query, category: Optional[str], farmer: Optional[str]):
+    """Apply catalog browsing filters."""
+    query = query.eq("is_available", True)
+    
+    if category:
+        query = query.eq("category", category)
+    
+    if farmer:
+        query = query.eq("farmer_id", farmer)
+    
+    return query
+
+async def list_products(category: Optional[str], farmer: Optional[str], sort_by: Optional[str], page: int, per_page: int, cursor: Optional[str], count: str):
+    """Browse available products without a search term."""
+    # Build query
+    query = supabase_admin_client.table("products").select("*, users!products_farmer_id_fkey(full_name, farm_name)", count=count_method(count))
+    query = filter_products(query, category, farmer)
+    
+    # Apply sorting and pagination
+    sort_column, desc = PRODUCT_SORTS.get(sort_by, PRODUCT_SORTS["recent"])
+    query = paginate(query, sort_column, desc, page, per_page, cursor)
+    
+    result = await run_query(query)
+    
+    total = await resolve_total(
+        result, count, "products", (category, farmer),
+        lambda: filter_products(supabase_admin_client.table("products").select("id", count="exact").limit(1), category, farmer)
+    )
+    return result.data, total, next_cursor(result.data, sort_column, per_page)
+
 @router.get("")
 async def get_products(
+    request: Request,
     search: Optional[str] = Query(None),
     category: Optional[str] = Query(None),
     farmer: Optional[str] = Query(None),
-    sortBy: Optional[str] = Query("recent"),
+    sortBy: Optional[str] = Query(None),
     page: int = Query(1, ge=1),
-    perPage: int = Query(20, ge=1, le=100)
+    perPage: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    count: CountMode = Query("exact"),
+    imageSize: Optional[ImageSize] = Query(None)
 ):
     """Get all products with filtering and pagination."""
     try:
-        # Build query
-        query = supabase_admin_client.table("products").select("*, users!products_farmer_id_fkey(full_name, farm_name)", count="exact")
-        
-        # Apply filters
-        query = query.eq("is_available", True)
-        
-        if search:
-            query = query.or_(f"name.ilike.%{search}%,description.ilike.%{search}%")
-        
-        if category:
-            query = query.eq("category", category)
-        
-        if farmer:
-            query = query.eq("farmer_id", farmer)
-        
-        # Apply sorting
-        if sortBy == "price_asc":
-            query = query.order("price", desc=False)
-        elif sortBy == "price_desc":
-            query = query.order("price", desc=True)
-        elif sortBy == "rating":
-            query = query.order("rating", desc=True)
-        else:  # recent
-            query = query.order("created_at", desc=True)
+        async def load():
+            cursor_token = None
+            
+            if search:
+                # Indexed full-text + trigram search, ranked by relevance unless another sort is requested
+                result = await run_query(supabase_admin_client.rpc("search_products", {
+                    "p_query": search,
+                    "p_category": category,
+                    "p_farmer_id": farmer,
+                    "p_sort": sortBy or "relevance",
+                    "p_limit": perPage,
+                    "p_offset": (page - 1) * perPage
+                }))
+                items = result.data["items"]
+                total = result.data["total"]
+            else:
+                items, total, cursor_token = await list_products(category, farmer, sortBy, page, perPage, cursor, count)
+            
+            # Format products
+            products = []
+            for item in items:
+                farmer_info = item.pop("users", {})
+                item.pop("search_vector", None)
+                item["farmer"] = farmer_info.get("farm_name") or farmer_info.get("full_name")
+                products.append(item)
+            
+            return {
+                "items": products,
+                "total": total,
+                "next_cursor": cursor_token,
+                # Validators are computed once per load so cache hits can answer 304 without hashing
+                "etag": make_etag(products, total, cursor_token),
+                "last_modified": latest_update(products)
+            }
         
-        # Apply pagination
-        offset = (page - 1) * perPage
-        query = query.range(offset, offset + perPage - 1)
+        # Searches page by offset and ignore the cursor; other listings the reverse
+        keyset = bool(cursor) and not search
+        key = await catalog_cache.group_key("products", {
+            "search": search.strip().lower() if search else None,
+            "category": category,
+            "farmer": farmer,
+            "sortBy": sortBy,
+            "page": None if keyset else page,
+            "perPage": perPage,
+            "cursor": cursor if keyset else None,
+            "count": count
+        })
+        listing = await catalog_cache.get_or_load(key, load)
         
-        result = query.execute()
-        
-        # Format products
-        products = []
-        for item in result.data:
-            farmer_info = item.pop("users", {})
-            item["farmer"] = farmer_info.get("farm_name") or farmer_info.get("full_name")
-            products.append(item)
-        
-        total = result.count if result.count else 0
-        
-        return create_paginated_response(
-            items=products,
-            page=page,
-            per_page=perPage,
-            total=total,
-            message="Products retrieved successfully"
+        return conditional_response(
+            request,
+            lambda: create_paginated_response(
+                items=[with_image_size(item, imageSize) for item in listing["items"]],
+                page=page,
+                per_page=perPage,
+                total=listing["total"],
+                message="Products retrieved successfully",
+                next_cursor=listing["next_cursor"]
+            ),
+            etag=make_etag(listing["etag"], page, perPage, imageSize),
+            cache_control=CATALOG_CACHE_CONTROL,
+            last_modified=listing["last_modified"]
         )
     except Exception as e:
         return create_response(
@@ -76,27 +147,41 @@ async def get_products(
         )
 
 @router.get("/{product_id}")
-async def get_product(product_id: str):
+async def get_product(product_id: str, request: Request):
     """Get single product by ID."""
     try:
-        result = supabase_admin_client.table("products").select("*, users!products_farmer_id_fkey(full_name, farm_name, farm_location)").eq("id", product_id).execute()
+        async def load():
+            result = await run_query(supabase_admin_client.table("products").select("*, users!products_farmer_id_fkey(full_name, farm_name, farm_location)").eq("id", product_id))
+            
+            if not result.data:
+                return None
+            
+            product = result.data[0]
+            farmer_info = product.pop("users", {})
+            product.pop("search_vector", None)
+            product["farmer"] = farmer_info.get("farm_name") or farmer_info.get("full_name")
+            product["farmer_location"] = farmer_info.get("farm_location")
+            return product
         
-        if not result.data:
+        product = await catalog_cache.get_or_load(catalog_cache.key("product", {"id": product_id}), load)
+        
+        if product is None:
             return create_response(
                 success=False,
                 message="Product not found",
                 errors={"product": "Product does not exist"}
             )
         
-        product = result.data[0]
-        farmer_info = product.pop("users", {})
-        product["farmer"] = farmer_info.get("farm_name") or farmer_info.get("full_name")
-        product["farmer_location"] = farmer_info.get("farm_location")
-        
-        return create_response(
-            success=True,
-            message="Product retrieved successfully",
-            data=product
+        return conditional_response(
+            request,
+            lambda: create_response(
+                success=True,
+                message="Product retrieved successfully",
+                data=product
+            ),
+            etag=make_etag(product),
+            cache_control=CATALOG_CACHE_CONTROL,
+            last_modified=product.get("updated_at")
         )
     except Exception as e:
         return create_response(
@@ -125,6 +210,7 @@ async def create_product(
             "description": product.description,
             "location": product.location or user.get("farm_location"),
             "image_url": product.image_url,
+            "image_variants": product.image_variants,
             "stock_quantity": product.stock_quantity,
             "is_available": product.is_available,
             "harvest_date": product.harvest_date.isoformat() if product.harvest_date else None,
@@ -133,7 +219,9 @@ async def create_product(
             "updated_at": datetime.utcnow().isoformat()
         }
         
-        result = supabase_admin_client.table("products").insert(new_product).execute()
+        result = await run_query(supabase_admin_client.table("products").insert(new_product))
+        count_cache.invalidate("products")
+        await invalidate_products()
         
         if not result.data:
             return create_response(
@@ -168,11 +256,11 @@ async def update_product(
 ):
     """Update a product (Farmer only - own products)."""
     try:
-        user = await get_current_user(credentials)
+        user = await get_current_user_claims(credentials)
         await require_role(user, ["farmer"])
         
         # Check if product exists and belongs to user
-        existing = supabase_admin_client.table("products").select("farmer_id").eq("id", product_id).execute()
+        existing = await run_query(supabase_admin_client.table("products").select("farmer_id").eq("id", product_id))
         
         if not existing.data:
             return create_response(
@@ -194,8 +282,13 @@ async def update_product(
             update_data["price"] = float(update_data["price"])
         if "harvest_date" in update_data and update_data["harvest_date"]:
             update_data["harvest_date"] = update_data["harvest_date"].isoformat()
+        if "image_url" in update_data and "image_variants" not in update_data:
+            # Variants of the previous image would no longer match
+            update_data["image_variants"] = None
         
-        result = supabase_admin_client.table("products").update(update_data).eq("id", product_id).execute()
+        result = await run_query(supabase_admin_client.table("products").update(update_data).eq("id", product_id))
+        count_cache.invalidate("products")
+        await invalidate_products(product_id)
         
         return create_response(
             success=True,
@@ -222,11 +315,11 @@ async def delete_product(
 ):
     """Delete a product (Farmer only - own products)."""
     try:
-        user = await get_current_user(credentials)
+        user = await get_current_user_claims(credentials)
         await require_role(user, ["farmer"])
         
         # Check if product exists and belongs to user
-        existing = supabase_admin_client.table("products").select("farmer_id").eq("id", product_id).execute()
+        existing = await run_query(supabase_admin_client.table("products").select("farmer_id").eq("id", product_id))
         
         if not existing.data:
             return create_response(
@@ -242,7 +335,9 @@ async def delete_product(
                 errors={"auth": "You can only delete your own products"}
             )
         
-        supabase_admin_client.table("products").delete().eq("id", product_id).execute()
+        await run_query(supabase_admin_client.table("products").delete().eq("id", product_id))
+        count_cache.invalidate("products")
+        await invalidate_products(product_id)
         
         return create_response(
             success=True,
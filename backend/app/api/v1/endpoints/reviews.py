@@ -1,14 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.security import HTTPAuthorizationCredentials
 from app.schemas.other import ReviewCreate
 from app.schemas.common import create_response
-from app.core.supabase import supabase_admin_client
+from app.core.supabase import supabase_admin_client, run_query
+from app.core.cache import invalidate_products
+from app.core.http_cache import conditional_response, make_etag, latest_update
 from app.middleware.auth import security, get_current_user
 from datetime import datetime
 import uuid
 
 router = APIRouter()
 
+# Revalidate every read with the ETag, so a new review shows up immediately
+REVIEWS_CACHE_CONTROL = "no-cache"
+
 @router.post("")
 async def create_review(
     review: ReviewCreate,
@@ -19,7 +24,7 @@ async def create_review(
         user = await get_current_user(credentials)
         
         # Check if product exists
-        product = supabase_admin_client.table("products").select("id").eq("id", review.product_id).execute()
+        product = await run_query(supabase_admin_client.table("products").select("id").eq("id", review.product_id))
         
         if not product.data:
             return create_response(
@@ -29,7 +34,7 @@ async def create_review(
             )
         
         # Check if user already reviewed this product
-        existing = supabase_admin_client.table("reviews").select("id").eq("product_id", review.product_id).eq("user_id", user["id"]).execute()
+        existing = await run_query(supabase_admin_client.table("reviews").select("id").eq("product_id", review.product_id).eq("user_id", user["id"]))
         
         if existing.data:
             return create_response(
@@ -49,7 +54,8 @@ async def create_review(
             "updated_at": datetime.utcnow().isoformat()
         }
         
-        result = supabase_admin_client.table("reviews").insert(new_review).execute()
+        result = await run_query(supabase_admin_client.table("reviews").insert(new_review))
+        await invalidate_products(review.product_id)  # Rating is recomputed by trigger
         
         return create_response(
             success=True,
@@ -64,10 +70,10 @@ async def create_review(
         )
 
 @router.get("/product/{product_id}")
-async def get_product_reviews(product_id: str):
+async def get_product_reviews(product_id: str, request: Request):
     """Get reviews for a product."""
     try:
-        result = supabase_admin_client.table("reviews").select("*, users(full_name)").eq("product_id", product_id).order("created_at", desc=True).execute()
+        result = await run_query(supabase_admin_client.table("reviews").select("*, users(full_name)").eq("product_id", product_id).order("created_at", desc=True))
         
         # Format reviews
         reviews = []
@@ -76,10 +82,16 @@ async def get_product_reviews(product_id: str):
             item["user_name"] = user_info.get("full_name", "Anonymous")
             reviews.append(item)
         
-        return create_response(
-            success=True,
-            message="Reviews retrieved successfully",
-            data=reviews
+        return conditional_response(
+            request,
+            lambda: create_response(
+                success=True,
+                message="Reviews retrieved successfully",
+                data=reviews
+            ),
+            etag=make_etag(reviews),
+            cache_control=REVIEWS_CACHE_CONTROL,
+            last_modified=latest_update(reviews)
         )
     except Exception as e:
         return create_response(
@@ -1,12 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import HTTPAuthorizationCredentials
+from postgrest.exceptions import APIError
 from app.schemas.order import SubscriptionCreate, SubscriptionResponse
 from app.schemas.common import create_response
-from app.core.supabase import supabase_admin_client
+from app.core.supabase import supabase_admin_client, run_query
 from app.middleware.auth import security, get_current_user
 from datetime import datetime, timedelta
-from decimal import Decimal
-import uuid
 
 router = APIRouter()
 
@@ -27,7 +26,7 @@ async def get_subscriptions(
     try:
         user = await get_current_user(credentials)
         
-        result = supabase_admin_client.table("subscriptions").select("*").eq("user_id", user["id"]).execute()
+        result = await run_query(supabase_admin_client.table("subscriptions").select("*").eq("user_id", user["id"]))
         
         return create_response(
             success=True,
@@ -50,42 +49,30 @@ async def create_subscription(
     try:
         user = await get_current_user(credentials)
         
-        # Calculate total
-        total = Decimal("0")
-        for item in subscription.items:
-            product = supabase_admin_client.table("products").select("price").eq("id", item.product_id).execute()
-            if product.data:
-                total += Decimal(str(product.data[0]["price"])) * item.quantity
-        
-        # Create subscription
-        sub_id = str(uuid.uuid4())
-        new_sub = {
-            "id": sub_id,
-            "user_id": user["id"],
-            "frequency": subscription.frequency,
-            "status": "Active",
-            "next_delivery_date": calculate_next_delivery(subscription.frequency).isoformat(),
-            "total_amount": float(total),
-            "created_at": datetime.utcnow().isoformat(),
-            "updated_at": datetime.utcnow().isoformat()
-        }
-        
-        result = supabase_admin_client.table("subscriptions").insert(new_sub).execute()
-        
-        # Add subscription items
-        for item in subscription.items:
-            sub_item = {
-                "id": str(uuid.uuid4()),
-                "subscription_id": sub_id,
-                "product_id": item.product_id,
-                "quantity": item.quantity
-            }
-            supabase_admin_client.table("subscription_items").insert(sub_item).execute()
+        # Price the items and create the subscription with its items in one transactional round trip
+        result = await run_query(supabase_admin_client.rpc("create_subscription", {
+            "p_user_id": user["id"],
+            "p_frequency": subscription.frequency,
+            "p_next_delivery_date": calculate_next_delivery(subscription.frequency).isoformat(),
+            "p_items": [{"product_id": item.product_id, "quantity": item.quantity} for item in subscription.items]
+        }))
         
         return create_response(
             success=True,
             message="Subscription created successfully",
-            data=result.data[0] if result.data else None
+            data=result.data
+        )
+    except APIError as e:
+        if e.message == "PRODUCT_NOT_FOUND":
+            return create_response(
+                success=False,
+                message="Product not found",
+                errors={"product": f"Product {e.details} does not exist"}
+            )
+        return create_response(
+            success=False,
+            message="Failed to create subscription",
+            errors={"server": e.message}
         )
     except Exception as e:
         return create_response(
@@ -103,7 +90,7 @@ async def pause_subscription(
     try:
         user = await get_current_user(credentials)
         
-        result = supabase_admin_client.table("subscriptions").update({"status": "Paused"}).eq("id", subscription_id).eq("user_id", user["id"]).execute()
+        result = await run_query(supabase_admin_client.table("subscriptions").update({"status": "Paused"}).eq("id", subscription_id).eq("user_id", user["id"]))
         
         return create_response(
             success=True,
@@ -126,7 +113,7 @@ async def resume_subscription(
     try:
         user = await get_current_user(credentials)
         
-        result = supabase_admin_client.table("subscriptions").update({"status": "Active"}).eq("id", subscription_id).eq("user_id", user["id"]).execute()
+        result = await run_query(supabase_admin_client.table("subscriptions").update({"status": "Active"}).eq("id", subscription_id).eq("user_id", user["id"]))
         
         return create_response(
             success=True,
@@ -149,7 +136,7 @@ async def cancel_subscription(
     try:
         user = await get_current_user(credentials)
         
-        supabase_admin_client.table("subscriptions").update({"status": "Cancelled"}).eq("id", subscription_id).eq("user_id", user["id"]).execute()
+        await run_query(supabase_admin_client.table("subscriptions").update({"status": "Cancelled"}).eq("id", subscription_id).eq("user_id", user["id"]))
         
         return create_response(
             success=True,
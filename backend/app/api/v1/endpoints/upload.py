@@ -2,23 +2,49 @@ from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
 from fastapi.security import HTTPAuthorizationCredentials
 from app.schemas.common import create_response
 from app.core.config import settings
-from app.core.supabase import supabase_admin_client
-from app.middleware.auth import security, get_current_user
+from app.core.supabase import supabase_admin_client, run_query, run_in_db_pool
+from app.core.images import (
+    image_processor, render_product_variants, resize_profile_image, sniff_image_type,
+    ImageProcessorBusy, PRODUCT_VARIANT_FORMAT
+)
+from app.middleware.auth import security, get_current_user, invalidate_user
+import asyncio
 import uuid
-from PIL import Image
-import io
 
 router = APIRouter()
 
-def validate_image(file: UploadFile) -> bool:
-    """Validate image file."""
+# Variant paths embed a fresh UUID, so stored files never change and can be cached for a year
+VARIANT_CACHE_SECONDS = "31536000"
+
+# Bytes read from the spooled upload per await
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+class InvalidImage(Exception):
+    """Upload rejected before processing; the message is returned to the client."""
+
+async def read_image(file: UploadFile) -> bytes:
+    """Read an image upload in chunks, rejecting it as soon as it is invalid.
+
+    The declared content type and size are checked first, then the real type
+    is sniffed from the first chunk, and reading stops once MAX_FILE_SIZE is
+    exceeded, so at most MAX_FILE_SIZE bytes are ever held per upload.
+    """
     if file.content_type not in settings.ALLOWED_IMAGE_TYPES:
-        return False
-    
+        raise InvalidImage("File must be a JPEG, PNG or WebP image")
     if file.size and file.size > settings.MAX_FILE_SIZE:
-        return False
+        raise InvalidImage(f"File must be under {settings.MAX_FILE_SIZE // (1024 * 1024)}MB")
+    
+    contents = bytearray()
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        if not contents and sniff_image_type(chunk) is None:
+            raise InvalidImage("File must be a JPEG, PNG or WebP image")
+        contents += chunk
+        if len(contents) > settings.MAX_FILE_SIZE:
+            raise InvalidImage(f"File must be under {settings.MAX_FILE_SIZE // (1024 * 1024)}MB")
     
-    return True
+    if not contents:
+        raise InvalidImage("File is empty")
+    return bytes(contents)
 
 @router.post("/product-image")
 async def upload_product_image(
@@ -36,45 +62,44 @@ async def upload_product_image(
                 errors={"auth": "Insufficient permissions"}
             )
         
-        if not validate_image(file):
-            return create_response(
-                success=False,
-                message="Invalid image file",
-                errors={"file": "File must be a valid image (JPEG, PNG, WebP) and under 5MB"}
-            )
-        
-        # Read file contents
-        contents = await file.read()
+        # Stream the upload, rejecting oversized or non-image files early
+        contents = await read_image(file)
         
-        # Optional: Resize image
+        # Encode thumbnail/card/full variants in a worker process
         try:
-            image = Image.open(io.BytesIO(contents))
-            # Resize if too large
-            max_size = (1200, 1200)
-            image.thumbnail(max_size, Image.Resampling.LANCZOS)
-            
-            # Convert back to bytes
-            output = io.BytesIO()
-            image.save(output, format=image.format or "JPEG", quality=85, optimize=True)
-            contents = output.getvalue()
-        except Exception:
-            pass  # If resize fails, use original
-        
-        # Generate unique filename
-        file_ext = file.filename.split(".")[-1] if file.filename else "jpg"
-        filename = f"products/{user['id']}/{uuid.uuid4()}.{file_ext}"
+            variants = await image_processor.run(render_product_variants, contents)
+        except (OSError, ValueError):
+            raise InvalidImage("File could not be read as an image")
         
-        # Upload to Supabase Storage
+        # Upload every variant to Supabase Storage concurrently
+        _, extension, content_type = PRODUCT_VARIANT_FORMAT
+        base_path = f"products/{user['id']}/{uuid.uuid4()}"
         storage = supabase_admin_client.storage.from_("products")
-        result = storage.upload(filename, contents)
+        paths = {name: f"{base_path}/{name}.{extension}" for name in variants}
+        await asyncio.gather(*(
+            run_in_db_pool(storage.upload, paths[name], data, {"content-type": content_type, "cache-control": VARIANT_CACHE_SECONDS})
+            for name, data in variants.items()
+        ))
         
-        # Get public URL
-        public_url = storage.get_public_url(filename)
+        # Get public URLs
+        urls = {name: storage.get_public_url(path) for name, path in paths.items()}
         
         return create_response(
             success=True,
             message="Image uploaded successfully",
-            data={"url": public_url}
+            data={"url": urls["full"], "variants": urls}
+        )
+    except InvalidImage as e:
+        return create_response(
+            success=False,
+            message="Invalid image file",
+            errors={"file": str(e)}
+        )
+    except ImageProcessorBusy:
+        return create_response(
+            success=False,
+            message="Server is busy processing images, please try again",
+            errors={"server": "Image processing queue is full"}
         )
     except Exception as e:
         return create_response(
@@ -92,54 +117,46 @@ async def upload_profile_image(
     try:
         user = await get_current_user(credentials)
         
-        if not validate_image(file):
-            return create_response(
-                success=False,
-                message="Invalid image file",
-                errors={"file": "File must be a valid image (JPEG, PNG, WebP) and under 5MB"}
-            )
-        
-        # Read file contents
-        contents = await file.read()
+        # Stream the upload, rejecting oversized or non-image files early
+        contents = await read_image(file)
         
-        # Resize to profile size
+        # Make square and resize to profile size, in a worker process
         try:
-            image = Image.open(io.BytesIO(contents))
-            # Make square and resize
-            min_dimension = min(image.size)
-            left = (image.width - min_dimension) / 2
-            top = (image.height - min_dimension) / 2
-            right = left + min_dimension
-            bottom = top + min_dimension
-            
-            image = image.crop((left, top, right, bottom))
-            image = image.resize((400, 400), Image.Resampling.LANCZOS)
-            
-            # Convert to bytes
-            output = io.BytesIO()
-            image.save(output, format="JPEG", quality=90, optimize=True)
-            contents = output.getvalue()
-        except Exception:
-            pass
+            contents = await image_processor.run(resize_profile_image, contents)
+        except (OSError, ValueError):
+            raise InvalidImage("File could not be read as an image")
         
         # Generate unique filename
         filename = f"profiles/{user['id']}/{uuid.uuid4()}.jpg"
         
         # Upload to Supabase Storage
         storage = supabase_admin_client.storage.from_("profiles")
-        result = storage.upload(filename, contents)
+        await run_in_db_pool(storage.upload, filename, contents)
         
         # Get public URL
         public_url = storage.get_public_url(filename)
         
         # Update user profile
-        supabase_admin_client.table("users").update({"profile_image_url": public_url}).eq("id", user["id"]).execute()
+        await run_query(supabase_admin_client.table("users").update({"profile_image_url": public_url}).eq("id", user["id"]))
+        invalidate_user(user["id"])
         
         return create_response(
             success=True,
             message="Profile image uploaded successfully",
             data={"url": public_url}
         )
+    except InvalidImage as e:
+        return create_response(
+            success=False,
+            message="Invalid image file",
+            errors={"file": str(e)}
+        )
+    except ImageProcessorBusy:
+        return create_response(
+            success=False,
+            message="Server is busy processing images, please try again",
+            errors={"server": "Image processing queue is full"}
+        )
     except Exception as e:
         return create_response(
             success=False,
@@ -2,8 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import HTTPAuthorizationCredentials
 from app.schemas.user import UserUpdate, AddressCreate, AddressUpdate
 from app.schemas.common import create_response
-from app.core.supabase import supabase_admin_client
-from app.middleware.auth import security, get_current_user
+from app.core.supabase import supabase_admin_client, run_query
+from app.middleware.auth import security, get_current_user, invalidate_user
 from datetime import datetime
 import uuid
 
@@ -28,7 +28,8 @@ async def update_profile(
                 errors={"update": "No data provided"}
             )
         
-        result = supabase_admin_client.table("users").update(update_fields).eq("id", user["id"]).execute()
+        result = await run_query(supabase_admin_client.table("users").update(update_fields).eq("id", user["id"]))
+        invalidate_user(user["id"])
         
         if result.data:
             result.data[0].pop("password_hash", None)
@@ -53,7 +54,7 @@ async def get_addresses(
     try:
         user = await get_current_user(credentials)
         
-        result = supabase_admin_client.table("addresses").select("*").eq("user_id", user["id"]).execute()
+        result = await run_query(supabase_admin_client.table("addresses").select("*").eq("user_id", user["id"]))
         
         return create_response(
             success=True,
@@ -78,7 +79,7 @@ async def create_address(
         
         # If this is set as default, unset other defaults
         if address.is_default:
-            supabase_admin_client.table("addresses").update({"is_default": False}).eq("user_id", user["id"]).execute()
+            await run_query(supabase_admin_client.table("addresses").update({"is_default": False}).eq("user_id", user["id"]))
         
         new_address = {
             "id": str(uuid.uuid4()),
@@ -88,7 +89,7 @@ async def create_address(
             "updated_at": datetime.utcnow().isoformat()
         }
         
-        result = supabase_admin_client.table("addresses").insert(new_address).execute()
+        result = await run_query(supabase_admin_client.table("addresses").insert(new_address))
         
         return create_response(
             success=True,
@@ -113,7 +114,7 @@ async def update_address(
         user = await get_current_user(credentials)
         
         # Verify address belongs to user
-        existing = supabase_admin_client.table("addresses").select("user_id").eq("id", address_id).execute()
+        existing = await run_query(supabase_admin_client.table("addresses").select("user_id").eq("id", address_id))
         
         if not existing.data or existing.data[0]["user_id"] != user["id"]:
             return create_response(
@@ -124,10 +125,10 @@ async def update_address(
         
         # If setting as default, unset other defaults
         if update_data.is_default:
-            supabase_admin_client.table("addresses").update({"is_default": False}).eq("user_id", user["id"]).execute()
+            await run_query(supabase_admin_client.table("addresses").update({"is_default": False}).eq("user_id", user["id"]))
         
         update_fields = {k: v for k, v in update_data.dict(exclude_unset=True).items()}
-        result = supabase_admin_client.table("addresses").update(update_fields).eq("id", address_id).execute()
+        result = await run_query(supabase_admin_client.table("addresses").update(update_fields).eq("id", address_id))
         
         return create_response(
             success=True,
@@ -151,7 +152,7 @@ async def delete_address(
         user = await get_current_user(credentials)
         
         # Verify address belongs to user
-        existing = supabase_admin_client.table("addresses").select("user_id").eq("id", address_id).execute()
+        existing = await run_query(supabase_admin_client.table("addresses").select("user_id").eq("id", address_id))
         
         if not existing.data or existing.data[0]["user_id"] != user["id"]:
             return create_response(
@@ -160,7 +161,7 @@ async def delete_address(
                 errors={"address": "Address does not exist"}
             )
         
-        supabase_admin_client.table("addresses").delete().eq("id", address_id).execute()
+        await run_query(supabase_admin_client.table("addresses").delete().eq("id", address_id))
         
         return create_response(
             success=True,
@@ -0,0 +1,212 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional
+from app.core.config import settings
+
+class TTLCache:
+    """Bounded in-process LRU cache with per-entry expiry."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value, or default if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entry when full."""
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        """Remove a key if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size."""
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+class MemoryCacheBackend:
+    """Cache backend holding serialized values in this process."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._counters = {}
+
+    async def get(self, key: str) -> Optional[str]:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        self._cache.set(key, value, ttl)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._cache.delete(key)
+
+    async def incr(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+    async def get_counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+class RedisCacheBackend:
+    """Cache backend shared between workers through a Redis-compatible server."""
+
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("CACHE_URL points at Redis but the redis package is not installed")
+        self._client = redis.from_url(url, decode_responses=True)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._client.get(key)
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        if ttl > 0:
+            await self._client.set(key, value, px=int(ttl * 1000))
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self._client.delete(*keys)
+
+    async def incr(self, key: str) -> int:
+        return await self._client.incr(key)
+
+    async def get_counter(self, key: str) -> int:
+        return int(await self._client.get(key) or 0)
+
+def create_cache_backend(url: str, maxsize: int, ttl: float):
+    """Backend for a cache URL: redis:// or rediss:// for Redis, anything else in-process."""
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCacheBackend(url)
+    return MemoryCacheBackend(maxsize=maxsize, ttl=ttl)
+
+class ReadThroughCache:
+    """JSON read-through cache with generation-versioned groups of keys.
+
+    Keys in a group embed the group's generation, so bumping the generation
+    invalidates every key in it at once (e.g. all product listings) without
+    enumerating them. Backend failures degrade to calling the loader.
+    """
+
+    def __init__(self, backend, namespace: str, ttl: float):
+        self.backend = backend
+        self.namespace = namespace
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def key(self, name: str, params: Optional[dict] = None) -> str:
+        """Cache key for a name and normalized query parameters."""
+        if not params:
+            return f"{self.namespace}:{name}"
+        normalized = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+        digest = hashlib.sha1(normalized.encode()).hexdigest()
+        return f"{self.namespace}:{name}:{digest}"
+
+    async def group_key(self, group: str, params: Optional[dict] = None) -> str:
+        """Cache key in a versioned group."""
+        generation = await self.backend.get_counter(f"{self.namespace}:gen:{group}")
+        return self.key(f"{group}:{generation}", params)
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for key, or load, store and return it."""
+        if self.ttl <= 0:
+            return await loader()
+
+        try:
+            cached = await self.backend.get(key)
+        except Exception:
+            self.errors += 1
+            cached = None
+        if cached is not None:
+            self.hits += 1
+            return json.loads(cached)
+
+        self.misses += 1
+        value = await loader()
+        try:
+            await self.backend.set(key, json.dumps(value, default=str), self.ttl)
+        except Exception:
+            self.errors += 1
+        return value
+
+    async def invalidate(self, *keys: str) -> None:
+        """Drop individual keys."""
+        try:
+            await self.backend.delete(*keys)
+        except Exception:
+            self.errors += 1
+
+    async def bump(self, group: str) -> None:
+        """Invalidate every key in a group."""
+        try:
+            await self.backend.incr(f"{self.namespace}:gen:{group}")
+        except Exception:
+            self.errors += 1
+
+    def stats(self) -> dict:
+        """Hit/miss counters for this process."""
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None
+        }
+
+# Product listings and details served to anonymous catalog browsing
+catalog_cache = ReadThroughCache(
+    create_cache_backend(settings.CACHE_URL, settings.CATALOG_CACHE_SIZE, settings.CATALOG_CACHE_TTL_SECONDS),
+    namespace="catalog",
+    ttl=settings.CATALOG_CACHE_TTL_SECONDS
+)
+
+async def invalidate_products(*product_ids: str) -> None:
+    """Forget cached listings and the given products after a catalog write."""
+    await catalog_cache.bump("products")
+    await catalog_cache.invalidate(*[catalog_cache.key("product", {"id": str(product_id)}) for product_id in product_ids])
@@ -24,23 +24,76 @@ class Settings(BaseSettings):
     SUPABASE_KEY: str = os.getenv("SUPABASE_KEY", "")
     SUPABASE_SERVICE_KEY: str = os.getenv("SUPABASE_SERVICE_KEY", "")
     
+    # Database access
+    DB_POOL_WORKERS: int = 32  # Threads running blocking Supabase calls
+    DB_MAX_CONNECTIONS: int = 32
+    DB_MAX_KEEPALIVE_CONNECTIONS: int = 16
+    DB_KEEPALIVE_EXPIRY: float = 30.0  # Seconds an idle connection is kept open
+    DB_CONNECT_TIMEOUT: float = 5.0
+    DB_REQUEST_TIMEOUT: float = 10.0
+    DB_POOL_TIMEOUT: float = 5.0  # Max wait for a free pooled connection
+    DB_CONNECT_RETRIES: int = 1
+    DB_HTTP2: bool = False  # Requires the h2 package
+    STORAGE_REQUEST_TIMEOUT: int = 30
+    
     # JWT
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
-    ALGORITHM: str = "HS256"
+    ALGORITHM: str = os.getenv("ALGORITHM", "HS256")  # HS256 uses SECRET_KEY; RS256/ES256/EdDSA use JWT_KEYS
+    JWT_KEYS: str = os.getenv("JWT_KEYS", "")  # "kid=/path/key.pem,..."; the first (private) key signs, all verify
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    JWT_BACKEND: str = "jose"  # "pyjwt" uses PyJWT for verification (must be installed)
+    TOKEN_CACHE_SIZE: int = 10000  # Verified tokens remembered until expiry; 0 disables
+    
+    # Password hashing
+    PASSWORD_HASH_WORKERS: int = 4  # bcrypt threads; each uses one core while hashing
+    PASSWORD_HASH_MAX_QUEUE: int = 64  # Logins/registrations waiting beyond this are rejected as busy
+    
+    # Auth caching
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: float = 60.0  # 0 disables the authenticated-user cache
+    AUTH_TRUST_ROLE_CLAIM: bool = False  # Role checks use the token's role claim (stale for up to token lifetime)
+    
+    # Response caching
+    CACHE_URL: str = os.getenv("CACHE_URL", "")  # redis://... to share the cache between workers; empty keeps it in-process
+    CATALOG_CACHE_TTL_SECONDS: float = 30.0  # 0 disables catalog caching
+    CATALOG_CACHE_SIZE: int = 1024
     
     # Google OAuth
     GOOGLE_CLIENT_ID: str = os.getenv("GOOGLE_CLIENT_ID", "")
     GOOGLE_CLIENT_SECRET: str = os.getenv("GOOGLE_CLIENT_SECRET", "")
+    GOOGLE_CERTS_URL: str = os.getenv("GOOGLE_CERTS_URL", "https://www.googleapis.com/oauth2/v1/certs")  # PEM certs by key id
+    GOOGLE_TOKEN_CACHE_SIZE: int = 1024  # Verified ID tokens kept until they expire; 0 disables
     
     # File Upload
     MAX_FILE_SIZE: int = 5 * 1024 * 1024  # 5MB
     ALLOWED_IMAGE_TYPES: List[str] = ["image/jpeg", "image/png", "image/jpg", "image/webp"]
+    MAX_IMAGE_PIXELS: int = 40_000_000  # Larger images are rejected before decoding
+    IMAGE_WORKERS: int = 2  # Processes resizing uploaded images
+    IMAGE_QUEUE_TIMEOUT_SECONDS: float = 10.0  # Uploads waiting longer for a worker are rejected as busy
+    
+    # Orders
+    DELIVERY_FEE: float = 5.00  # Charged on Delivery orders
+    
+    # Notifications
+    NOTIFICATION_BROKER_URL: str = os.getenv("NOTIFICATION_BROKER_URL", "")  # postgresql://... shares pushes between workers via LISTEN/NOTIFY (requires asyncpg); empty stays in-process
+    NOTIFICATION_STREAM_HEARTBEAT_SECONDS: float = 15.0  # Keep-alive comment interval on idle streams
+    NOTIFICATION_STREAM_QUEUE_SIZE: int = 100  # Undelivered events per stream before it is closed for the client to resync
+    OUTBOX_DISPATCHER_ENABLED: bool = True  # Turn recorded order events into notifications in the background; safe on every worker
+    OUTBOX_DISPATCH_INTERVAL_SECONDS: float = 5.0  # Poll for events written by other workers; local writes dispatch immediately
+    OUTBOX_DISPATCH_BATCH_SIZE: int = 100  # Events claimed per dispatch_outbox_events call
+    
+    # Subscriptions
+    SUBSCRIPTION_SCHEDULER_ENABLED: bool = False  # Turn due subscriptions into orders in the background; safe on every worker
+    SUBSCRIPTION_SCHEDULER_INTERVAL_SECONDS: float = 300.0
+    SUBSCRIPTION_SCHEDULER_BATCH_SIZE: int = 50  # Due subscriptions listed per round; each is fulfilled in its own transaction
     
     # Pagination
     DEFAULT_PAGE_SIZE: int = 20
     MAX_PAGE_SIZE: int = 100
+    COUNT_CACHE_TTL_SECONDS: float = 30.0  # Exact list totals are refreshed in the background after this; 0 counts inline
+    COUNT_CACHE_MAX_STALE_SECONDS: float = 300.0
+    COUNT_CACHE_SIZE: int = 2048
     
     class Config:
         case_sensitive = True
@@ -0,0 +1,80 @@
+import asyncio
+import time
+from typing import Callable, Hashable, Literal, Optional, get_args
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.supabase import run_query
+
+# Values accepted by the `count` query parameter on list endpoints
+CountMode = Literal["exact", "planned", "estimated", "none"]
+COUNT_MODES = get_args(CountMode)
+
+class CountCache:
+    """Exact row counts per filter combination, served stale while refreshing in the background."""
+
+    def __init__(self, ttl: float, max_stale: float, maxsize: int):
+        self.ttl = ttl
+        self._entries = TTLCache(maxsize=maxsize, ttl=max_stale)
+        self._generations = {}
+        self._refreshing = set()
+        self._tasks = set()
+
+    def invalidate(self, table: str) -> None:
+        """Forget every cached count for a table after it is written to."""
+        self._generations[table] = self._generations.get(table, 0) + 1
+
+    async def get(self, table: str, key: Hashable, build_query: Callable) -> int:
+        """Return the cached count for key, fetching it on a miss."""
+        key = (table, self._generations.get(table, 0), key)
+        entry = self._entries.get(key)
+        if entry is None:
+            return await self._refresh(key, build_query)
+
+        value, fetched_at = entry
+        if time.monotonic() - fetched_at > self.ttl and key not in self._refreshing:
+            task = asyncio.create_task(self._refresh_quietly(key, build_query))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return value
+
+    async def _refresh(self, key: Hashable, build_query: Callable) -> int:
+        self._refreshing.add(key)
+        try:
+            result = await run_query(build_query())
+            count = result.count or 0
+            self._entries.set(key, (count, time.monotonic()))
+            return count
+        finally:
+            self._refreshing.discard(key)
+
+    async def _refresh_quietly(self, key: Hashable, build_query: Callable) -> None:
+        try:
+            await self._refresh(key, build_query)
+        except Exception:
+            pass  # Keep serving the stale count; the next request retries
+
+    def stats(self) -> dict:
+        """Cache size and hit/miss counters."""
+        return self._entries.stats()
+
+count_cache = CountCache(
+    ttl=settings.COUNT_CACHE_TTL_SECONDS,
+    max_stale=settings.COUNT_CACHE_MAX_STALE_SECONDS,
+    maxsize=settings.COUNT_CACHE_SIZE
+)
+
+def count_method(mode: str) -> Optional[str]:
+    """Count method to send with the page query itself."""
+    if mode in ("planned", "estimated"):
+        return mode
+    if mode == "exact" and settings.COUNT_CACHE_TTL_SECONDS <= 0:
+        return "exact"
+    return None  # "none", or exact counts served by count_cache
+
+async def resolve_total(result, mode: str, table: str, key: Hashable, build_count_query: Callable) -> Optional[int]:
+    """Total rows for a page result according to the requested count mode."""
+    if mode == "none":
+        return None
+    if result.count is not None:
+        return result.count
+    return await count_cache.get(table, key, build_count_query)
@@ -0,0 +1,101 @@
+import asyncio
+import hashlib
+import re
+import threading
+import time
+from typing import Any, Dict, Optional
+import httpx
+from jose import jwt as jose_jwt
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+
+# Used when the certs response carries no usable max-age
+DEFAULT_CERTS_MAX_AGE = 300
+
+# Unknown key ids refetch certs at most this often, so forged kids cannot force a fetch per request
+MIN_KID_REFRESH_INTERVAL = 30
+
+def cache_max_age(headers: httpx.Headers) -> float:
+    """Remaining freshness lifetime from Cache-Control max-age and Age."""
+    match = re.search(r"max-age=(\d+)", headers.get("cache-control", ""))
+    if not match:
+        return DEFAULT_CERTS_MAX_AGE
+    age = headers.get("age", "0")
+    return max(int(match.group(1)) - (int(age) if age.isdigit() else 0), 0)
+
+class GoogleTokenVerifier:
+    """Verifies Google ID tokens against locally cached signing certs.
+
+    Certs are refetched when their Cache-Control lifetime runs out or a token
+    names an unknown key id. Verified tokens are memoized until they expire,
+    so repeat sign-ins with the same token skip signature checks.
+    """
+
+    def __init__(
+        self,
+        client_id: str,
+        certs_url: str,
+        token_cache_size: int = 1024,
+        http_client: Optional[httpx.Client] = None
+    ):
+        self.client_id = client_id
+        self.certs_url = certs_url
+        self._http = http_client or httpx.Client(timeout=5.0)
+        self._certs: Dict[str, str] = {}
+        self._certs_expire_at = 0.0
+        self._certs_fetched_at = float("-inf")
+        self._certs_lock = threading.Lock()
+        self._tokens = TTLCache(maxsize=token_cache_size, ttl=0)
+        self.cert_fetches = 0
+
+    def _fetch_certs(self) -> None:
+        response = self._http.get(self.certs_url)
+        response.raise_for_status()
+        self._certs = response.json()
+        self._certs_fetched_at = time.monotonic()
+        self._certs_expire_at = self._certs_fetched_at + cache_max_age(response.headers)
+        self.cert_fetches += 1
+
+    def get_certs(self, required_kid: Optional[str] = None) -> Dict[str, str]:
+        """Current certs by key id, refreshed when stale or missing required_kid."""
+        with self._certs_lock:
+            now = time.monotonic()
+            stale = now >= self._certs_expire_at
+            unknown_kid = required_kid and required_kid not in self._certs
+            if stale or (unknown_kid and now - self._certs_fetched_at >= MIN_KID_REFRESH_INTERVAL):
+                self._fetch_certs()
+            return self._certs
+
+    def verify(self, token: str) -> Optional[Dict[str, Any]]:
+        """Return the token's claims, or None if it is invalid for this client."""
+        from google.auth import jwt as google_jwt
+
+        key = hashlib.sha256(token.encode()).hexdigest()
+        cached = self._tokens.get(key)
+        if cached is not None:
+            return dict(cached)
+
+        try:
+            kid = jose_jwt.get_unverified_header(token).get("kid")
+            certs = self.get_certs(required_kid=kid)
+            claims = google_jwt.decode(token, certs=certs, audience=self.client_id, clock_skew_in_seconds=10)
+        except (ValueError, jose_jwt.JWTError, httpx.HTTPError):
+            return None
+
+        if claims.get("iss") not in GOOGLE_ISSUERS:
+            return None
+
+        self._tokens.set(key, claims, ttl=claims.get("exp", 0) - time.time())
+        return dict(claims)
+
+    async def verify_async(self, token: str) -> Optional[Dict[str, Any]]:
+        """verify() on a worker thread; cert refreshes do blocking I/O."""
+        return await asyncio.to_thread(self.verify, token)
+
+google_token_verifier = GoogleTokenVerifier(
+    client_id=settings.GOOGLE_CLIENT_ID,
+    certs_url=settings.GOOGLE_CERTS_URL,
+    token_cache_size=settings.GOOGLE_TOKEN_CACHE_SIZE
+)
@@ -0,0 +1,70 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Callable, Iterable, Optional
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+def make_etag(*parts: Any) -> str:
+    """Weak ETag over the JSON form of the given values."""
+    raw = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str).encode()
+    return f'W/"{hashlib.sha1(raw).hexdigest()}"'
+
+def latest_update(rows: Iterable[dict]) -> Optional[str]:
+    """Most recent updated_at among rows, as stored (ISO 8601)."""
+    stamps = [parse_timestamp(row.get("updated_at")) for row in rows if row]
+    stamps = [stamp for stamp in stamps if stamp]
+    return max(stamps).isoformat() if stamps else None
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Parse an ISO 8601 timestamp, or None if missing or malformed."""
+    if not value:
+        return None
+    try:
+        stamp = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return stamp if stamp.tzinfo else stamp.replace(tzinfo=timezone.utc)
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Evaluate If-None-Match, falling back to If-Modified-Since (RFC 9110)."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        if if_none_match.strip() == "*":
+            return True
+        # Weak comparison: W/"x" matches "x"
+        tag = etag.removeprefix("W/")
+        return any(candidate.strip().removeprefix("W/") == tag for candidate in if_none_match.split(","))
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+def conditional_response(
+    request: Request,
+    build_content: Callable[[], Any],
+    etag: str,
+    cache_control: str,
+    last_modified: Optional[str] = None
+) -> Response:
+    """Return 304 when the client's copy is current, else the JSON body with validators.
+
+    The body is only built and serialized when it is actually sent.
+    """
+    modified = parse_timestamp(last_modified)
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if modified:
+        headers["Last-Modified"] = format_datetime(modified.astimezone(timezone.utc), usegmt=True)
+
+    if is_not_modified(request, etag, modified):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=jsonable_encoder(build_content()), headers=headers)
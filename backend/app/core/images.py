@@ -0,0 +1,150 @@
+import asyncio
+import io
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Optional, Tuple
+from PIL import Image, ImageOps
+from app.core.config import settings
+
+PROFILE_IMAGE_SIZE = (400, 400)
+
+# Longest edge of each stored product image variant, largest first
+PRODUCT_IMAGE_VARIANTS = {"full": 1200, "card": 640, "thumb": 160}
+PRODUCT_VARIANT_FORMAT = ("WEBP", "webp", "image/webp")
+
+# Leading bytes of each accepted upload format
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+)
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Content type from an upload's first bytes, or None if not JPEG, PNG or WebP."""
+    for signature, content_type in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+def open_image(contents: bytes, min_size: Tuple[int, int]) -> Image.Image:
+    """Open an image for downscaling to at least min_size, decoding as little as possible.
+
+    Only the header is read before the pixel limit is checked. JPEGs are then
+    decoded at the smallest DCT scale (1/2, 1/4, 1/8) that still covers
+    min_size, so a large photo never materializes at full resolution.
+    """
+    image = Image.open(io.BytesIO(contents))
+    if image.width * image.height > settings.MAX_IMAGE_PIXELS:
+        raise ValueError("Image dimensions are too large")
+    if image.format == "JPEG":
+        image.draft("RGB", min_size)
+    return image
+
+def render_product_variants(contents: bytes) -> Dict[str, bytes]:
+    """Encode each PRODUCT_IMAGE_VARIANTS size as WebP.
+
+    Decodes once and downsamples from the previous (larger) variant, so each
+    step stays cheap. Raises if the upload is not a decodable image.
+    """
+    full_edge = max(PRODUCT_IMAGE_VARIANTS.values())
+    image = ImageOps.exif_transpose(open_image(contents, (full_edge, full_edge)))
+    image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+
+    variants = {}
+    for name, edge in PRODUCT_IMAGE_VARIANTS.items():
+        image.thumbnail((edge, edge), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        output = io.BytesIO()
+        image.save(output, format=PRODUCT_VARIANT_FORMAT[0], quality=80, method=4)
+        variants[name] = output.getvalue()
+    return variants
+
+def resize_profile_image(contents: bytes) -> bytes:
+    """Center-crop to a square and resize to a 400x400 JPEG.
+
+    Raises if the upload is not a decodable image.
+    """
+    image = open_image(contents, PROFILE_IMAGE_SIZE)
+    min_dimension = min(image.size)
+    left = (image.width - min_dimension) / 2
+    top = (image.height - min_dimension) / 2
+
+    image = image.crop((left, top, left + min_dimension, top + min_dimension))
+    image = image.resize(PROFILE_IMAGE_SIZE, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+    output = io.BytesIO()
+    image.convert("RGB").save(output, format="JPEG", quality=90, optimize=True)
+    return output.getvalue()
+
+class ImageProcessorBusy(Exception):
+    """Raised when an image job waited longer than the queue timeout."""
+
+class ImageProcessor:
+    """Runs CPU-heavy image work in worker processes.
+
+    At most `workers` jobs run at once; later jobs wait up to queue_timeout
+    seconds for a slot and are then rejected, so a burst of uploads cannot
+    queue unbounded work or stall the event loop. If a worker dies (say, the
+    OOM killer takes one mid-decode) the pool is rebuilt and the job retried
+    once; the jobs that were running on it are retried the same way.
+    """
+
+    def __init__(self, workers: int, queue_timeout: float):
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.restarts = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def run(self, func: Callable, *args):
+        """Run a module-level image function in the pool once a slot is free."""
+        if self._executor is None:
+            # Created on first use so importing the app never forks
+            self._executor = ProcessPoolExecutor(self.workers)
+            self._slots = asyncio.Semaphore(self.workers)
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise ImageProcessorBusy()
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        try:
+            executor = self._executor
+            try:
+                return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+            except BrokenProcessPool:
+                self._replace_executor(executor)
+                return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self.active -= 1
+            self.completed += 1
+            self._slots.release()
+
+    def _replace_executor(self, broken: ProcessPoolExecutor) -> None:
+        """Swap in a new pool, unless another job already replaced this one."""
+        if self._executor is broken:
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._executor = ProcessPoolExecutor(self.workers)
+            self.restarts += 1
+
+    def stats(self) -> dict:
+        """Pool size, queue depth and counters."""
+        return {
+            "workers": self.workers,
+            "active": self.active,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "restarts": self.restarts
+        }
+
+image_processor = ImageProcessor(settings.IMAGE_WORKERS, settings.IMAGE_QUEUE_TIMEOUT_SECONDS)
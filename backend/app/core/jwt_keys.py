@@ -0,0 +1,90 @@
+import base64
+from typing import Dict, List, Optional, Tuple
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from app.core.config import settings
+
+ASYMMETRIC_ALGORITHMS = ("RS256", "RS384", "RS512", "ES256", "ES384", "ES512", "EdDSA")
+
+EC_CURVES = {"secp256r1": "P-256", "secp384r1": "P-384", "secp521r1": "P-521"}
+
+def b64url_uint(value: int) -> str:
+    """Base64url big-endian encoding of an integer, as JWKs use."""
+    raw = value.to_bytes((value.bit_length() + 7) // 8 or 1, "big")
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def public_jwk(public_key, kid: str, algorithm: str) -> dict:
+    """JWK (RFC 7517) for a public key."""
+    jwk = {"kid": kid, "alg": algorithm, "use": "sig"}
+    if isinstance(public_key, rsa.RSAPublicKey):
+        numbers = public_key.public_numbers()
+        jwk.update(kty="RSA", n=b64url_uint(numbers.n), e=b64url_uint(numbers.e))
+    elif isinstance(public_key, ec.EllipticCurvePublicKey):
+        numbers = public_key.public_numbers()
+        size = (public_key.curve.key_size + 7) // 8
+        jwk.update(
+            kty="EC",
+            crv=EC_CURVES[public_key.curve.name],
+            x=base64.urlsafe_b64encode(numbers.x.to_bytes(size, "big")).decode().rstrip("="),
+            y=base64.urlsafe_b64encode(numbers.y.to_bytes(size, "big")).decode().rstrip("=")
+        )
+    elif isinstance(public_key, ed25519.Ed25519PublicKey):
+        raw = public_key.public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+        jwk.update(kty="OKP", crv="Ed25519", x=base64.urlsafe_b64encode(raw).decode().rstrip("="))
+    else:
+        raise ValueError(f"Unsupported key type for kid {kid}")
+    return jwk
+
+class KeyRing:
+    """Asymmetric signing keys by kid.
+
+    The first key signs new tokens. Every key, including public-only keys
+    kept after a rotation, verifies tokens until it is removed from the ring.
+    """
+
+    def __init__(self, algorithm: str, keys: List[Tuple[str, bytes]]):
+        if not keys:
+            raise ValueError(f"{algorithm} requires at least one key in JWT_KEYS")
+        self.algorithm = algorithm
+        self.active_kid = keys[0][0]
+        self.signing_key: Optional[bytes] = None
+        self.verification_keys: Dict[str, bytes] = {}
+        self._jwks = []
+
+        for kid, pem in keys:
+            if b"PRIVATE KEY" in pem:
+                private_key = serialization.load_pem_private_key(pem, password=None)
+                public_key = private_key.public_key()
+                if kid == self.active_kid:
+                    self.signing_key = pem
+            else:
+                public_key = serialization.load_pem_public_key(pem)
+            self.verification_keys[kid] = public_key.public_bytes(
+                serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+            )
+            self._jwks.append(public_jwk(public_key, kid, algorithm))
+
+        if self.signing_key is None:
+            raise ValueError(f"Active key {self.active_kid} must be a private key")
+
+    def verification_key(self, kid: Optional[str]) -> Optional[bytes]:
+        """Public key for a token's kid, or None if unknown."""
+        return self.verification_keys.get(kid) if kid else None
+
+    def jwks(self) -> dict:
+        """JSON Web Key Set of every verification key."""
+        return {"keys": list(self._jwks)}
+
+def load_key_ring() -> Optional[KeyRing]:
+    """Key ring from JWT_KEYS ("kid=/path/key.pem,...") when ALGORITHM is asymmetric."""
+    if settings.ALGORITHM not in ASYMMETRIC_ALGORITHMS:
+        return None
+
+    keys = []
+    for entry in filter(None, (part.strip() for part in settings.JWT_KEYS.split(","))):
+        kid, _, path = entry.partition("=")
+        with open(path.strip(), "rb") as key_file:
+            keys.append((kid.strip(), key_file.read()))
+    return KeyRing(settings.ALGORITHM, keys)
+
+key_ring = load_key_ring()
@@ -0,0 +1,115 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Optional
+from app.core.config import settings
+from app.core.pubsub import push_notifications
+from app.core.supabase import supabase_admin_client, run_query
+
+class OutboxDispatcher:
+    """Turns event_outbox rows into notifications in the background.
+
+    Order and bulk-order writes record their events in the same transaction
+    (see the record_*_event triggers), so request handlers only call wake()
+    and return. Each pass drains pending events in batches of batch_size
+    through the dispatch_outbox_events RPC, which claims rows with
+    FOR UPDATE SKIP LOCKED and skips notifications that already exist, so
+    passes can overlap across workers and a batch that fails midway is
+    simply retried. Events written by other workers are picked up every
+    interval seconds.
+    """
+
+    def __init__(self, interval: float, batch_size: int):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.runs = 0
+        self.batches = 0
+        self.events = 0
+        self.notifications = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.last_run_at: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def wake(self) -> None:
+        """Start a pass now rather than at the next interval; a no-op when not running."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run_once(self) -> dict:
+        """Dispatch every pending event; returns this pass's totals."""
+        started = time.perf_counter()
+        totals = {"events": 0, "notifications": 0}
+
+        try:
+            while True:
+                result = await run_query(supabase_admin_client.rpc("dispatch_outbox_events", {
+                    "p_limit": self.batch_size
+                }))
+                batch = result.data
+                self.batches += 1
+
+                totals["events"] += batch["claimed"]
+                totals["notifications"] += len(batch["notifications"])
+                await push_notifications(batch["notifications"])
+
+                # A short batch means the outbox is drained (or the rest is claimed by another worker)
+                if batch["claimed"] < self.batch_size:
+                    break
+        finally:
+            self.runs += 1
+            self.events += totals["events"]
+            self.notifications += totals["notifications"]
+            self.busy_seconds += time.perf_counter() - started
+            self.last_run_at = datetime.now(timezone.utc).isoformat()
+
+        return totals
+
+    async def _run_forever(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                await self.run_once()
+            except Exception as e:
+                self.errors += 1
+                print(f"Outbox dispatcher error: {str(e)}")  # Log the error
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        """Start dispatching on the running event loop."""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self) -> None:
+        """Cancel dispatching and wait for the current pass to end."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wakeup = None
+
+    def stats(self) -> dict:
+        """Pass counters and throughput for this worker."""
+        return {
+            "running": self._task is not None,
+            "runs": self.runs,
+            "batches": self.batches,
+            "events": self.events,
+            "notifications": self.notifications,
+            "errors": self.errors,
+            "events_per_second": round(self.events / self.busy_seconds, 2) if self.busy_seconds else 0.0,
+            "last_run_at": self.last_run_at
+        }
+
+outbox_dispatcher = OutboxDispatcher(
+    interval=settings.OUTBOX_DISPATCH_INTERVAL_SECONDS,
+    batch_size=settings.OUTBOX_DISPATCH_BATCH_SIZE
+)
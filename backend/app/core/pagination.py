@@ -0,0 +1,71 @@
+import base64
+import binascii
+import json
+import uuid
+from typing import Any, List, Optional
+
+def encode_cursor(values: dict) -> str:
+    """Encode the sort key of a row as an opaque cursor."""
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> dict:
+    """Decode a cursor produced by encode_cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, dict):
+        raise ValueError("Invalid cursor")
+    return values
+
+def quote_filter_value(value: Any) -> str:
+    """Double-quote a value for a PostgREST logic tree, escaping quotes and backslashes."""
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise ValueError("Invalid cursor")
+    escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+def keyset_filter(column: str, desc: bool, value: Any, row_id: uuid.UUID) -> str:
+    """PostgREST logic tree for the rows after (value, row_id) in (column, id) order.
+
+    Postgres sorts NULLs last ascending and first descending, so a NULL
+    sort value is compared with is.null rather than by value.
+    """
+    op = "lt" if desc else "gt"
+    if value is None:
+        after_nulls = f"and({column}.is.null,id.{op}.{row_id})"
+        return f"{column}.not.is.null,{after_nulls}" if desc else after_nulls
+
+    value = quote_filter_value(value)
+    after = f"{column}.{op}.{value},and({column}.eq.{value},id.{op}.{row_id})"
+    return after if desc else f"{after},{column}.is.null"
+
+def paginate(query, column: str, desc: bool, page: int, per_page: int, cursor: Optional[str] = None):
+    """Order by (column, id) and page by keyset when a cursor is given, else by offset."""
+    # One combined order param; the desc flag applies to the trailing id tie-breaker
+    query = query.order(f"{column}{'.desc' if desc else ''},id", desc=desc)
+
+    if cursor:
+        key = decode_cursor(cursor)
+        if set(key) != {column, "id"}:
+            raise ValueError("Cursor does not match the requested sort order")
+        # Cursors come from clients: the id must be a UUID and the sort value
+        # is quoted, so neither can add conditions to the filter
+        try:
+            row_id = uuid.UUID(str(key["id"]))
+        except ValueError:
+            raise ValueError("Invalid cursor")
+        query = query.or_(keyset_filter(column, desc, key[column], row_id))
+        return query.limit(per_page)
+
+    offset = (page - 1) * per_page
+    return query.range(offset, offset + per_page - 1)
+
+def next_cursor(rows: List[Any], column: str, per_page: int) -> Optional[str]:
+    """Cursor for the page after rows, or None on the last page."""
+    if len(rows) < per_page:
+        return None
+    last = rows[-1]
+    return encode_cursor({column: last[column], "id": last["id"]})
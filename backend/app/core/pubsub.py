@@ -0,0 +1,162 @@
+import asyncio
+import json
+from typing import Dict, Iterable, Optional, Set
+from app.core.config import settings
+
+# Postgres NOTIFY channel shared by every worker; payloads must stay under 8000 bytes
+PG_CHANNEL = "agriconnect_events"
+
+class Subscription:
+    """Bounded queue of messages for one listener on one channel."""
+
+    def __init__(self, channel: str, maxsize: int):
+        self.channel = channel
+        self.closed = False
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    def put(self, message: dict) -> bool:
+        """Queue a message; a listener too slow to keep up is closed instead of buffering forever."""
+        if self.closed:
+            return False
+        try:
+            self._queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            self.close()
+            return False
+
+    def close(self) -> None:
+        """Drop queued messages and wake the listener with None."""
+        self.closed = True
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(None)
+
+    async def get(self, timeout: float) -> Optional[dict]:
+        """Next message, or None once closed. Raises asyncio.TimeoutError when idle for timeout seconds."""
+        return await asyncio.wait_for(self._queue.get(), timeout)
+
+class InProcessBroker:
+    """Fans published messages out to subscribers in this worker."""
+
+    backend = "memory"
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+
+    async def subscribe(self, channel: str) -> Subscription:
+        subscription = Subscription(channel, self.queue_size)
+        self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        listeners = self._subscribers.get(subscription.channel)
+        if listeners is not None:
+            listeners.discard(subscription)
+            if not listeners:
+                del self._subscribers[subscription.channel]
+
+    async def publish(self, channel: str, message: dict) -> None:
+        self.published += 1
+        self._fan_out(channel, message)
+
+    def _fan_out(self, channel: str, message: dict) -> None:
+        for subscription in list(self._subscribers.get(channel, ())):
+            if subscription.put(message):
+                self.delivered += 1
+            else:
+                self.dropped += 1
+
+    def _close_all(self) -> None:
+        for listeners in self._subscribers.values():
+            for subscription in listeners:
+                subscription.close()
+
+    async def close(self) -> None:
+        self._close_all()
+
+    def stats(self) -> dict:
+        """Open subscriptions and message counters for this worker."""
+        return {
+            "backend": self.backend,
+            "channels": len(self._subscribers),
+            "subscribers": sum(len(listeners) for listeners in self._subscribers.values()),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped
+        }
+
+class PostgresBroker(InProcessBroker):
+    """Fans messages out across workers through Postgres LISTEN/NOTIFY.
+
+    Each worker holds one connection listening on PG_CHANNEL and delivers
+    what it hears to its local subscribers, including its own publishes.
+    If that connection drops, every subscription is closed so clients
+    reconnect and resync rather than silently missing messages.
+    """
+
+    backend = "postgres"
+
+    def __init__(self, url: str, queue_size: int):
+        try:
+            import asyncpg
+        except ImportError:
+            raise RuntimeError("NOTIFICATION_BROKER_URL points at Postgres but the asyncpg package is not installed")
+        super().__init__(queue_size)
+        self._asyncpg = asyncpg
+        self._url = url
+        self._connection = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def _connect(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._connection is None or self._connection.is_closed():
+                connection = await self._asyncpg.connect(self._url)
+                await connection.add_listener(PG_CHANNEL, self._on_notify)
+                connection.add_termination_listener(self._on_terminate)
+                self._connection = connection
+            return self._connection
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        event = json.loads(payload)
+        self._fan_out(event["channel"], event["message"])
+
+    def _on_terminate(self, connection) -> None:
+        self._connection = None
+        self._close_all()
+
+    async def subscribe(self, channel: str) -> Subscription:
+        await self._connect()
+        return await super().subscribe(channel)
+
+    async def publish(self, channel: str, message: dict) -> None:
+        connection = await self._connect()
+        payload = json.dumps({"channel": channel, "message": message}, default=str)
+        async with self._lock:
+            await connection.execute("SELECT pg_notify($1, $2)", PG_CHANNEL, payload)
+        self.published += 1
+
+    async def close(self) -> None:
+        self._close_all()
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+def create_broker(url: str, queue_size: int):
+    """Broker for a URL: postgres:// or postgresql:// for LISTEN/NOTIFY, anything else in-process."""
+    if url.startswith(("postgres://", "postgresql://")):
+        return PostgresBroker(url, queue_size)
+    return InProcessBroker(queue_size)
+
+notification_broker = create_broker(settings.NOTIFICATION_BROKER_URL, settings.NOTIFICATION_STREAM_QUEUE_SIZE)
+
+async def push_notifications(notifications: Iterable[dict]) -> None:
+    """Push newly stored notification rows to their users' open streams."""
+    for notification in notifications:
+        await notification_broker.publish(str(notification["user_id"]), notification)
@@ -0,0 +1,148 @@
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Optional
+from app.core.cache import invalidate_products
+from app.core.config import settings
+from app.core.counts import count_cache
+from app.core.outbox import outbox_dispatcher
+from app.core.supabase import call_rpc
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+class SubscriptionScheduler:
+    """Turns due subscriptions into orders in the background.
+
+    Each pass lists up to batch_size subscriptions due at clock() through
+    the due_subscriptions RPC and fulfills them one by one until none are
+    left. fulfill_subscription locks its row with FOR UPDATE SKIP LOCKED,
+    places the order and advances the date in its own transaction, so any
+    number of workers can run passes concurrently without placing an
+    order twice, and no lock is held longer than one order. The clock and
+    the RPC call are injectable so passes can run against a simulated time
+    and a plain Postgres connection (see test_scheduler.py).
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        batch_size: int,
+        delivery_fee: float,
+        clock: Callable[[], datetime] = utc_now,
+        rpc: Callable[[str, dict], Awaitable[Any]] = call_rpc
+    ):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.delivery_fee = delivery_fee
+        self.clock = clock
+        self.rpc = rpc
+        self.runs = 0
+        self.batches = 0
+        self.claimed = 0
+        self.placed = 0
+        self.failed = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.last_run_at: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> dict:
+        """Fulfill everything due now; returns this pass's totals and failures."""
+        now = self.clock()
+        started = time.perf_counter()
+        totals = {"claimed": 0, "placed": 0, "failed": 0, "failures": []}
+
+        try:
+            while True:
+                due = await self.rpc("due_subscriptions", {
+                    "p_now": now.isoformat(),
+                    "p_limit": self.batch_size
+                })
+                self.batches += 1
+
+                # Workers listing at the same moment get the same ids; taking
+                # them in a different order means they mostly fulfill different ones
+                random.shuffle(due)
+                placed = []
+                for subscription_id in due:
+                    result = await self.rpc("fulfill_subscription", {
+                        "p_subscription_id": subscription_id,
+                        "p_now": now.isoformat(),
+                        "p_delivery_fee": self.delivery_fee
+                    })
+                    if result["status"] == "skipped":
+                        continue
+                    totals["claimed"] += 1
+                    if result["status"] == "placed":
+                        totals["placed"] += 1
+                        placed.append(result)
+                    else:
+                        totals["failed"] += 1
+                        totals["failures"].append(result)
+
+                if placed:
+                    count_cache.invalidate("orders")
+                    outbox_dispatcher.wake()
+                    await invalidate_products(*{
+                        product_id for r in placed for product_id in r["order"].get("product_ids") or []
+                    })
+
+                # A short batch means nothing else is due (rows another worker is
+                # fulfilling right now are left out of the list)
+                if len(due) < self.batch_size:
+                    break
+        finally:
+            self.runs += 1
+            self.claimed += totals["claimed"]
+            self.placed += totals["placed"]
+            self.failed += totals["failed"]
+            self.busy_seconds += time.perf_counter() - started
+            self.last_run_at = now.isoformat()
+
+        return totals
+
+    async def _run_forever(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                self.errors += 1
+                print(f"Subscription scheduler error: {str(e)}")  # Log the error
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Start periodic passes on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self) -> None:
+        """Cancel periodic passes and wait for the current one to end."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        """Pass counters and throughput for this worker."""
+        return {
+            "running": self._task is not None,
+            "runs": self.runs,
+            "batches": self.batches,
+            "claimed": self.claimed,
+            "placed": self.placed,
+            "failed": self.failed,
+            "errors": self.errors,
+            "orders_per_second": round(self.placed / self.busy_seconds, 2) if self.busy_seconds else 0.0,
+            "last_run_at": self.last_run_at
+        }
+
+subscription_scheduler = SubscriptionScheduler(
+    interval=settings.SUBSCRIPTION_SCHEDULER_INTERVAL_SECONDS,
+    batch_size=settings.SUBSCRIPTION_SCHEDULER_BATCH_SIZE,
+    delivery_fee=settings.DELIVERY_FEE
+)
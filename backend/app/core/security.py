@@ -1,11 +1,34 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.google_tokens import google_token_verifier
+from app.core.jwt_keys import key_ring
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Optional faster JWT backend
+if settings.JWT_BACKEND == "pyjwt":
+    try:
+        import jwt as pyjwt
+    except ImportError:
+        raise RuntimeError("JWT_BACKEND is 'pyjwt' but the PyJWT package is not installed")
+    TOKEN_ERRORS = (JWTError, pyjwt.PyJWTError)
+else:
+    pyjwt = None
+    TOKEN_ERRORS = (JWTError,)
+
+if settings.ALGORITHM == "EdDSA" and not pyjwt:
+    raise RuntimeError("EdDSA tokens require JWT_BACKEND='pyjwt'")
+
+# Verified tokens -> claims, each kept until the token's own exp
+token_cache = TTLCache(maxsize=settings.TOKEN_CACHE_SIZE, ttl=0)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash."""
     return pwd_context.verify(plain_password, hashed_password)
@@ -14,6 +37,80 @@ def get_password_hash(password: str) -> str:
     """Generate password hash."""
     return pwd_context.hash(password)
 
+class PasswordHasherBusy(Exception):
+    """Raised when too many password operations are already waiting."""
+
+class PasswordHasher:
+    """Runs bcrypt off the event loop on a bounded thread pool.
+
+    bcrypt releases the GIL while hashing, so worker threads hash in
+    parallel. Calls beyond max_queue waiting jobs are rejected instead of
+    piling up latency for everyone.
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.active = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="bcrypt")
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def run(self, func: Callable, *args):
+        """Run a password function on the pool once a slot is free."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise PasswordHasherBusy()
+
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self.active -= 1
+            self.completed += 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        """Pool size, queue depth and counters."""
+        return {
+            "workers": self.workers,
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "rejected": self.rejected
+        }
+
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_QUEUE)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the password pool."""
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password on the password pool."""
+    return await password_hasher.run(get_password_hash, password)
+
+def encode_jwt(claims: Dict[str, Any]) -> str:
+    """Sign claims with the shared secret, or the active asymmetric key and its kid."""
+    if key_ring:
+        key, headers = key_ring.signing_key.decode(), {"kid": key_ring.active_kid}
+    else:
+        key, headers = settings.SECRET_KEY, None
+    if pyjwt:
+        return pyjwt.encode(claims, key, algorithm=settings.ALGORITHM, headers=headers)
+    return jwt.encode(claims, key, algorithm=settings.ALGORITHM, headers=headers)
+
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token."""
     to_encode = data.copy()
@@ -23,45 +120,56 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
     to_encode.update({"exp": expire, "type": "access"})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt
+    return encode_jwt(to_encode)
 
 def create_refresh_token(data: Dict[str, Any]) -> str:
     """Create JWT refresh token."""
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
     to_encode.update({"exp": expire, "type": "refresh"})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt
+    return encode_jwt(to_encode)
+
+def verify_jwt(token: str) -> Dict[str, Any]:
+    """Verify signature and expiry, accepting only the configured algorithm."""
+    key = settings.SECRET_KEY
+    if key_ring:
+        # Asymmetric tokens name their key; unknown or retired kids are rejected
+        header = pyjwt.get_unverified_header(token) if pyjwt else jwt.get_unverified_header(token)
+        kid = header.get("kid")
+        # The header is unverified, so a kid that is not a string is rejected rather than looked up
+        key = key_ring.verification_key(kid) if isinstance(kid, str) else None
+        if key is None:
+            raise JWTError("Unknown signing key")
+        key = key.decode()
+    if pyjwt:
+        return pyjwt.decode(token, key, algorithms=[settings.ALGORITHM])
+    return jwt.decode(token, key, algorithms=[settings.ALGORITHM])
 
 def decode_token(token: str) -> Optional[Dict[str, Any]]:
     """Decode and verify JWT token."""
+    cached = token_cache.get(token)
+    if cached is not None:
+        return dict(cached)
+    
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
-    except JWTError:
+        payload = verify_jwt(token)
+    except TOKEN_ERRORS:
         return None
+    
+    # Only tokens with an exp are cached, and never past it
+    if isinstance(payload.get("exp"), (int, float)):
+        token_cache.set(token, payload, ttl=payload["exp"] - time.time())
+    return dict(payload)
 
-def verify_google_token(token: str) -> Optional[Dict[str, Any]]:
+async def verify_google_token(token: str) -> Optional[Dict[str, Any]]:
     """Verify Google OAuth token."""
-    from google.auth.transport import requests
-    from google.oauth2 import id_token
-    
-    try:
-        idinfo = id_token.verify_oauth2_token(
-            token,
-            requests.Request(),
-            settings.GOOGLE_CLIENT_ID
-        )
-        
-        if idinfo['iss'] not in ['accounts.google.com', 'https://accounts.google.com']:
-            return None
-            
-        return {
-            "email": idinfo.get("email"),
-            "name": idinfo.get("name"),
-            "picture": idinfo.get("picture"),
-            "google_id": idinfo.get("sub")
-        }
-    except ValueError:
+    idinfo = await google_token_verifier.verify_async(token)
+    if not idinfo:
         return None
+    
+    return {
+        "email": idinfo.get("email"),
+        "name": idinfo.get("name"),
+        "picture": idinfo.get("picture"),
+        "google_id": idinfo.get("sub")
+    }
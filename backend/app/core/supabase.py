@@ -1,14 +1,132 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+from postgrest import SyncPostgrestClient
+from postgrest.utils import SyncClient as PostgrestSession
 from supabase import create_client, Client
+from supabase._sync.client import SyncClient
+from supabase.lib.client_options import ClientOptions
 from app.core.config import settings
 
+class PooledTransport(httpx.HTTPTransport):
+    """Keep-alive HTTP transport that tracks pool usage for metrics."""
+
+    def __init__(self, limits: httpx.Limits, **kwargs):
+        super().__init__(limits=limits, **kwargs)
+        self.max_connections = limits.max_connections
+        self.in_flight = 0
+        self.requests_total = 0
+        self._lock = threading.Lock()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        with self._lock:
+            self.in_flight += 1
+            self.requests_total += 1
+        try:
+            return super().handle_request(request)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def stats(self) -> dict:
+        """Snapshot of open, in-use and waiting connections."""
+        connections = self._pool.connections
+        idle = sum(1 for connection in connections if connection.is_idle())
+        in_use = len(connections) - idle
+        return {
+            "max_connections": self.max_connections,
+            "open": len(connections),
+            "in_use": in_use,
+            "idle": idle,
+            "waiting": max(0, self.in_flight - in_use),
+            "requests_total": self.requests_total
+        }
+
+def create_db_transport() -> PooledTransport:
+    """Create the shared PostgREST transport from settings."""
+    return PooledTransport(
+        limits=httpx.Limits(
+            max_connections=settings.DB_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.DB_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.DB_KEEPALIVE_EXPIRY
+        ),
+        http2=settings.DB_HTTP2,
+        retries=settings.DB_CONNECT_RETRIES
+    )
+
+def create_db_timeout() -> httpx.Timeout:
+    """Per-request timeouts for PostgREST calls."""
+    return httpx.Timeout(
+        settings.DB_REQUEST_TIMEOUT,
+        connect=settings.DB_CONNECT_TIMEOUT,
+        pool=settings.DB_POOL_TIMEOUT
+    )
+
+db_transport = create_db_transport()
+
+class PooledPostgrestClient(SyncPostgrestClient):
+    """PostgREST client whose session uses the shared pooled transport."""
+
+    def create_session(self, base_url, headers, timeout) -> PostgrestSession:
+        return PostgrestSession(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            transport=db_transport
+        )
+
+class PooledSupabaseClient(SyncClient):
+    """Supabase client that routes PostgREST traffic through db_transport."""
+
+    @staticmethod
+    def _init_postgrest_client(rest_url, headers, schema, timeout=None) -> SyncPostgrestClient:
+        return PooledPostgrestClient(rest_url, headers=headers, schema=schema, timeout=timeout)
+
 def get_supabase_client() -> Client:
     """Get Supabase client instance."""
     return create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
 
 def get_supabase_admin_client() -> Client:
     """Get Supabase admin client with service role key."""
-    return create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
+    options = ClientOptions(
+        postgrest_client_timeout=create_db_timeout(),
+        storage_client_timeout=settings.STORAGE_REQUEST_TIMEOUT
+    )
+    return PooledSupabaseClient.create(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY, options)
 
 # Singleton instances
 supabase_client = get_supabase_client()
 supabase_admin_client = get_supabase_admin_client()
+
+# Bounded pool for the blocking Supabase client, so a slow PostgREST
+# round trip only occupies a pool thread instead of the event loop.
+db_executor = ThreadPoolExecutor(
+    max_workers=settings.DB_POOL_WORKERS,
+    thread_name_prefix="supabase"
+)
+
+async def run_in_db_pool(func, *args, **kwargs):
+    """Run a blocking Supabase call on the database thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, functools.partial(func, *args, **kwargs))
+
+async def run_query(query):
+    """Execute a PostgREST query builder without blocking the event loop."""
+    return await run_in_db_pool(query.execute)
+
+async def call_rpc(function: str, params: dict):
+    """Call a database function with the admin client and return its result."""
+    result = await run_query(supabase_admin_client.rpc(function, params))
+    return result.data
+
+def get_db_pool_metrics() -> dict:
+    """Connection pool and executor usage for the admin client."""
+    return {
+        "connections": db_transport.stats(),
+        "executor": {
+            "max_workers": settings.DB_POOL_WORKERS,
+            "queued": db_executor._work_queue.qsize()
+        }
+    }
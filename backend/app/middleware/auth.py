@@ -1,39 +1,74 @@
 from fastapi import Request, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional
+from app.core.cache import TTLCache
+from app.core.config import settings
 from app.core.security import decode_token
-from app.core.supabase import supabase_admin_client
+from app.core.supabase import supabase_admin_client, run_query
 
 security = HTTPBearer()
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials) -> dict:
-    """Get current authenticated user from token."""
-    token = credentials.credentials
-    
-    payload = decode_token(token)
+# Authenticated users by id, so repeat requests skip the users lookup
+user_cache = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
+
+def invalidate_user(user_id: str):
+    """Drop a cached user after a write to the users table."""
+    user_cache.delete(user_id)
+
+def get_token_payload(credentials: HTTPAuthorizationCredentials) -> dict:
+    """Decode the bearer token and ensure it names a user."""
+    payload = decode_token(credentials.credentials)
     if not payload:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token"
         )
-    
-    user_id = payload.get("sub")
-    if not user_id:
+
+    if not payload.get("sub"):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token payload"
         )
-    
+
+    return payload
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials, fresh: bool = False) -> dict:
+    """Get current authenticated user from token.
+
+    The cache is per worker, so another worker's profile update can take up
+    to USER_CACHE_TTL_SECONDS to show here. Pass fresh=True where the caller
+    returns the profile itself, to read it from the database (and refresh
+    the cached copy) instead.
+    """
+    payload = get_token_payload(credentials)
+    user_id = payload["sub"]
+
+    cached = None if fresh else user_cache.get(user_id)
+    if cached is not None:
+        return dict(cached)
+
     # Fetch user from database
-    result = supabase_admin_client.table("users").select("*").eq("id", user_id).execute()
-    
+    result = await run_query(supabase_admin_client.table("users").select("*").eq("id", user_id))
+
     if not result.data:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-    
-    return result.data[0]
+
+    user_cache.set(user_id, result.data[0])
+    return dict(result.data[0])
+
+async def get_current_user_claims(credentials: HTTPAuthorizationCredentials) -> dict:
+    """Get the caller's id and role, trusting the token's role claim when enabled."""
+    if not settings.AUTH_TRUST_ROLE_CLAIM:
+        return await get_current_user(credentials)
+
+    payload = get_token_payload(credentials)
+    if not payload.get("role"):
+        return await get_current_user(credentials)
+
+    return {"id": payload["sub"], "role": payload["role"]}
 
 async def get_current_active_user(credentials: HTTPAuthorizationCredentials) -> dict:
     """Get current active user."""
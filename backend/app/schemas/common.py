@@ -37,8 +37,9 @@ def create_paginated_response(
     items: List[Any],
     page: int,
     per_page: int,
-    total: int,
-    message: str = "Success"
+    total: Optional[int],
+    message: str = "Success",
+    next_cursor: Optional[str] = None
 ) -> dict:
     """Create paginated API response."""
     return {
@@ -49,7 +50,8 @@ def create_paginated_response(
             "page": page,
             "perPage": per_page,
             "total": total,
-            "totalPages": (total + per_page - 1) // per_page
+            "totalPages": (total + per_page - 1) // per_page if total is not None else None,
+            "nextCursor": next_cursor
         },
         "errors": None
     }
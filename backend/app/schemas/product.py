@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, validator
-from typing import Optional, Literal
+from typing import Optional, Literal, Dict
 from datetime import datetime, date
 from decimal import Decimal
 
@@ -15,8 +15,11 @@ class ProductBase(BaseModel):
     is_available: bool = True
     harvest_date: Optional[date] = None
 
+ImageSize = Literal["thumb", "card", "full"]
+
 class ProductCreate(ProductBase):
     image_url: Optional[str] = None
+    image_variants: Optional[Dict[ImageSize, str]] = None  # Variant URLs returned by /upload/product-image
 
 class ProductUpdate(BaseModel):
     name: Optional[str] = None
@@ -29,12 +32,14 @@ class ProductUpdate(BaseModel):
     is_available: Optional[bool] = None
     harvest_date: Optional[date] = None
     image_url: Optional[str] = None
+    image_variants: Optional[Dict[ImageSize, str]] = None
 
 class ProductResponse(ProductBase):
     id: str
     farmer_id: str
     farmer: Optional[str] = None  # Farmer name
     image_url: Optional[str] = None
+    image_variants: Optional[Dict[ImageSize, str]] = None
     rating: Decimal
     created_at: datetime
     updated_at: datetime
@@ -50,6 +55,14 @@ class CartItemAdd(BaseModel):
 class CartItemUpdate(BaseModel):
     quantity: int = Field(..., gt=0)
 
+class CartBatchItem(BaseModel):
+    product_id: str
+    quantity: int = Field(..., gt=0)
+    mode: Literal["add", "set"] = "add"  # add to the current quantity, or replace it
+
+class CartBatchRequest(BaseModel):
+    items: list[CartBatchItem] = Field(..., min_length=1, max_length=100)
+
 class CartItemResponse(BaseModel):
     id: str
     product_id: str
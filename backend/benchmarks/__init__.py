@@ -0,0 +1 @@
+# AgriConnect Benchmarks
@@ -0,0 +1,69 @@
+"""
+Per-request authentication overhead
+Times each step a bearer token goes through on an authenticated request:
+signature verification with the configured JWT backend, decode_token on
+a token-cache miss and hit, and get_current_user answered from the user
+cache. Set JWT_BACKEND=pyjwt (with PyJWT installed) and run again to
+compare backends.
+
+    python -m benchmarks.auth [--calls 20000]
+
+Run from backend/ so the app settings load from .env
+"""
+
+import argparse
+import asyncio
+import time
+from fastapi.security import HTTPAuthorizationCredentials
+from benchmarks.harness import print_table
+from app.core.config import settings
+from app.core.security import create_access_token, decode_token, verify_jwt, token_cache
+from app.middleware.auth import get_current_user, user_cache
+
+USER = {"id": "00000000-0000-0000-0000-000000000001", "email": "farmer@example.com", "role": "farmer"}
+
+def per_call(func, arguments) -> float:
+    """Microseconds per call of func over each argument"""
+    started = time.perf_counter()
+    for argument in arguments:
+        func(argument)
+    return (time.perf_counter() - started) / len(arguments) * 1_000_000
+
+async def per_await(func, arguments) -> float:
+    started = time.perf_counter()
+    for argument in arguments:
+        await func(argument)
+    return (time.perf_counter() - started) / len(arguments) * 1_000_000
+
+def main(calls: int):
+    print(f"\n🔍 Auth overhead per request, {calls} calls per row "
+          f"({settings.ALGORITHM}, JWT_BACKEND={settings.JWT_BACKEND}, token cache {settings.TOKEN_CACHE_SIZE})")
+    # Distinct tokens, so every cache-miss row really misses
+    tokens = [create_access_token({"sub": USER["id"], "role": USER["role"], "n": n}) for n in range(calls)]
+    token = tokens[0]
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    rows = [["verify_jwt (signature + exp)", per_call(verify_jwt, tokens)]]
+    token_cache.clear()
+    rows.append(["decode_token, cache miss", per_call(decode_token, tokens)])
+    rows.append(["decode_token, cache hit", per_call(decode_token, [token] * calls)])
+
+    user_cache.set(USER["id"], USER)
+    rows.append(["get_current_user, cached user", asyncio.run(per_await(get_current_user, [credentials] * calls))])
+
+    try:
+        import jwt as pyjwt
+    except ImportError:
+        pyjwt = None
+    if pyjwt and settings.ALGORITHM.startswith("HS") and settings.JWT_BACKEND != "pyjwt":
+        rows.append(["pyjwt.decode, for comparison", per_call(
+            lambda token: pyjwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]), tokens
+        )])
+
+    print_table(["step", "us/call"], [[step, micros] for step, micros in rows])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+    main(args.calls)
@@ -0,0 +1,70 @@
+"""
+Catalog throughput under concurrent requests
+Every PostgREST call goes to a local stand-in that answers after --delay
+seconds, like a remote database. "pooled" runs the app as it ships, with
+queries on the database thread pool; "inline" calls execute() on the
+event loop as the handlers used to, so one slow round trip stalls every
+other request. Catalog and count caches are off so each request reaches
+the stand-in.
+
+    python -m benchmarks.concurrency [--delay 0.02] [--requests 400]
+
+Run from backend/
+"""
+
+import argparse
+import asyncio
+import time
+import httpx
+from benchmarks.harness import StandIn, load_app, sample_product, summarize, print_table
+
+CONCURRENCY = (1, 8, 32, 64)
+
+async def inline_db_call(func, *args, **kwargs):
+    """run_in_db_pool as it was before the thread pool: blocking on the event loop"""
+    return func(*args, **kwargs)
+
+async def run_level(client: httpx.AsyncClient, concurrency: int, total: int):
+    slots = asyncio.Semaphore(concurrency)
+    latencies, failures = [], 0
+
+    async def one():
+        nonlocal failures
+        async with slots:
+            started = time.perf_counter()
+            response = await client.get("/api/v1/products", params={"perPage": 20, "count": "none"})
+            latencies.append(time.perf_counter() - started)
+            if not response.json().get("success"):
+                failures += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return total / (time.perf_counter() - started), summarize(latencies), failures
+
+async def main(delay: float, total: int):
+    standin = StandIn(delay, routes={"products": [sample_product(n) for n in range(20)]}).start()
+    app = load_app(standin.url, CATALOG_CACHE_TTL_SECONDS=0, COUNT_CACHE_TTL_SECONDS=0)
+    import app.core.supabase as supabase_module
+    pooled_db_call = supabase_module.run_in_db_pool
+
+    print(f"\n🔍 GET /products, {total} requests per level, {delay * 1000:.0f} ms per PostgREST call "
+          f"({supabase_module.settings.DB_POOL_WORKERS} pool threads)")
+    rows = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for mode, db_call in (("pooled", pooled_db_call), ("inline", inline_db_call)):
+            supabase_module.run_in_db_pool = db_call
+            for concurrency in CONCURRENCY:
+                throughput, latency, failures = await run_level(client, concurrency, total)
+                rows.append([mode, concurrency, throughput, latency["p50"], latency["p99"], failures])
+    supabase_module.run_in_db_pool = pooled_db_call
+    standin.stop()
+
+    print_table(["mode", "concurrency", "req/s", "p50 ms", "p99 ms", "failed"], rows)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--delay", type=float, default=0.02, help="seconds per PostgREST call")
+    parser.add_argument("--requests", type=int, default=400, help="requests per concurrency level")
+    args = parser.parse_args()
+    asyncio.run(main(args.delay, args.requests))
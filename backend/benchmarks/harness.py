@@ -0,0 +1,147 @@
+"""
+Shared pieces for the benchmarks: a stand-in for PostgREST and Supabase
+Storage, the app configured against it, and latency summaries.
+"""
+
+import json
+import os
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+import httpx
+
+class StandIn:
+    """Local HTTP server that answers every Supabase request after a fixed delay.
+
+    routes maps a path segment (a table, an rpc function name or "object"
+    for Storage uploads) to the JSON body returned for it; anything else
+    gets an empty list. The delay stands in for the round trip to a remote
+    database.
+    """
+
+    def __init__(self, delay: float, routes: dict = None):
+        self.delay = delay
+        self.routes = routes or {}
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def _answer(self):
+                length = int(self.headers.get("content-length") or 0)
+                if length:
+                    self.rfile.read(length)
+                with standin._lock:
+                    standin.requests += 1
+                time.sleep(standin.delay)
+
+                segments = urlparse(self.path).path.split("/")
+                body = next((body for name, body in standin.routes.items() if name in segments), [])
+                raw = json.dumps(body).encode()
+                rows = len(body) if isinstance(body, list) else 1
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.send_header("Content-Range", f"0-{max(rows - 1, 0)}/{rows}")
+                self.end_headers()
+                self.wfile.write(raw)
+
+            do_GET = do_POST = do_PATCH = do_PUT = do_DELETE = _answer
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "StandIn":
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+def load_app(supabase_url: str, **overrides):
+    """Import the app with Supabase pointed at supabase_url.
+
+    overrides are Settings values, applied through the environment, so this
+    must run before anything imports app.core.config.
+    """
+    os.environ["SUPABASE_URL"] = supabase_url
+    os.environ.setdefault("SUPABASE_KEY", "stand.in.key")
+    os.environ.setdefault("SUPABASE_SERVICE_KEY", "stand.in.key")
+    for name, value in overrides.items():
+        os.environ[name] = str(value)
+    from main import app
+    return app
+
+def sample_product(n: int) -> dict:
+    """A products row as the catalog endpoints select it."""
+    return {
+        "id": f"10000000-0000-0000-0000-{n:012d}",
+        "farmer_id": "00000000-0000-0000-0000-000000000001",
+        "name": f"Fresh Tomatoes {n}",
+        "price": 4.99,
+        "unit": "lb",
+        "category": "Vegetables",
+        "description": "Organic vine-ripened tomatoes",
+        "location": "California",
+        "image_url": None,
+        "image_variants": None,
+        "stock_quantity": 100,
+        "is_available": True,
+        "harvest_date": None,
+        "rating": 4.5,
+        "created_at": "2026-01-05T09:00:00+00:00",
+        "updated_at": "2026-01-05T09:00:00+00:00",
+        "users": {"full_name": "Test Farmer", "farm_name": "Green Valley Farm"}
+    }
+
+async def loop_requests(client: httpx.AsyncClient, deadline: float, send, latencies: list, outcomes: dict):
+    """Send requests one after another until deadline, recording latencies and outcomes.
+
+    send(client) makes one request; outcomes counts "ok" for a successful
+    response and the message of each failed one.
+    """
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = await send(client)
+        latencies.append(time.perf_counter() - started)
+        outcome = "ok" if response.json().get("success") else response.json().get("message", "failed")
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+def get_catalog(client: httpx.AsyncClient):
+    """One page of the catalog, without a count, for loop_requests."""
+    return client.get("/api/v1/products", params={"perPage": 20, "count": "none"})
+
+def summarize(seconds: list) -> dict:
+    """p50/p95/p99/max of latencies given in seconds, in milliseconds."""
+    ordered = sorted(seconds)
+    if not ordered:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    def at(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+    return {"p50": statistics.median(ordered) * 1000, "p95": at(0.95), "p99": at(0.99), "max": ordered[-1] * 1000}
+
+def print_table(headers: list, rows: list) -> None:
+    """Print rows as right-aligned columns; floats get one decimal."""
+    cells = [[f"{value:.1f}" if isinstance(value, float) else str(value) for value in row] for row in rows]
+    widths = [max(len(str(header)), *(len(row[i]) for row in cells)) for i, header in enumerate(headers)]
+    print("   " + "  ".join(str(header).rjust(width) for header, width in zip(headers, widths)))
+    for row in cells:
+        print("   " + "  ".join(value.rjust(width) for value, width in zip(row, widths)))
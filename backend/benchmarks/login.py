@@ -0,0 +1,77 @@
+"""
+Login throughput with catalog traffic alongside
+Runs --catalog-clients looping GET /products against a PostgREST stand-in,
+first alone, then next to --login-clients looping POST /auth/login. Each
+login checks a real bcrypt hash. "pooled" runs the password pool as it
+ships; "inline" verifies on the event loop as login used to, which stalls
+every catalog request while a hash is checked.
+
+    python -m benchmarks.login [--seconds 10] [--login-clients 8]
+
+Run from backend/
+"""
+
+import argparse
+import asyncio
+import time
+import httpx
+from benchmarks.harness import StandIn, load_app, loop_requests, get_catalog, sample_product, summarize, print_table
+
+PASSWORD = "password123"
+
+async def inline_password_job(func, *args):
+    """password_hasher.run as it was before the pool: blocking on the event loop"""
+    return func(*args)
+
+def post_login(client):
+    return client.post("/api/v1/auth/login", json={"email": "farmer@example.com", "password": PASSWORD})
+
+async def run_phase(client, seconds: float, catalog_clients: int, login_clients: int):
+    deadline = time.perf_counter() + seconds
+    catalog_latencies, catalog_outcomes = [], {}
+    login_latencies, login_outcomes = [], {}
+    await asyncio.gather(
+        *(loop_requests(client, deadline, get_catalog, catalog_latencies, catalog_outcomes) for _ in range(catalog_clients)),
+        *(loop_requests(client, deadline, post_login, login_latencies, login_outcomes) for _ in range(login_clients))
+    )
+    return catalog_latencies, login_outcomes
+
+async def main(seconds: float, catalog_clients: int, login_clients: int, delay: float):
+    from passlib.context import CryptContext
+    password_hash = CryptContext(schemes=["bcrypt"]).hash(PASSWORD)
+    user = {
+        "id": "00000000-0000-0000-0000-000000000001", "email": "farmer@example.com", "full_name": "Test Farmer",
+        "role": "farmer", "password_hash": password_hash
+    }
+    standin = StandIn(delay, routes={"products": [sample_product(n) for n in range(20)], "users": [user]}).start()
+    app = load_app(standin.url, CATALOG_CACHE_TTL_SECONDS=0, COUNT_CACHE_TTL_SECONDS=0)
+    from app.core.security import password_hasher
+
+    print(f"\n🔍 {catalog_clients} catalog clients, {login_clients} login clients, {seconds:.0f}s per phase "
+          f"({password_hasher.workers} bcrypt threads)")
+    rows = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        phases = (("catalog only", None, 0), ("pooled", None, login_clients), ("inline", inline_password_job, login_clients))
+        for label, password_job, logins in phases:
+            if password_job:
+                password_hasher.run = password_job
+            catalog_latencies, login_outcomes = await run_phase(client, seconds, catalog_clients, logins)
+            vars(password_hasher).pop("run", None)
+
+            latency = summarize(catalog_latencies)
+            logins_per_second = login_outcomes.get("ok", 0) / seconds
+            refused = sum(count for outcome, count in login_outcomes.items() if outcome != "ok")
+            rows.append([label, logins_per_second, refused, len(catalog_latencies) / seconds, latency["p50"], latency["p99"], latency["max"]])
+    standin.stop()
+
+    print_table(["phase", "logins/s", "logins refused", "catalog req/s", "catalog p50 ms", "p99 ms", "max ms"], rows)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=10, help="length of each phase")
+    parser.add_argument("--catalog-clients", type=int, default=4)
+    parser.add_argument("--login-clients", type=int, default=8)
+    parser.add_argument("--delay", type=float, default=0.01, help="seconds per PostgREST call")
+    args = parser.parse_args()
+    asyncio.run(main(args.seconds, args.catalog_clients, args.login_clients, args.delay))
@@ -0,0 +1,173 @@
+"""
+Idle notification streams
+Starts the app under uvicorn in a subprocess and opens --streams
+concurrent GET /notifications/stream connections, one user each, then
+reports the server's resident memory per open stream and the CPU it
+spends over --hold seconds keeping them alive. Then times the in-process
+broker publishing to one of that many subscribed users and to one user
+with that many open tabs.
+
+    python -m benchmarks.streams [--streams 10000] [--hold 30]
+
+Run from backend/. The streams trust the token's role claim
+(AUTH_TRUST_ROLE_CLAIM), so opening them needs no database; each side
+needs --streams file descriptors, and the soft limit is raised up to the
+hard limit
+"""
+
+import argparse
+import asyncio
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+from benchmarks.harness import StandIn, print_table
+
+def user_id(n: int) -> str:
+    return f"00000000-0000-0000-0000-{n:012d}"
+
+def raise_file_limit(needed: int) -> int:
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    target = hard if hard == resource.RLIM_INFINITY else min(hard, max(soft, needed))
+    resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+    return target
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+def cpu_seconds(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as stat:
+        fields = stat.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+async def wait_for_server(port: int, process: subprocess.Popen):
+    while True:
+        if process.poll() is not None:
+            raise RuntimeError("uvicorn exited before accepting connections")
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+
+async def open_stream(port: int, token: str):
+    """Open one stream and wait for its first event, so the server holds a subscription"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(
+        f"GET /api/v1/notifications/stream HTTP/1.1\r\nHost: benchmark\r\n"
+        f"Authorization: Bearer {token}\r\nAccept: text/event-stream\r\n\r\n".encode()
+    )
+    await writer.drain()
+    head = await reader.readuntil(b"retry:")
+    if b"text/event-stream" not in head:
+        raise RuntimeError(f"stream refused: {head[:200]!r}")
+    return writer
+
+async def measure_streams(streams: int, hold: float, batch: int, create_access_token):
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning", "--no-access-log",
+         "--backlog", str(batch * 2)],
+        env={**os.environ, "AUTH_TRUST_ROLE_CLAIM": "true"}
+    )
+    writers = []
+    try:
+        await wait_for_server(port, process)
+        tokens = [create_access_token({"sub": user_id(n), "role": "consumer"}) for n in range(streams)]
+        baseline = rss_mb(process.pid)
+        rows = [[0, baseline, 0.0, "-"]]
+        checkpoints = sorted({streams * step // 4 for step in range(1, 5)})
+
+        started = time.perf_counter()
+        for checkpoint in checkpoints:
+            while len(writers) < checkpoint:
+                count = min(batch, checkpoint - len(writers))
+                offset = len(writers)
+                writers += await asyncio.gather(*(open_stream(port, tokens[offset + n]) for n in range(count)))
+            rss = rss_mb(process.pid)
+            rows.append([checkpoint, rss, rss - baseline, (rss - baseline) * 1024 / checkpoint])
+        opened = time.perf_counter() - started
+
+        cpu_before = cpu_seconds(process.pid)
+        await asyncio.sleep(hold)
+        idle_cpu = cpu_seconds(process.pid) - cpu_before
+    finally:
+        # uvicorn waits for open streams on shutdown, so let the closes reach it first
+        for writer in writers:
+            writer.close()
+        await asyncio.gather(*(writer.wait_closed() for writer in writers), return_exceptions=True)
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+    return rows, opened, idle_cpu
+
+async def measure_fan_out(streams: int, publishes: int):
+    from app.core.pubsub import InProcessBroker
+    message = {"id": "30000000-0000-0000-0000-000000000001", "title": "Order shipped", "type": "order"}
+    rows = []
+
+    broker = InProcessBroker(publishes + 1)
+    for n in range(streams):
+        await broker.subscribe(user_id(n))
+    started = time.perf_counter()
+    for n in range(publishes):
+        await broker.publish(user_id(n % streams), message)
+    rows.append([f"one of {streams} users", (time.perf_counter() - started) / publishes * 1_000_000])
+
+    broker = InProcessBroker(publishes + 1)
+    for _ in range(streams):
+        await broker.subscribe(user_id(0))
+    started = time.perf_counter()
+    for _ in range(publishes):
+        await broker.publish(user_id(0), message)
+    rows.append([f"one user with {streams} streams", (time.perf_counter() - started) / publishes * 1_000_000])
+    return rows
+
+def main(streams: int, hold: float, batch: int, publishes: int):
+    limit = raise_file_limit(streams + 1000)
+    if limit < streams + 100:
+        raise SystemExit(f"Open file limit is {limit}; raise the hard limit (ulimit -Hn) above {streams + 100}")
+
+    # The app is imported here only to sign tokens and for the broker timing; the
+    # server's outbox dispatcher polls the stand-in and finds nothing to send
+    standin = StandIn(0, routes={"dispatch_outbox_events": {"claimed": 0, "notifications": []}}).start()
+    os.environ["SUPABASE_URL"] = standin.url
+    os.environ.setdefault("SUPABASE_KEY", "stand.in.key")
+    os.environ.setdefault("SUPABASE_SERVICE_KEY", "stand.in.key")
+    from app.core.config import settings
+    from app.core.security import create_access_token
+
+    print(f"\n🔍 Opening {streams} idle notification streams, holding them {hold:.0f}s "
+          f"(heartbeat every {settings.NOTIFICATION_STREAM_HEARTBEAT_SECONDS:.0f}s)")
+    rows, opened, idle_cpu = asyncio.run(measure_streams(streams, hold, batch, create_access_token))
+    print_table(["open streams", "server RSS MB", "added MB", "KB per stream"], rows)
+    print(f"   opened in {opened:.1f}s; {idle_cpu:.2f}s server CPU over {hold:.0f}s idle "
+          f"({idle_cpu / hold * 100:.1f}% of a core)")
+
+    print(f"\n🔍 Broker fan-out, {publishes} publishes")
+    print_table(["publish to", "us/publish"], asyncio.run(measure_fan_out(streams, publishes)))
+    standin.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--streams", type=int, default=10000)
+    parser.add_argument("--hold", type=float, default=30, help="seconds to hold the streams open while idle")
+    parser.add_argument("--batch", type=int, default=200, help="streams opened concurrently")
+    parser.add_argument("--publishes", type=int, default=20, help="publishes per broker timing")
+    args = parser.parse_args()
+    main(args.streams, args.hold, args.batch, args.publishes)
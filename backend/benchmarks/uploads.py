@@ -0,0 +1,98 @@
+"""
+Catalog latency during product-image uploads
+Runs --catalog-clients looping GET /products against a PostgREST and
+Storage stand-in, first alone, then next to --upload-clients looping
+POST /upload/product-image with a generated 3000x2000 JPEG. "pooled" runs
+the image process pool as it ships; "inline" decodes and encodes on the
+event loop, which stalls every catalog request while an image is resized.
+
+    python -m benchmarks.uploads [--seconds 10] [--upload-clients 4]
+
+Run from backend/
+"""
+
+import argparse
+import asyncio
+import io
+import time
+import httpx
+from PIL import Image
+from benchmarks.harness import StandIn, load_app, loop_requests, get_catalog, sample_product, summarize, print_table
+
+FARMER = {"id": "00000000-0000-0000-0000-000000000001", "email": "farmer@example.com", "full_name": "Test Farmer", "role": "farmer"}
+
+async def inline_image_job(func, *args):
+    """image_processor.run without the pool: blocking on the event loop"""
+    return func(*args)
+
+def generate_photo(width: int = 3000, height: int = 2000) -> bytes:
+    """A JPEG about the size of a phone photo, with enough detail to be costly to encode"""
+    detail = Image.effect_noise((width // 4, height // 4), 40).resize((width, height))
+    red = Image.linear_gradient("L").resize((width, height))
+    green = Image.radial_gradient("L").resize((width, height))
+    output = io.BytesIO()
+    Image.merge("RGB", (red, green, detail)).save(output, format="JPEG", quality=90)
+    return output.getvalue()
+
+def upload_image(token: str, photo: bytes):
+    def send(client):
+        return client.post(
+            "/api/v1/upload/product-image",
+            files={"file": ("photo.jpg", photo, "image/jpeg")},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+    return send
+
+async def run_phase(client, seconds: float, catalog_clients: int, upload_clients: int, send_upload):
+    deadline = time.perf_counter() + seconds
+    catalog_latencies, catalog_outcomes = [], {}
+    upload_latencies, upload_outcomes = [], {}
+    await asyncio.gather(
+        *(loop_requests(client, deadline, get_catalog, catalog_latencies, catalog_outcomes) for _ in range(catalog_clients)),
+        *(loop_requests(client, deadline, send_upload, upload_latencies, upload_outcomes) for _ in range(upload_clients))
+    )
+    return catalog_latencies, upload_outcomes
+
+async def main(seconds: float, catalog_clients: int, upload_clients: int, delay: float):
+    photo = generate_photo()
+    standin = StandIn(delay, routes={
+        "products": [sample_product(n) for n in range(20)],
+        "users": [FARMER],
+        "object": {"Key": "products/photo.webp"}
+    }).start()
+    app = load_app(standin.url, CATALOG_CACHE_TTL_SECONDS=0, COUNT_CACHE_TTL_SECONDS=0)
+    from app.core.images import image_processor
+    from app.core.security import create_access_token
+    send_upload = upload_image(create_access_token({"sub": FARMER["id"], "role": FARMER["role"]}), photo)
+
+    print(f"\n🔍 {catalog_clients} catalog clients, {upload_clients} upload clients of a {len(photo) / 1e6:.1f}MB "
+          f"3000x2000 JPEG, {seconds:.0f}s per phase ({image_processor.workers} image workers)")
+    rows = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=60) as client:
+        # Start the worker processes before timing anything
+        await send_upload(client)
+
+        phases = (("catalog only", None, 0), ("pooled", None, upload_clients), ("inline", inline_image_job, upload_clients))
+        for label, image_job, uploads in phases:
+            if image_job:
+                image_processor.run = image_job
+            catalog_latencies, upload_outcomes = await run_phase(client, seconds, catalog_clients, uploads, send_upload)
+            vars(image_processor).pop("run", None)
+
+            latency = summarize(catalog_latencies)
+            uploads_per_second = upload_outcomes.get("ok", 0) / seconds
+            refused = sum(count for outcome, count in upload_outcomes.items() if outcome != "ok")
+            rows.append([label, uploads_per_second, refused, len(catalog_latencies) / seconds, latency["p50"], latency["p99"], latency["max"]])
+    standin.stop()
+
+    print_table(["phase", "uploads/s", "uploads refused", "catalog req/s", "catalog p50 ms", "p99 ms", "max ms"], rows)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=10, help="length of each phase")
+    parser.add_argument("--catalog-clients", type=int, default=4)
+    parser.add_argument("--upload-clients", type=int, default=4)
+    parser.add_argument("--delay", type=float, default=0.01, help="seconds per PostgREST or Storage call")
+    args = parser.parse_args()
+    asyncio.run(main(args.seconds, args.catalog_clients, args.upload_clients, args.delay))
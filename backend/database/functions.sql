@@ -9,7 +9,12 @@ RETURNS VOID AS $$
 BEGIN
     UPDATE products
     SET stock_quantity = stock_quantity - amount
-    WHERE id = product_id;
+    WHERE id = product_id
+        AND stock_quantity >= amount;
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'INSUFFICIENT_STOCK' USING DETAIL = product_id::TEXT;
+    END IF;
 END;
 $$ LANGUAGE plpgsql;
 
@@ -100,6 +105,837 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+-- ============================================
+-- FUNCTION: Place Order
+-- Shared by checkout and subscription fulfillment. Validates availability
+-- and stock under row locks, creates the order and its items and
+-- decrements stock.
+-- p_items is a JSON array of {product_id, quantity}.
+-- The order number comes from the orders.order_number default.
+-- ============================================
+CREATE OR REPLACE FUNCTION place_order(
+    p_user_id UUID,
+    p_items JSONB,
+    p_delivery_type VARCHAR,
+    p_delivery_address_id UUID DEFAULT NULL,
+    p_delivery_fee NUMERIC DEFAULT 0,
+    p_promo_code VARCHAR DEFAULT NULL,
+    p_discount_rate NUMERIC DEFAULT 0
+)
+RETURNS JSON AS $$
+DECLARE
+    v_order_id UUID := uuid_generate_v4();
+    v_order_number VARCHAR;
+    v_item_count INTEGER;
+    v_subtotal NUMERIC(10, 2);
+    v_discount NUMERIC(10, 2);
+    v_total NUMERIC(10, 2);
+    v_unavailable_product VARCHAR;
+    v_short_product VARCHAR;
+    v_product_ids UUID[];
+BEGIN
+    -- Lock the products in a stable order so concurrent orders
+    -- serialize on shared products instead of deadlocking
+    PERFORM 1
+    FROM products
+    WHERE id IN (SELECT i.product_id FROM jsonb_to_recordset(p_items) AS i(product_id UUID, quantity INTEGER))
+    ORDER BY id
+    FOR UPDATE;
+
+    SELECT COUNT(*), COALESCE(SUM(p.price * i.quantity), 0), array_agg(p.id)
+    INTO v_item_count, v_subtotal, v_product_ids
+    FROM jsonb_to_recordset(p_items) AS i(product_id UUID, quantity INTEGER)
+    JOIN products p ON p.id = i.product_id;
+
+    IF v_item_count = 0 THEN
+        RAISE EXCEPTION 'NO_ITEMS';
+    END IF;
+
+    SELECT p.name INTO v_unavailable_product
+    FROM jsonb_to_recordset(p_items) AS i(product_id UUID, quantity INTEGER)
+    JOIN products p ON p.id = i.product_id
+    WHERE p.is_available IS NOT TRUE
+    LIMIT 1;
+
+    IF v_unavailable_product IS NOT NULL THEN
+        RAISE EXCEPTION 'PRODUCT_UNAVAILABLE' USING DETAIL = v_unavailable_product;
+    END IF;
+
+    SELECT p.name INTO v_short_product
+    FROM jsonb_to_recordset(p_items) AS i(product_id UUID, quantity INTEGER)
+    JOIN products p ON p.id = i.product_id
+    WHERE p.stock_quantity < i.quantity
+    LIMIT 1;
+
+    IF v_short_product IS NOT NULL THEN
+        RAISE EXCEPTION 'INSUFFICIENT_STOCK' USING DETAIL = v_short_product;
+    END IF;
+
+    v_discount := ROUND(v_subtotal * p_discount_rate, 2);
+    v_total := v_subtotal + p_delivery_fee - v_discount;
+
+    INSERT INTO orders (
+        id, consumer_id, delivery_type, delivery_address_id,
+        status, subtotal, delivery_fee, promo_code, discount, total
+    )
+    VALUES (
+        v_order_id, p_user_id, p_delivery_type, p_delivery_address_id,
+        'Pending', v_subtotal, p_delivery_fee, p_promo_code, v_discount, v_total
+    )
+    RETURNING order_number INTO v_order_number;
+
+    INSERT INTO order_items (order_id, product_id, farmer_id, quantity, price_at_purchase, subtotal)
+    SELECT v_order_id, p.id, p.farmer_id, i.quantity, p.price, p.price * i.quantity
+    FROM jsonb_to_recordset(p_items) AS i(product_id UUID, quantity INTEGER)
+    JOIN products p ON p.id = i.product_id;
+
+    PERFORM decrement_stock(i.product_id, i.quantity)
+    FROM jsonb_to_recordset(p_items) AS i(product_id UUID, quantity INTEGER);
+
+    RETURN json_build_object(
+        'order_id', v_order_id,
+        'order_number', v_order_number,
+        'total', v_total,
+        'product_ids', v_product_ids
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================
+-- FUNCTION: Checkout Cart
+-- Takes the cart's items and places them as one order in a single
+-- transaction; any failure leaves the cart untouched.
+-- ============================================
+CREATE OR REPLACE FUNCTION checkout_cart(
+    p_user_id UUID,
+    p_delivery_type VARCHAR,
+    p_delivery_address_id UUID DEFAULT NULL,
+    p_delivery_fee NUMERIC DEFAULT 0,
+    p_promo_code VARCHAR DEFAULT NULL,
+    p_discount_rate NUMERIC DEFAULT 0
+)
+RETURNS JSON AS $$
+DECLARE
+    v_items JSONB;
+BEGIN
+    -- Deleting with RETURNING orders exactly the lines it removes, even if
+    -- the cart is being changed concurrently
+    WITH taken AS (
+        DELETE FROM cart_items
+        WHERE cart_id = (SELECT id FROM carts WHERE user_id = p_user_id)
+        RETURNING product_id, quantity
+    )
+    SELECT jsonb_agg(jsonb_build_object('product_id', product_id, 'quantity', quantity))
+    INTO v_items
+    FROM taken;
+
+    IF v_items IS NULL THEN
+        RAISE EXCEPTION 'CART_EMPTY';
+    END IF;
+
+    RETURN place_order(
+        p_user_id, v_items, p_delivery_type, p_delivery_address_id,
+        p_delivery_fee, p_promo_code, p_discount_rate
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================
+-- FUNCTION: Due Subscriptions
+-- Ids of up to p_limit Active subscriptions due at p_now, oldest first,
+-- leaving out any that another worker is fulfilling right now.
+-- ============================================
+CREATE OR REPLACE FUNCTION due_subscriptions(
+    p_now TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    p_limit INTEGER DEFAULT 50
+)
+RETURNS JSON AS $$
+    SELECT COALESCE(json_agg(id ORDER BY next_delivery_date), '[]'::JSON)
+    FROM (
+        SELECT id, next_delivery_date
+        FROM subscriptions
+        WHERE status = 'Active'
+            AND next_delivery_date <= p_now
+        ORDER BY next_delivery_date
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    ) due;
+$$ LANGUAGE sql;
+
+-- ============================================
+-- FUNCTION: Fulfill Subscription
+-- Places the order for one subscription due at p_now and advances its
+-- next delivery past p_now, in its own transaction so no lock outlives a
+-- single order. Returns status 'skipped' when another worker holds the
+-- subscription or has already fulfilled it. A delivery that cannot be
+-- placed (e.g. out of stock or a discontinued product) is reported as
+-- 'failed' and still advanced, so it cannot block later runs.
+-- ============================================
+CREATE OR REPLACE FUNCTION fulfill_subscription(
+    p_subscription_id UUID,
+    p_now TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    p_delivery_fee NUMERIC DEFAULT 0
+)
+RETURNS JSON AS $$
+DECLARE
+    v_subscription subscriptions;
+    v_items JSONB;
+    v_address_id UUID;
+    v_result JSONB;
+    v_step INTERVAL;
+    v_next TIMESTAMP WITH TIME ZONE;
+    v_error TEXT;
+    v_detail TEXT;
+BEGIN
+    -- Rechecked under the lock, so a subscription fulfilled since it was
+    -- listed is no longer due
+    SELECT * INTO v_subscription
+    FROM subscriptions
+    WHERE id = p_subscription_id
+        AND status = 'Active'
+        AND next_delivery_date <= p_now
+    FOR UPDATE SKIP LOCKED;
+
+    IF NOT FOUND THEN
+        RETURN json_build_object('subscription_id', p_subscription_id, 'status', 'skipped');
+    END IF;
+
+    SELECT jsonb_agg(jsonb_build_object('product_id', product_id, 'quantity', quantity))
+    INTO v_items
+    FROM subscription_items
+    WHERE subscription_id = v_subscription.id;
+
+    SELECT id INTO v_address_id
+    FROM addresses
+    WHERE user_id = v_subscription.user_id
+    ORDER BY is_default DESC, created_at
+    LIMIT 1;
+
+    BEGIN
+        v_result := jsonb_build_object(
+            'subscription_id', v_subscription.id,
+            'status', 'placed',
+            'order', place_order(
+                v_subscription.user_id,
+                COALESCE(v_items, '[]'::JSONB),
+                CASE WHEN v_address_id IS NULL THEN 'Pickup' ELSE 'Delivery' END,
+                v_address_id,
+                CASE WHEN v_address_id IS NULL THEN 0 ELSE p_delivery_fee END
+            )
+        );
+    EXCEPTION WHEN OTHERS THEN
+        GET STACKED DIAGNOSTICS v_error = MESSAGE_TEXT, v_detail = PG_EXCEPTION_DETAIL;
+        v_result := jsonb_build_object(
+            'subscription_id', v_subscription.id,
+            'status', 'failed',
+            'reason', v_error,
+            'detail', NULLIF(v_detail, '')
+        );
+    END;
+
+    -- Step from the scheduled date (not p_now) so deliveries keep their
+    -- weekday; periods missed while the scheduler was down are skipped
+    v_step := CASE v_subscription.frequency WHEN 'Weekly' THEN INTERVAL '7 days' ELSE INTERVAL '30 days' END;
+    v_next := v_subscription.next_delivery_date + v_step;
+    WHILE v_next <= p_now LOOP
+        v_next := v_next + v_step;
+    END LOOP;
+
+    UPDATE subscriptions
+    SET next_delivery_date = v_next, updated_at = NOW()
+    WHERE id = v_subscription.id;
+
+    RETURN v_result;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Only the service role may place orders on behalf of users
+REVOKE EXECUTE ON FUNCTION place_order(UUID, JSONB, VARCHAR, UUID, NUMERIC, VARCHAR, NUMERIC) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION checkout_cart(UUID, VARCHAR, UUID, NUMERIC, VARCHAR, NUMERIC) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION due_subscriptions(TIMESTAMP WITH TIME ZONE, INTEGER) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION fulfill_subscription(UUID, TIMESTAMP WITH TIME ZONE, NUMERIC) FROM PUBLIC, anon, authenticated;
+
+-- ============================================
+-- FUNCTION: Search Products
+-- Full-text match on search_vector plus trigram similarity on name for
+-- typos. Returns one page of products and the total match count.
+-- ============================================
+CREATE OR REPLACE FUNCTION search_products(
+    p_query TEXT,
+    p_category VARCHAR DEFAULT NULL,
+    p_farmer_id UUID DEFAULT NULL,
+    p_sort VARCHAR DEFAULT 'relevance',
+    p_limit INTEGER DEFAULT 20,
+    p_offset INTEGER DEFAULT 0
+)
+RETURNS JSON AS $$
+    WITH matches AS (
+        SELECT
+            p.*,
+            ts_rank_cd(p.search_vector, websearch_to_tsquery('english', p_query))
+                + similarity(p.name, p_query) AS relevance
+        FROM products p
+        WHERE p.is_available = true
+            AND (
+                p.search_vector @@ websearch_to_tsquery('english', p_query)
+                OR p.name % p_query
+            )
+            AND (p_category IS NULL OR p.category = p_category)
+            AND (p_farmer_id IS NULL OR p.farmer_id = p_farmer_id)
+    ),
+    page AS (
+        SELECT *
+        FROM (
+            SELECT
+                matches.*,
+                ROW_NUMBER() OVER (
+                    ORDER BY
+                        CASE WHEN p_sort = 'relevance' THEN relevance END DESC,
+                        CASE WHEN p_sort = 'price_asc' THEN price END ASC,
+                        CASE WHEN p_sort = 'price_desc' THEN price END DESC,
+                        CASE WHEN p_sort = 'rating' THEN rating END DESC,
+                        created_at DESC,
+                        id
+                ) AS position
+            FROM matches
+        ) ranked
+        WHERE position > p_offset
+        ORDER BY position
+        LIMIT p_limit
+    )
+    SELECT json_build_object(
+        'items', COALESCE((
+            SELECT json_agg(
+                (to_jsonb(page) - 'search_vector' - 'position')
+                || jsonb_build_object('users', jsonb_build_object('full_name', u.full_name, 'farm_name', u.farm_name))
+                ORDER BY page.position
+            )
+            FROM page
+            JOIN users u ON u.id = page.farmer_id
+        ), '[]'::json),
+        'total', (SELECT COUNT(*) FROM matches)
+    );
+$$ LANGUAGE sql STABLE;
+
+-- ============================================
+-- FUNCTION: Platform Stats History
+-- Totals at the end of each of the last p_days days, rebuilt from the
+-- current counters and the daily deltas kept by the stats triggers.
+-- ============================================
+CREATE OR REPLACE FUNCTION platform_stats_history(p_days INTEGER DEFAULT 30)
+RETURNS JSON AS $$
+    WITH days AS (
+        SELECT generate_series(CURRENT_DATE - (p_days - 1), CURRENT_DATE, INTERVAL '1 day')::date AS day
+    ),
+    daily AS (
+        SELECT metric, day, SUM(delta) AS delta
+        FROM platform_stats_daily
+        WHERE day > CURRENT_DATE - p_days
+        GROUP BY metric, day
+    ),
+    points AS (
+        SELECT
+            d.day,
+            s.metric,
+            s.value - COALESCE((
+                SELECT SUM(later.delta)
+                FROM daily later
+                WHERE later.metric = s.metric AND later.day > d.day
+            ), 0) AS total,
+            COALESCE(today.delta, 0) AS change
+        FROM days d
+        CROSS JOIN platform_stats_totals s
+        LEFT JOIN daily today ON today.metric = s.metric AND today.day = d.day
+    )
+    SELECT COALESCE(json_agg(
+        json_build_object('day', day, 'totals', totals, 'changes', changes)
+        ORDER BY day
+    ), '[]'::json)
+    FROM (
+        SELECT day, json_object_agg(metric, total) AS totals, json_object_agg(metric, change) AS changes
+        FROM points
+        GROUP BY day
+    ) per_day;
+$$ LANGUAGE sql STABLE;
+
+-- ============================================
+-- CART FUNCTIONS
+-- Each cart call resolves (or creates) the user's cart, applies its change
+-- and returns the result in one round trip: the full cart, or with
+-- p_full_cart = false only the touched item and the new totals.
+-- ============================================
+CREATE OR REPLACE FUNCTION cart_id_for(p_user_id UUID)
+RETURNS UUID AS $$
+DECLARE
+    v_cart_id UUID;
+BEGIN
+    SELECT id INTO v_cart_id FROM carts WHERE user_id = p_user_id;
+
+    IF v_cart_id IS NULL THEN
+        -- DO NOTHING rather than a no-op update: updating user_id locks the
+        -- row against the key-share locks concurrent cart_items inserts take
+        -- for their foreign key, which deadlocks parallel adds
+        INSERT INTO carts (user_id)
+        VALUES (p_user_id)
+        ON CONFLICT (user_id) DO NOTHING
+        RETURNING id INTO v_cart_id;
+
+        -- Lost the race: the conflicting insert has committed by now
+        IF v_cart_id IS NULL THEN
+            SELECT id INTO v_cart_id FROM carts WHERE user_id = p_user_id;
+        END IF;
+    END IF;
+
+    RETURN v_cart_id;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION cart_items_json(p_cart_id UUID, p_item_id UUID DEFAULT NULL)
+RETURNS JSON AS $$
+    SELECT COALESCE(json_agg(
+        json_build_object(
+            'id', ci.id,
+            'product_id', p.id,
+            'product_name', p.name,
+            'price', p.price,
+            'unit', p.unit,
+            'image_url', p.image_url,
+            'farmer', COALESCE(NULLIF(u.farm_name, ''), u.full_name),
+            'quantity', ci.quantity,
+            'subtotal', p.price * ci.quantity
+        )
+        ORDER BY ci.added_at, ci.id
+    ), '[]'::json)
+    FROM cart_items ci
+    JOIN products p ON p.id = ci.product_id
+    JOIN users u ON u.id = p.farmer_id
+    WHERE ci.cart_id = p_cart_id
+        AND (p_item_id IS NULL OR ci.id = p_item_id);
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION cart_result(p_cart_id UUID, p_user_id UUID, p_item_id UUID, p_full_cart BOOLEAN)
+RETURNS JSON AS $$
+    SELECT CASE
+        WHEN p_full_cart THEN json_build_object(
+            'id', p_cart_id,
+            'user_id', p_user_id,
+            'items', cart_items_json(p_cart_id),
+            'total', totals.total,
+            'item_count', totals.item_count
+        )
+        -- item is null when p_item_id was removed
+        ELSE json_build_object(
+            'id', p_cart_id,
+            'user_id', p_user_id,
+            'item_id', p_item_id,
+            'item', CASE WHEN p_item_id IS NOT NULL THEN cart_items_json(p_cart_id, p_item_id)->0 END,
+            'total', totals.total,
+            'item_count', totals.item_count
+        )
+    END
+    FROM (
+        SELECT COALESCE(SUM(p.price * ci.quantity), 0) AS total, COUNT(*) AS item_count
+        FROM cart_items ci
+        JOIN products p ON p.id = ci.product_id
+        WHERE ci.cart_id = p_cart_id
+    ) totals;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION get_cart(p_user_id UUID)
+RETURNS JSON AS $$
+BEGIN
+    RETURN cart_result(cart_id_for(p_user_id), p_user_id, NULL, true);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION cart_add_item(
+    p_user_id UUID,
+    p_product_id UUID,
+    p_quantity INTEGER,
+    p_full_cart BOOLEAN DEFAULT true
+)
+RETURNS JSON AS $$
+DECLARE
+    v_cart_id UUID := cart_id_for(p_user_id);
+    v_item_id UUID;
+    v_available BOOLEAN;
+    v_stock INTEGER;
+BEGIN
+    -- Insert or increment in one statement. ON CONFLICT locks the existing
+    -- row, so concurrent adds queue up instead of losing increments, and
+    -- both branches only write while stock covers the resulting quantity.
+    INSERT INTO cart_items (cart_id, product_id, quantity)
+    SELECT v_cart_id, p.id, p_quantity
+    FROM products p
+    WHERE p.id = p_product_id
+        AND p.is_available
+        AND p.stock_quantity >= p_quantity
+    ON CONFLICT (cart_id, product_id) DO UPDATE
+    SET quantity = cart_items.quantity + EXCLUDED.quantity
+    WHERE (SELECT stock_quantity FROM products WHERE id = EXCLUDED.product_id) >= cart_items.quantity + EXCLUDED.quantity
+    RETURNING id INTO v_item_id;
+
+    IF v_item_id IS NULL THEN
+        -- Nothing written; report why
+        SELECT is_available, stock_quantity INTO v_available, v_stock
+        FROM products
+        WHERE id = p_product_id;
+
+        IF NOT FOUND THEN
+            RAISE EXCEPTION 'PRODUCT_NOT_FOUND';
+        END IF;
+
+        IF NOT v_available THEN
+            RAISE EXCEPTION 'PRODUCT_UNAVAILABLE';
+        END IF;
+
+        RAISE EXCEPTION 'INSUFFICIENT_STOCK' USING DETAIL = v_stock;
+    END IF;
+
+    RETURN cart_result(v_cart_id, p_user_id, v_item_id, p_full_cart);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION cart_update_item(
+    p_user_id UUID,
+    p_item_id UUID,
+    p_quantity INTEGER,
+    p_full_cart BOOLEAN DEFAULT true
+)
+RETURNS JSON AS $$
+DECLARE
+    v_cart_id UUID := cart_id_for(p_user_id);
+    v_stock INTEGER;
+BEGIN
+    SELECT p.stock_quantity INTO v_stock
+    FROM cart_items ci
+    JOIN products p ON p.id = ci.product_id
+    WHERE ci.id = p_item_id AND ci.cart_id = v_cart_id;
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'ITEM_NOT_FOUND';
+    END IF;
+
+    IF v_stock < p_quantity THEN
+        RAISE EXCEPTION 'INSUFFICIENT_STOCK' USING DETAIL = v_stock;
+    END IF;
+
+    UPDATE cart_items SET quantity = p_quantity WHERE id = p_item_id;
+
+    RETURN cart_result(v_cart_id, p_user_id, p_item_id, p_full_cart);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION cart_remove_item(
+    p_user_id UUID,
+    p_item_id UUID,
+    p_full_cart BOOLEAN DEFAULT true
+)
+RETURNS JSON AS $$
+DECLARE
+    v_cart_id UUID := cart_id_for(p_user_id);
+BEGIN
+    DELETE FROM cart_items WHERE id = p_item_id AND cart_id = v_cart_id;
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'ITEM_NOT_FOUND';
+    END IF;
+
+    RETURN cart_result(v_cart_id, p_user_id, p_item_id, p_full_cart);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION cart_clear(p_user_id UUID, p_full_cart BOOLEAN DEFAULT true)
+RETURNS JSON AS $$
+DECLARE
+    v_cart_id UUID := cart_id_for(p_user_id);
+BEGIN
+    DELETE FROM cart_items WHERE cart_id = v_cart_id;
+
+    RETURN cart_result(v_cart_id, p_user_id, NULL, p_full_cart);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Add or set many lines at once. Every requested line gets a status
+-- (ok, duplicate, not_found, unavailable, insufficient_stock); the valid
+-- ones are written in a single upsert.
+CREATE OR REPLACE FUNCTION cart_batch_upsert(
+    p_user_id UUID,
+    p_items JSONB,
+    p_full_cart BOOLEAN DEFAULT true
+)
+RETURNS JSON AS $$
+DECLARE
+    v_cart_id UUID := cart_id_for(p_user_id);
+    v_results JSON;
+BEGIN
+    WITH parsed AS (
+        -- Ids are read as text so one malformed id is reported as not_found
+        -- instead of failing the whole batch with a cast error
+        SELECT
+            r.position,
+            r.product_id,
+            CASE WHEN r.product_id ~* '^[0-9a-f]{8}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{12}$'
+                THEN r.product_id::UUID END AS product_uuid,
+            r.quantity,
+            COALESCE(r.mode, 'add') AS mode
+        FROM ROWS FROM (jsonb_to_recordset(p_items) AS (product_id TEXT, quantity INTEGER, mode TEXT))
+            WITH ORDINALITY AS r(product_id, quantity, mode, position)
+    ),
+    requested AS (
+        SELECT
+            parsed.*,
+            ROW_NUMBER() OVER (PARTITION BY product_uuid ORDER BY position) AS occurrence
+        FROM parsed
+    ),
+    checked AS (
+        SELECT
+            rq.*,
+            p.stock_quantity,
+            CASE
+                WHEN rq.product_uuid IS NULL THEN 'not_found'
+                WHEN rq.occurrence > 1 THEN 'duplicate'
+                WHEN p.id IS NULL THEN 'not_found'
+                WHEN NOT p.is_available THEN 'unavailable'
+                WHEN p.stock_quantity < CASE WHEN rq.mode = 'set' THEN rq.quantity ELSE COALESCE(ci.quantity, 0) + rq.quantity END
+                    THEN 'insufficient_stock'
+                ELSE 'ok'
+            END AS status
+        FROM requested rq
+        LEFT JOIN products p ON p.id = rq.product_uuid
+        LEFT JOIN cart_items ci ON ci.cart_id = v_cart_id AND ci.product_id = rq.product_uuid
+    ),
+    accepted AS (
+        SELECT product_uuid AS product_id, quantity, mode FROM checked WHERE status = 'ok'
+    ),
+    written AS (
+        INSERT INTO cart_items (cart_id, product_id, quantity)
+        SELECT v_cart_id, product_id, quantity FROM accepted
+        ON CONFLICT (cart_id, product_id) DO UPDATE
+        SET quantity = CASE
+            WHEN (SELECT mode FROM accepted a WHERE a.product_id = EXCLUDED.product_id) = 'set' THEN EXCLUDED.quantity
+            ELSE cart_items.quantity + EXCLUDED.quantity
+        END
+        -- Re-check against current rows in case the cart or stock moved since the snapshot above
+        WHERE (SELECT stock_quantity FROM products WHERE id = EXCLUDED.product_id) >= CASE
+            WHEN (SELECT mode FROM accepted a WHERE a.product_id = EXCLUDED.product_id) = 'set' THEN EXCLUDED.quantity
+            ELSE cart_items.quantity + EXCLUDED.quantity
+        END
+        RETURNING id, product_id, quantity
+    )
+    SELECT json_agg(
+        json_build_object(
+            'product_id', c.product_id,
+            'status', CASE WHEN c.status = 'ok' AND w.id IS NULL THEN 'insufficient_stock' ELSE c.status END,
+            'item_id', w.id,
+            'quantity', w.quantity,
+            'available', c.stock_quantity
+        )
+        ORDER BY c.position
+    )
+    INTO v_results
+    FROM checked c
+    LEFT JOIN written w ON w.product_id = c.product_uuid AND c.occurrence = 1;
+
+    RETURN json_build_object(
+        'results', COALESCE(v_results, '[]'::json),
+        'cart', cart_result(v_cart_id, p_user_id, NULL, p_full_cart)
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- Only the service role may act on a user's cart
+REVOKE EXECUTE ON FUNCTION get_cart(UUID) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION cart_add_item(UUID, UUID, INTEGER, BOOLEAN) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION cart_update_item(UUID, UUID, INTEGER, BOOLEAN) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION cart_remove_item(UUID, UUID, BOOLEAN) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION cart_clear(UUID, BOOLEAN) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION cart_batch_upsert(UUID, JSONB, BOOLEAN) FROM PUBLIC, anon, authenticated;
+
+-- ============================================
+-- FUNCTION: Create Bulk Order
+-- Inserts the request and all of its items in one transaction.
+-- p_items is a JSON array of {product_name, quantity, unit, frequency}.
+-- ============================================
+CREATE OR REPLACE FUNCTION create_bulk_order(
+    p_user_id UUID,
+    p_business_name VARCHAR,
+    p_business_type VARCHAR,
+    p_business_location VARCHAR,
+    p_budget_min NUMERIC,
+    p_budget_max NUMERIC,
+    p_items JSONB
+)
+RETURNS JSON AS $$
+DECLARE
+    v_order bulk_orders;
+BEGIN
+    INSERT INTO bulk_orders (consumer_id, business_name, business_type, business_location, budget_min, budget_max, status)
+    VALUES (p_user_id, p_business_name, p_business_type, p_business_location, p_budget_min, p_budget_max, 'Pending')
+    RETURNING * INTO v_order;
+
+    INSERT INTO bulk_order_items (bulk_order_id, product_name, quantity, unit, frequency)
+    SELECT v_order.id, i.product_name, i.quantity, i.unit, i.frequency
+    FROM jsonb_to_recordset(p_items) AS i(product_name VARCHAR, quantity NUMERIC, unit VARCHAR, frequency VARCHAR);
+
+    RETURN row_to_json(v_order);
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================
+-- FUNCTION: Create Subscription
+-- Prices every item with one products lookup, then inserts the
+-- subscription and its items in one transaction. Repeated products are
+-- merged into one line.
+-- ============================================
+CREATE OR REPLACE FUNCTION create_subscription(
+    p_user_id UUID,
+    p_frequency VARCHAR,
+    p_next_delivery_date TIMESTAMP WITH TIME ZONE,
+    p_items JSONB
+)
+RETURNS JSON AS $$
+DECLARE
+    v_subscription subscriptions;
+    v_missing UUID;
+BEGIN
+    SELECT i.product_id INTO v_missing
+    FROM jsonb_to_recordset(p_items) AS i(product_id UUID, quantity INTEGER)
+    LEFT JOIN products p ON p.id = i.product_id
+    WHERE p.id IS NULL
+    LIMIT 1;
+
+    IF v_missing IS NOT NULL THEN
+        RAISE EXCEPTION 'PRODUCT_NOT_FOUND' USING DETAIL = v_missing;
+    END IF;
+
+    INSERT INTO subscriptions (user_id, frequency, status, next_delivery_date, total_amount)
+    SELECT p_user_id, p_frequency, 'Active', p_next_delivery_date, COALESCE(SUM(p.price * i.quantity), 0)
+    FROM jsonb_to_recordset(p_items) AS i(product_id UUID, quantity INTEGER)
+    JOIN products p ON p.id = i.product_id
+    RETURNING * INTO v_subscription;
+
+    INSERT INTO subscription_items (subscription_id, product_id, quantity)
+    SELECT v_subscription.id, i.product_id, SUM(i.quantity)
+    FROM jsonb_to_recordset(p_items) AS i(product_id UUID, quantity INTEGER)
+    GROUP BY i.product_id;
+
+    RETURN row_to_json(v_subscription);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Only the service role may create these on behalf of a user
+REVOKE EXECUTE ON FUNCTION create_bulk_order(UUID, VARCHAR, VARCHAR, VARCHAR, NUMERIC, NUMERIC, JSONB) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION create_subscription(UUID, VARCHAR, TIMESTAMP WITH TIME ZONE, JSONB) FROM PUBLIC, anon, authenticated;
+
+-- ============================================
+-- FUNCTION: Dispatch Outbox Events
+-- Claims up to p_limit undispatched events (skipping those another
+-- worker holds), writes every recipient's notification in one insert
+-- and marks the events dispatched. Notifications are unique per
+-- (event_id, user_id), so an event that is dispatched again creates
+-- nothing new. Returns the notifications created, for pushing to
+-- connected clients.
+-- ============================================
+CREATE OR REPLACE FUNCTION dispatch_outbox_events(p_limit INTEGER DEFAULT 100)
+RETURNS JSON AS $$
+DECLARE
+    v_event_ids BIGINT[];
+    v_notifications JSON;
+BEGIN
+    SELECT array_agg(id) INTO v_event_ids
+    FROM (
+        SELECT id
+        FROM event_outbox
+        WHERE dispatched_at IS NULL
+        ORDER BY id
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    ) claimed;
+
+    IF v_event_ids IS NULL THEN
+        RETURN json_build_object('claimed', 0, 'notifications', '[]'::JSON);
+    END IF;
+
+    WITH events AS (
+        SELECT * FROM event_outbox WHERE id = ANY(v_event_ids)
+    ),
+    recipients AS (
+        -- New order: each farmer whose products it includes, and the consumer
+        SELECT DISTINCT e.id AS event_id, e.event_type, oi.farmer_id AS user_id,
+            'New order'::TEXT AS title,
+            'Order ' || (e.payload->>'order_number') || ' includes your products' AS message
+        FROM events e
+        JOIN order_items oi ON oi.order_id = e.aggregate_id
+        WHERE e.event_type = 'order.created'
+        UNION ALL
+        SELECT e.id, e.event_type, o.consumer_id,
+            'Order placed',
+            'Order ' || (e.payload->>'order_number') || ' has been placed'
+        FROM events e
+        JOIN orders o ON o.id = e.aggregate_id
+        WHERE e.event_type = 'order.created'
+        -- Status change: the consumer
+        UNION ALL
+        SELECT e.id, e.event_type, o.consumer_id,
+            'Order updated',
+            'Order ' || (e.payload->>'order_number') || ' is now ' || (e.payload->>'status')
+        FROM events e
+        JOIN orders o ON o.id = e.aggregate_id
+        WHERE e.event_type = 'order.status_changed'
+        -- Cancellation: the consumer and each farmer involved
+        UNION ALL
+        SELECT DISTINCT e.id, e.event_type, recipient.user_id,
+            'Order cancelled',
+            'Order ' || (e.payload->>'order_number') || ' was cancelled'
+        FROM events e
+        JOIN orders o ON o.id = e.aggregate_id
+        CROSS JOIN LATERAL (
+            SELECT o.consumer_id AS user_id
+            UNION
+            SELECT oi.farmer_id FROM order_items oi WHERE oi.order_id = o.id
+        ) recipient
+        WHERE e.event_type = 'order.cancelled'
+        -- New bulk order request: every farmer
+        UNION ALL
+        SELECT e.id, e.event_type, u.id,
+            'New bulk order request',
+            (e.payload->>'business_name') || ' is looking for produce'
+        FROM events e
+        JOIN users u ON u.role = 'farmer'
+        WHERE e.event_type = 'bulk_order.created'
+        -- Quote on a bulk order: the consumer who requested it
+        UNION ALL
+        SELECT e.id, e.event_type, b.consumer_id,
+            'New quote on your bulk order',
+            COALESCE(f.farm_name, f.full_name, 'A farmer') || ' quoted $' || (e.payload->>'quoted_price')
+        FROM events e
+        JOIN bulk_orders b ON b.id = e.aggregate_id
+        LEFT JOIN users f ON f.id = (e.payload->>'farmer_id')::UUID
+        WHERE e.event_type = 'bulk_order.responded'
+    ),
+    inserted AS (
+        INSERT INTO notifications (user_id, type, title, message, event_id)
+        SELECT user_id, event_type, title, message, event_id FROM recipients
+        ON CONFLICT (event_id, user_id) DO NOTHING
+        RETURNING *
+    )
+    SELECT COALESCE(json_agg(inserted ORDER BY inserted.event_id), '[]'::JSON)
+    INTO v_notifications
+    FROM inserted;
+
+    UPDATE event_outbox SET dispatched_at = NOW() WHERE id = ANY(v_event_ids);
+
+    RETURN json_build_object(
+        'claimed', array_length(v_event_ids, 1),
+        'notifications', v_notifications
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- Only the service role dispatches events
+REVOKE EXECUTE ON FUNCTION dispatch_outbox_events(INTEGER) FROM PUBLIC, anon, authenticated;
+
 -- ============================================
 -- SAMPLE DATA (Optional - for testing)
 -- ============================================
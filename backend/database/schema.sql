@@ -1,9 +1,13 @@
 -- AgriConnect Database Schema
 -- PostgreSQL/Supabase
+-- Safe to re-run: run it again (then functions.sql) to upgrade an existing database
 
 -- Enable UUID extension
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 
+-- Enable trigram matching for typo-tolerant product search
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- ============================================
 -- USERS TABLE
 -- ============================================
@@ -25,8 +29,8 @@ CREATE TABLE IF NOT EXISTS users (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
-CREATE INDEX idx_users_email ON users(email);
-CREATE INDEX idx_users_role ON users(role);
+CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
+CREATE INDEX IF NOT EXISTS idx_users_role ON users(role);
 
 -- ============================================
 -- PRODUCTS TABLE
@@ -41,19 +45,38 @@ CREATE TABLE IF NOT EXISTS products (
     description TEXT,
     location VARCHAR(255),
     image_url TEXT,
+    image_variants JSONB,  -- {"thumb": url, "card": url, "full": url} from the upload endpoint
     stock_quantity INTEGER DEFAULT 0 CHECK (stock_quantity >= 0),
     is_available BOOLEAN DEFAULT TRUE,
     harvest_date DATE,
     rating DECIMAL(3, 2) DEFAULT 0.0 CHECK (rating >= 0 AND rating <= 5),
     
+    -- Full-text search document (name weighted above description)
+    search_vector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', COALESCE(name, '')), 'A') ||
+        setweight(to_tsvector('english', COALESCE(description, '')), 'B')
+    ) STORED,
+    
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
-CREATE INDEX idx_products_farmer ON products(farmer_id);
-CREATE INDEX idx_products_category ON products(category);
-CREATE INDEX idx_products_available ON products(is_available);
-CREATE INDEX idx_products_name ON products(name);
+-- Tables created before full-text search; the generated column is computed
+-- for existing rows when added, and its GIN index replaces the name btree
+ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector TSVECTOR GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', COALESCE(name, '')), 'A') ||
+    setweight(to_tsvector('english', COALESCE(description, '')), 'B')
+) STORED;
+DROP INDEX IF EXISTS idx_products_name;
+
+-- Tables created before image variants
+ALTER TABLE products ADD COLUMN IF NOT EXISTS image_variants JSONB;
+
+CREATE INDEX IF NOT EXISTS idx_products_farmer ON products(farmer_id);
+CREATE INDEX IF NOT EXISTS idx_products_category ON products(category);
+CREATE INDEX IF NOT EXISTS idx_products_available ON products(is_available);
+CREATE INDEX IF NOT EXISTS idx_products_search ON products USING GIN(search_vector);
+CREATE INDEX IF NOT EXISTS idx_products_name_trgm ON products USING GIN(name gin_trgm_ops);
 
 -- ============================================
 -- CARTS TABLE
@@ -66,7 +89,7 @@ CREATE TABLE IF NOT EXISTS carts (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
-CREATE INDEX idx_carts_user ON carts(user_id);
+CREATE INDEX IF NOT EXISTS idx_carts_user ON carts(user_id);
 
 -- ============================================
 -- CART ITEMS TABLE
@@ -82,8 +105,8 @@ CREATE TABLE IF NOT EXISTS cart_items (
     UNIQUE(cart_id, product_id)
 );
 
-CREATE INDEX idx_cart_items_cart ON cart_items(cart_id);
-CREATE INDEX idx_cart_items_product ON cart_items(product_id);
+CREATE INDEX IF NOT EXISTS idx_cart_items_cart ON cart_items(cart_id);
+CREATE INDEX IF NOT EXISTS idx_cart_items_product ON cart_items(product_id);
 
 -- ============================================
 -- ADDRESSES TABLE
@@ -102,14 +125,30 @@ CREATE TABLE IF NOT EXISTS addresses (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
-CREATE INDEX idx_addresses_user ON addresses(user_id);
+CREATE INDEX IF NOT EXISTS idx_addresses_user ON addresses(user_id);
+
+-- ============================================
+-- ORDER NUMBERS
+-- A sequence hands out unique, increasing numbers across all workers
+-- without locking. Numbers are zero-padded to 10 digits, so they sort the
+-- same as strings and as numbers, and cannot collide with the legacy
+-- random AC-1000..AC-9999 range.
+-- ============================================
+CREATE SEQUENCE IF NOT EXISTS order_number_seq START WITH 100000;
+-- Never hand out a number wider than the padding
+ALTER SEQUENCE order_number_seq MAXVALUE 9999999999;
+
+CREATE OR REPLACE FUNCTION next_order_number()
+RETURNS VARCHAR AS $$
+    SELECT 'AC-' || lpad(nextval('order_number_seq')::TEXT, 10, '0');
+$$ LANGUAGE sql;
 
 -- ============================================
 -- ORDERS TABLE
 -- ============================================
 CREATE TABLE IF NOT EXISTS orders (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
-    order_number VARCHAR(50) UNIQUE NOT NULL,
+    order_number VARCHAR(50) UNIQUE NOT NULL DEFAULT next_order_number(),
     consumer_id UUID NOT NULL REFERENCES users(id) ON DELETE RESTRICT,
     delivery_type VARCHAR(20) NOT NULL CHECK (delivery_type IN ('Delivery', 'Pickup')),
     delivery_address_id UUID REFERENCES addresses(id) ON DELETE SET NULL,
@@ -127,10 +166,14 @@ CREATE TABLE IF NOT EXISTS orders (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
-CREATE INDEX idx_orders_consumer ON orders(consumer_id);
-CREATE INDEX idx_orders_status ON orders(status);
-CREATE INDEX idx_orders_number ON orders(order_number);
-CREATE INDEX idx_orders_created ON orders(created_at DESC);
+-- Tables created before order numbers came from the sequence have no default
+ALTER TABLE orders ALTER COLUMN order_number SET DEFAULT next_order_number();
+
+CREATE INDEX IF NOT EXISTS idx_orders_consumer ON orders(consumer_id);
+CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(status);
+-- order_number lookups use the UNIQUE constraint's index; drop the old duplicate
+DROP INDEX IF EXISTS idx_orders_number;
+CREATE INDEX IF NOT EXISTS idx_orders_created ON orders(created_at DESC);
 
 -- ============================================
 -- ORDER ITEMS TABLE
@@ -145,9 +188,9 @@ CREATE TABLE IF NOT EXISTS order_items (
     subtotal DECIMAL(10, 2) NOT NULL
 );
 
-CREATE INDEX idx_order_items_order ON order_items(order_id);
-CREATE INDEX idx_order_items_product ON order_items(product_id);
-CREATE INDEX idx_order_items_farmer ON order_items(farmer_id);
+CREATE INDEX IF NOT EXISTS idx_order_items_order ON order_items(order_id);
+CREATE INDEX IF NOT EXISTS idx_order_items_product ON order_items(product_id);
+CREATE INDEX IF NOT EXISTS idx_order_items_farmer ON order_items(farmer_id);
 
 -- ============================================
 -- SUBSCRIPTIONS TABLE
@@ -164,9 +207,9 @@ CREATE TABLE IF NOT EXISTS subscriptions (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
-CREATE INDEX idx_subscriptions_user ON subscriptions(user_id);
-CREATE INDEX idx_subscriptions_status ON subscriptions(status);
-CREATE INDEX idx_subscriptions_next_delivery ON subscriptions(next_delivery_date);
+CREATE INDEX IF NOT EXISTS idx_subscriptions_user ON subscriptions(user_id);
+CREATE INDEX IF NOT EXISTS idx_subscriptions_status ON subscriptions(status);
+CREATE INDEX IF NOT EXISTS idx_subscriptions_next_delivery ON subscriptions(next_delivery_date);
 
 -- ============================================
 -- SUBSCRIPTION ITEMS TABLE
@@ -180,8 +223,8 @@ CREATE TABLE IF NOT EXISTS subscription_items (
     UNIQUE(subscription_id, product_id)
 );
 
-CREATE INDEX idx_subscription_items_subscription ON subscription_items(subscription_id);
-CREATE INDEX idx_subscription_items_product ON subscription_items(product_id);
+CREATE INDEX IF NOT EXISTS idx_subscription_items_subscription ON subscription_items(subscription_id);
+CREATE INDEX IF NOT EXISTS idx_subscription_items_product ON subscription_items(product_id);
 
 -- ============================================
 -- BULK ORDERS TABLE
@@ -200,8 +243,8 @@ CREATE TABLE IF NOT EXISTS bulk_orders (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
-CREATE INDEX idx_bulk_orders_consumer ON bulk_orders(consumer_id);
-CREATE INDEX idx_bulk_orders_status ON bulk_orders(status);
+CREATE INDEX IF NOT EXISTS idx_bulk_orders_consumer ON bulk_orders(consumer_id);
+CREATE INDEX IF NOT EXISTS idx_bulk_orders_status ON bulk_orders(status);
 
 -- ============================================
 -- BULK ORDER ITEMS TABLE
@@ -215,7 +258,7 @@ CREATE TABLE IF NOT EXISTS bulk_order_items (
     frequency VARCHAR(20) NOT NULL CHECK (frequency IN ('Daily', 'Weekly', 'One-time'))
 );
 
-CREATE INDEX idx_bulk_order_items_bulk_order ON bulk_order_items(bulk_order_id);
+CREATE INDEX IF NOT EXISTS idx_bulk_order_items_bulk_order ON bulk_order_items(bulk_order_id);
 
 -- ============================================
 -- BULK ORDER RESPONSES TABLE
@@ -232,8 +275,8 @@ CREATE TABLE IF NOT EXISTS bulk_order_responses (
     UNIQUE(bulk_order_id, farmer_id)
 );
 
-CREATE INDEX idx_bulk_order_responses_bulk_order ON bulk_order_responses(bulk_order_id);
-CREATE INDEX idx_bulk_order_responses_farmer ON bulk_order_responses(farmer_id);
+CREATE INDEX IF NOT EXISTS idx_bulk_order_responses_bulk_order ON bulk_order_responses(bulk_order_id);
+CREATE INDEX IF NOT EXISTS idx_bulk_order_responses_farmer ON bulk_order_responses(farmer_id);
 
 -- ============================================
 -- REVIEWS TABLE
@@ -251,8 +294,8 @@ CREATE TABLE IF NOT EXISTS reviews (
     UNIQUE(product_id, user_id)
 );
 
-CREATE INDEX idx_reviews_product ON reviews(product_id);
-CREATE INDEX idx_reviews_user ON reviews(user_id);
+CREATE INDEX IF NOT EXISTS idx_reviews_product ON reviews(product_id);
+CREATE INDEX IF NOT EXISTS idx_reviews_user ON reviews(user_id);
 
 -- ============================================
 -- NOTIFICATIONS TABLE
@@ -264,13 +307,22 @@ CREATE TABLE IF NOT EXISTS notifications (
     title VARCHAR(255) NOT NULL,
     message TEXT NOT NULL,
     is_read BOOLEAN DEFAULT FALSE,
+    event_id BIGINT,  -- event_outbox row this was generated from, if any
+    
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+    -- One notification per event per recipient, so redelivered events are no-ops
+    UNIQUE(event_id, user_id)
 );
 
-CREATE INDEX idx_notifications_user ON notifications(user_id);
-CREATE INDEX idx_notifications_read ON notifications(is_read);
-CREATE INDEX idx_notifications_created ON notifications(created_at DESC);
+-- Tables created before the event outbox; the index name matches the UNIQUE
+-- constraint above, so fresh installs skip it
+ALTER TABLE notifications ADD COLUMN IF NOT EXISTS event_id BIGINT;
+CREATE UNIQUE INDEX IF NOT EXISTS notifications_event_id_user_id_key ON notifications(event_id, user_id);
+
+CREATE INDEX IF NOT EXISTS idx_notifications_user ON notifications(user_id);
+CREATE INDEX IF NOT EXISTS idx_notifications_read ON notifications(is_read);
+CREATE INDEX IF NOT EXISTS idx_notifications_created ON notifications(created_at DESC);
 
 -- ============================================
 -- TRIGGERS FOR UPDATED_AT
@@ -283,28 +335,28 @@ BEGIN
 END;
 $$ language 'plpgsql';
 
-CREATE TRIGGER update_users_updated_at BEFORE UPDATE ON users
+CREATE OR REPLACE TRIGGER update_users_updated_at BEFORE UPDATE ON users
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
-CREATE TRIGGER update_products_updated_at BEFORE UPDATE ON products
+CREATE OR REPLACE TRIGGER update_products_updated_at BEFORE UPDATE ON products
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
-CREATE TRIGGER update_carts_updated_at BEFORE UPDATE ON carts
+CREATE OR REPLACE TRIGGER update_carts_updated_at BEFORE UPDATE ON carts
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
-CREATE TRIGGER update_addresses_updated_at BEFORE UPDATE ON addresses
+CREATE OR REPLACE TRIGGER update_addresses_updated_at BEFORE UPDATE ON addresses
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
-CREATE TRIGGER update_orders_updated_at BEFORE UPDATE ON orders
+CREATE OR REPLACE TRIGGER update_orders_updated_at BEFORE UPDATE ON orders
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
-CREATE TRIGGER update_subscriptions_updated_at BEFORE UPDATE ON subscriptions
+CREATE OR REPLACE TRIGGER update_subscriptions_updated_at BEFORE UPDATE ON subscriptions
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
-CREATE TRIGGER update_bulk_orders_updated_at BEFORE UPDATE ON bulk_orders
+CREATE OR REPLACE TRIGGER update_bulk_orders_updated_at BEFORE UPDATE ON bulk_orders
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
-CREATE TRIGGER update_reviews_updated_at BEFORE UPDATE ON reviews
+CREATE OR REPLACE TRIGGER update_reviews_updated_at BEFORE UPDATE ON reviews
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
 -- ============================================
@@ -324,10 +376,218 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
-CREATE TRIGGER update_rating_on_review
+CREATE OR REPLACE TRIGGER update_rating_on_review
 AFTER INSERT OR UPDATE ON reviews
 FOR EACH ROW EXECUTE FUNCTION update_product_rating();
 
+-- ============================================
+-- PLATFORM STATS
+-- Running totals per metric, plus the net change per metric per day for
+-- charting growth. Both are maintained by triggers so the admin dashboard
+-- never counts the underlying tables. Each counter is split into shards
+-- that are summed on read (see platform_stats_totals), so concurrent
+-- writes such as checkouts do not queue on a single row lock.
+-- ============================================
+CREATE TABLE IF NOT EXISTS platform_stats (
+    metric VARCHAR(50) NOT NULL,
+    shard SMALLINT NOT NULL DEFAULT 0,
+    value BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (metric, shard)
+);
+
+CREATE TABLE IF NOT EXISTS platform_stats_daily (
+    metric VARCHAR(50) NOT NULL,
+    day DATE NOT NULL,
+    shard SMALLINT NOT NULL DEFAULT 0,
+    delta BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (metric, day, shard)
+);
+
+CREATE INDEX IF NOT EXISTS idx_platform_stats_daily_day ON platform_stats_daily(day);
+
+CREATE OR REPLACE VIEW platform_stats_totals WITH (security_invoker = true) AS
+SELECT metric, SUM(value)::BIGINT AS value, MAX(updated_at) AS updated_at
+FROM platform_stats
+GROUP BY metric;
+
+CREATE OR REPLACE FUNCTION bump_platform_stat(p_metric VARCHAR, p_delta BIGINT, p_day DATE DEFAULT CURRENT_DATE)
+RETURNS VOID AS $$
+DECLARE
+    -- Concurrent transactions run on different connections, so picking the
+    -- shard by backend keeps them on different rows. A transaction always
+    -- writes the same shard, so it cannot deadlock with itself.
+    v_shard SMALLINT := pg_backend_pid() % 16;
+BEGIN
+    INSERT INTO platform_stats (metric, shard, value, updated_at)
+    VALUES (p_metric, v_shard, p_delta, NOW())
+    ON CONFLICT (metric, shard) DO UPDATE
+    SET value = platform_stats.value + EXCLUDED.value, updated_at = NOW();
+
+    INSERT INTO platform_stats_daily (metric, day, shard, delta)
+    VALUES (p_metric, p_day, v_shard, p_delta)
+    ON CONFLICT (metric, day, shard) DO UPDATE
+    SET delta = platform_stats_daily.delta + EXCLUDED.delta;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Only the stats triggers write counters
+REVOKE EXECUTE ON FUNCTION bump_platform_stat(VARCHAR, BIGINT, DATE) FROM PUBLIC, anon, authenticated;
+
+CREATE OR REPLACE FUNCTION track_user_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM bump_platform_stat('users', 1);
+        PERFORM bump_platform_stat(NEW.role || 's', 1);
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM bump_platform_stat('users', -1);
+        PERFORM bump_platform_stat(OLD.role || 's', -1);
+    ELSIF NEW.role IS DISTINCT FROM OLD.role THEN
+        PERFORM bump_platform_stat(OLD.role || 's', -1);
+        PERFORM bump_platform_stat(NEW.role || 's', 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-level, so a bulk insert or a cascaded delete updates the
+-- counter once rather than once per row
+CREATE OR REPLACE FUNCTION track_statement_stats()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_rows BIGINT;
+BEGIN
+    -- TG_ARGV[0] names the metric, e.g. 'products'; changed_rows holds the
+    -- statement's inserted or deleted rows
+    SELECT COUNT(*) INTO v_rows FROM changed_rows;
+    IF v_rows > 0 THEN
+        PERFORM bump_platform_stat(TG_ARGV[0], CASE WHEN TG_OP = 'INSERT' THEN v_rows ELSE -v_rows END);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- The triggers go in together with a count of the rows that existed before
+-- them. Writes to the counted tables wait meanwhile, so every row is
+-- counted exactly once. Later runs find the triggers in place and only
+-- replace them.
+DO $$
+DECLARE
+    v_tracking BOOLEAN;
+BEGIN
+    LOCK TABLE users, products, orders IN SHARE ROW EXCLUSIVE MODE;
+    v_tracking := EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'track_users_stats');
+
+    CREATE OR REPLACE TRIGGER track_users_stats
+    AFTER INSERT OR DELETE OR UPDATE OF role ON users
+    FOR EACH ROW EXECUTE FUNCTION track_user_stats();
+
+    CREATE OR REPLACE TRIGGER track_products_inserts
+    AFTER INSERT ON products REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION track_statement_stats('products');
+
+    CREATE OR REPLACE TRIGGER track_products_deletes
+    AFTER DELETE ON products REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION track_statement_stats('products');
+
+    CREATE OR REPLACE TRIGGER track_orders_inserts
+    AFTER INSERT ON orders REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION track_statement_stats('orders');
+
+    CREATE OR REPLACE TRIGGER track_orders_deletes
+    AFTER DELETE ON orders REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION track_statement_stats('orders');
+
+    IF NOT v_tracking THEN
+        INSERT INTO platform_stats_daily (metric, day, delta)
+        SELECT metric, day, COUNT(*)
+        FROM (
+            SELECT 'users' AS metric, created_at::date AS day FROM users
+            UNION ALL SELECT role || 's', created_at::date FROM users
+            UNION ALL SELECT 'products', created_at::date FROM products
+            UNION ALL SELECT 'orders', created_at::date FROM orders
+        ) existing
+        GROUP BY metric, day
+        ON CONFLICT (metric, day, shard) DO UPDATE
+        SET delta = platform_stats_daily.delta + EXCLUDED.delta;
+
+        INSERT INTO platform_stats (metric, value)
+        SELECT metric, COUNT(*)
+        FROM (
+            SELECT 'users' AS metric FROM users
+            UNION ALL SELECT role || 's' FROM users
+            UNION ALL SELECT 'products' FROM products
+            UNION ALL SELECT 'orders' FROM orders
+        ) existing
+        GROUP BY metric
+        ON CONFLICT (metric, shard) DO UPDATE
+        SET value = platform_stats.value + EXCLUDED.value;
+    END IF;
+END $$;
+
+-- ============================================
+-- EVENT OUTBOX
+-- Order and bulk-order events recorded by triggers in the same
+-- transaction as the change. dispatch_outbox_events() turns them into
+-- notifications in the background, so writers never wait on fan-out.
+-- ============================================
+CREATE TABLE IF NOT EXISTS event_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    event_type VARCHAR(50) NOT NULL,  -- order.created, order.status_changed, order.cancelled, bulk_order.created, bulk_order.responded
+    aggregate_id UUID NOT NULL,  -- The order or bulk order the event is about
+    payload JSONB NOT NULL DEFAULT '{}'::JSONB,
+    
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    dispatched_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE INDEX IF NOT EXISTS idx_event_outbox_pending ON event_outbox(id) WHERE dispatched_at IS NULL;
+
+CREATE OR REPLACE FUNCTION record_order_event()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO event_outbox (event_type, aggregate_id, payload)
+        VALUES ('order.created', NEW.id, jsonb_build_object('order_number', NEW.order_number));
+    ELSIF NEW.status IS DISTINCT FROM OLD.status THEN
+        INSERT INTO event_outbox (event_type, aggregate_id, payload)
+        VALUES (
+            CASE WHEN NEW.status = 'Cancelled' THEN 'order.cancelled' ELSE 'order.status_changed' END,
+            NEW.id,
+            jsonb_build_object('order_number', NEW.order_number, 'status', NEW.status, 'previous_status', OLD.status)
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION record_bulk_order_event()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_TABLE_NAME = 'bulk_orders' THEN
+        INSERT INTO event_outbox (event_type, aggregate_id, payload)
+        VALUES ('bulk_order.created', NEW.id, jsonb_build_object('business_name', NEW.business_name));
+    ELSE
+        INSERT INTO event_outbox (event_type, aggregate_id, payload)
+        VALUES ('bulk_order.responded', NEW.bulk_order_id, jsonb_build_object('farmer_id', NEW.farmer_id, 'quoted_price', NEW.quoted_price));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER record_orders_events
+AFTER INSERT OR UPDATE OF status ON orders
+FOR EACH ROW EXECUTE FUNCTION record_order_event();
+
+CREATE OR REPLACE TRIGGER record_bulk_orders_events
+AFTER INSERT ON bulk_orders
+FOR EACH ROW EXECUTE FUNCTION record_bulk_order_event();
+
+CREATE OR REPLACE TRIGGER record_bulk_order_responses_events
+AFTER INSERT ON bulk_order_responses
+FOR EACH ROW EXECUTE FUNCTION record_bulk_order_event();
+
 -- ============================================
 -- ROW LEVEL SECURITY (RLS) POLICIES
 -- ============================================
@@ -347,53 +607,71 @@ ALTER TABLE bulk_order_items ENABLE ROW LEVEL SECURITY;
 ALTER TABLE bulk_order_responses ENABLE ROW LEVEL SECURITY;
 ALTER TABLE reviews ENABLE ROW LEVEL SECURITY;
 ALTER TABLE notifications ENABLE ROW LEVEL SECURITY;
+ALTER TABLE platform_stats ENABLE ROW LEVEL SECURITY;
+ALTER TABLE platform_stats_daily ENABLE ROW LEVEL SECURITY;
+ALTER TABLE event_outbox ENABLE ROW LEVEL SECURITY;
 
 -- Users: Can read own profile, admins can read all
+DROP POLICY IF EXISTS users_select_own ON users;
 CREATE POLICY users_select_own ON users
     FOR SELECT USING (auth.uid()::text = id::text OR (SELECT role FROM users WHERE id::text = auth.uid()::text) = 'admin');
 
+DROP POLICY IF EXISTS users_update_own ON users;
 CREATE POLICY users_update_own ON users
     FOR UPDATE USING (auth.uid()::text = id::text);
 
 -- Products: Anyone can read, farmers can CRUD their own
+DROP POLICY IF EXISTS products_select_all ON products;
 CREATE POLICY products_select_all ON products FOR SELECT USING (true);
 
+DROP POLICY IF EXISTS products_insert_farmer ON products;
 CREATE POLICY products_insert_farmer ON products
     FOR INSERT WITH CHECK ((SELECT role FROM users WHERE id::text = auth.uid()::text) = 'farmer' AND farmer_id::text = auth.uid()::text);
 
+DROP POLICY IF EXISTS products_update_farmer ON products;
 CREATE POLICY products_update_farmer ON products
     FOR UPDATE USING (farmer_id::text = auth.uid()::text);
 
+DROP POLICY IF EXISTS products_delete_farmer ON products;
 CREATE POLICY products_delete_farmer ON products
     FOR DELETE USING (farmer_id::text = auth.uid()::text);
 
 -- Carts: Users can only access their own
+DROP POLICY IF EXISTS carts_select_own ON carts;
 CREATE POLICY carts_select_own ON carts
     FOR SELECT USING (user_id::text = auth.uid()::text);
 
+DROP POLICY IF EXISTS carts_insert_own ON carts;
 CREATE POLICY carts_insert_own ON carts
     FOR INSERT WITH CHECK (user_id::text = auth.uid()::text);
 
+DROP POLICY IF EXISTS carts_update_own ON carts;
 CREATE POLICY carts_update_own ON carts
     FOR UPDATE USING (user_id::text = auth.uid()::text);
 
+DROP POLICY IF EXISTS carts_delete_own ON carts;
 CREATE POLICY carts_delete_own ON carts
     FOR DELETE USING (user_id::text = auth.uid()::text);
 
 -- Cart Items: Users can only access their own
+DROP POLICY IF EXISTS cart_items_select_own ON cart_items;
 CREATE POLICY cart_items_select_own ON cart_items
     FOR SELECT USING ((SELECT user_id FROM carts WHERE id = cart_id)::text = auth.uid()::text);
 
+DROP POLICY IF EXISTS cart_items_insert_own ON cart_items;
 CREATE POLICY cart_items_insert_own ON cart_items
     FOR INSERT WITH CHECK ((SELECT user_id FROM carts WHERE id = cart_id)::text = auth.uid()::text);
 
+DROP POLICY IF EXISTS cart_items_update_own ON cart_items;
 CREATE POLICY cart_items_update_own ON cart_items
     FOR UPDATE USING ((SELECT user_id FROM carts WHERE id = cart_id)::text = auth.uid()::text);
 
+DROP POLICY IF EXISTS cart_items_delete_own ON cart_items;
 CREATE POLICY cart_items_delete_own ON cart_items
     FOR DELETE USING ((SELECT user_id FROM carts WHERE id = cart_id)::text = auth.uid()::text);
 
 -- Orders: Consumers see their purchases, farmers see their sales, admins see all
+DROP POLICY IF EXISTS orders_select ON orders;
 CREATE POLICY orders_select ON orders
     FOR SELECT USING (
         consumer_id::text = auth.uid()::text OR
@@ -401,9 +679,11 @@ CREATE POLICY orders_select ON orders
         (SELECT role FROM users WHERE id::text = auth.uid()::text) = 'admin'
     );
 
+DROP POLICY IF EXISTS orders_insert_consumer ON orders;
 CREATE POLICY orders_insert_consumer ON orders
     FOR INSERT WITH CHECK (consumer_id::text = auth.uid()::text);
 
+DROP POLICY IF EXISTS orders_update ON orders;
 CREATE POLICY orders_update ON orders
     FOR UPDATE USING (
         consumer_id::text = auth.uid()::text OR
@@ -411,23 +691,30 @@ CREATE POLICY orders_update ON orders
     );
 
 -- Reviews: Anyone can read, users can create for products they purchased
+DROP POLICY IF EXISTS reviews_select_all ON reviews;
 CREATE POLICY reviews_select_all ON reviews FOR SELECT USING (true);
 
+DROP POLICY IF EXISTS reviews_insert_own ON reviews;
 CREATE POLICY reviews_insert_own ON reviews
     FOR INSERT WITH CHECK (user_id::text = auth.uid()::text);
 
+DROP POLICY IF EXISTS reviews_update_own ON reviews;
 CREATE POLICY reviews_update_own ON reviews
     FOR UPDATE USING (user_id::text = auth.uid()::text);
 
+DROP POLICY IF EXISTS reviews_delete_own ON reviews;
 CREATE POLICY reviews_delete_own ON reviews
     FOR DELETE USING (user_id::text = auth.uid()::text);
 
 -- Notifications: Users can only see their own
+DROP POLICY IF EXISTS notifications_select_own ON notifications;
 CREATE POLICY notifications_select_own ON notifications
     FOR SELECT USING (user_id::text = auth.uid()::text);
 
+DROP POLICY IF EXISTS notifications_update_own ON notifications;
 CREATE POLICY notifications_update_own ON notifications
     FOR UPDATE USING (user_id::text = auth.uid()::text);
 
+DROP POLICY IF EXISTS notifications_delete_own ON notifications;
 CREATE POLICY notifications_delete_own ON notifications
     FOR DELETE USING (user_id::text = auth.uid()::text);
@@ -1,22 +1,74 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from app.core.config import settings
+from app.schemas.common import create_response
+from app.core.jwt_keys import key_ring
+from app.core.scheduler import subscription_scheduler
+from app.core.pubsub import notification_broker
+from app.core.outbox import outbox_dispatcher
 from app.api.v1.api import api_router
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop per-worker background jobs."""
+    if settings.SUBSCRIPTION_SCHEDULER_ENABLED:
+        subscription_scheduler.start()
+    if settings.OUTBOX_DISPATCHER_ENABLED:
+        outbox_dispatcher.start()
+    yield
+    await subscription_scheduler.stop()
+    await outbox_dispatcher.stop()
+    await notification_broker.close()
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
     description="AgriConnect API - Connecting farmers and consumers",
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
-# Configure CORS
+# Room for multipart boundaries and part headers around the file itself
+UPLOAD_OVERHEAD_BYTES = 64 * 1024
+
+class UploadSizeLimitMiddleware:
+    """Refuse uploads whose declared length is too large before the body is read.
+
+    Plain ASGI rather than @app.middleware("http"), which would wrap every
+    response, including long-lived notification streams, in extra tasks.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith(f"{settings.API_V1_STR}/upload"):
+            length = Request(scope).headers.get("content-length", "")
+            if length.isdigit() and int(length) > settings.MAX_FILE_SIZE + UPLOAD_OVERHEAD_BYTES:
+                response = JSONResponse(
+                    status_code=413,
+                    content=create_response(
+                        success=False,
+                        message="Invalid image file",
+                        errors={"file": f"File must be under {settings.MAX_FILE_SIZE // (1024 * 1024)}MB"}
+                    )
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+app.add_middleware(UploadSizeLimitMiddleware)
+
+# Configure CORS (added last so it also wraps the responses above)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified"],
 )
 
 # Include API router
@@ -30,6 +82,12 @@ async def root():
         "docs": f"{settings.API_V1_STR}/docs"
     }
 
+@app.get("/.well-known/jwks.json")
+async def jwks(response: Response):
+    """Public keys for verifying access tokens without calling this API."""
+    response.headers["Cache-Control"] = "public, max-age=300"
+    return key_ring.jwks() if key_ring else {"keys": []}
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
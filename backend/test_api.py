@@ -125,6 +125,16 @@ def test_cart_operations(token, product_id):
     
     return response.status_code == 200
 
+def test_oversized_upload(token):
+    """Test that an oversized upload is refused with the standard error body"""
+    print("\n🔍 Testing Oversized Upload...")
+    headers = {"Authorization": f"Bearer {token}"}
+    files = {"file": ("large.jpg", b"\xff\xd8\xff" + b"\0" * (6 * 1024 * 1024), "image/jpeg")}
+    response = requests.post(f"{API_URL}/upload/product-image", files=files, headers=headers)
+    print_response(response, "POST /upload/product-image (6MB)")
+    body = response.json()
+    return response.status_code == 413 and body.get("success") is False and bool(body.get("message"))
+
 def run_all_tests():
     """Run all tests"""
     print("\n" + "="*60)
@@ -164,7 +174,13 @@ def run_all_tests():
     if test_get_products():
         print("\n✅ Get products passed!")
     
-    # Test 6: Register Consumer
+    # Test 6: Oversized Upload
+    if test_oversized_upload(farmer_token):
+        print("\n✅ Oversized upload rejection passed!")
+    else:
+        print("\n❌ Oversized upload was not rejected with the standard error body!")
+    
+    # Test 7: Register Consumer
     consumer_token = test_register_consumer()
     if consumer_token:
         print("\n✅ Consumer registration passed!")
@@ -176,7 +192,7 @@ def run_all_tests():
         print("\n❌ Could not get consumer token!")
         return
     
-    # Test 7: Cart Operations
+    # Test 8: Cart Operations
     if product_id and test_cart_operations(consumer_token, product_id):
         print("\n✅ Cart operations passed!")
     
@@ -0,0 +1,240 @@
+"""
+Tests for Google ID-token verification
+Serves signing certs from a local fake key endpoint and verifies tokens
+signed with a self-signed key, so no request reaches Google.
+
+    python test_google_tokens.py
+
+Run from backend/ so the app settings load from .env
+"""
+
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from google.auth import crypt, jwt as google_jwt
+from app.core import google_tokens
+from app.core.google_tokens import GoogleTokenVerifier
+
+CLIENT_ID = "test-client.apps.googleusercontent.com"
+
+def self_signed_key():
+    """RSA private key and its self-signed certificate in PEM, as Google publishes them"""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "test.example.com")])
+    now = datetime.now(timezone.utc)
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name).issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - timedelta(days=1)).not_valid_after(now + timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    private_pem = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+    return private_pem, certificate.public_bytes(serialization.Encoding.PEM).decode()
+
+class FakeKeyEndpoint:
+    """Serves certs by key id with a Cache-Control header and counts fetches"""
+
+    def __init__(self, max_age: int = 3600):
+        self.certs = {}
+        self.max_age = max_age
+        self.fetches = 0
+        endpoint = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                endpoint.fetches += 1
+                body = json.dumps(endpoint.certs).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Cache-Control", f"public, max-age={endpoint.max_age}, must-revalidate, no-transform")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        host, port = self._server.server_address
+        self.url = f"http://{host}:{port}/oauth2/v1/certs"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+class Signer:
+    """A signing key registered with the fake endpoint under its kid"""
+
+    def __init__(self, endpoint: FakeKeyEndpoint, kid: str, publish: bool = True):
+        private_pem, certificate_pem = self_signed_key()
+        self._signer = crypt.RSASigner.from_string(private_pem, key_id=kid)
+        if publish:
+            endpoint.certs[kid] = certificate_pem
+
+    def token(self, **overrides) -> str:
+        now = int(time.time())
+        claims = {
+            "iss": "https://accounts.google.com",
+            "aud": CLIENT_ID,
+            "sub": "1234567890",
+            "email": "farmer@example.com",
+            "name": "Test Farmer",
+            "iat": now,
+            "exp": now + 3600,
+            **overrides
+        }
+        return google_jwt.encode(self._signer, claims).decode()
+
+def test_valid_token():
+    """A token signed by a published key verifies"""
+    print("\n🔍 Testing a valid token...")
+    with FakeKeyEndpoint() as endpoint:
+        signer = Signer(endpoint, "key-1")
+        verifier = GoogleTokenVerifier(CLIENT_ID, endpoint.url)
+        claims = verifier.verify(signer.token())
+
+    print(f"   claims: {claims and {key: claims[key] for key in ('sub', 'email')}}")
+    assert claims is not None, "valid token was rejected"
+    assert claims["email"] == "farmer@example.com"
+    assert claims["aud"] == CLIENT_ID
+
+def test_invalid_tokens():
+    """Wrong audience, issuer, expiry or signature are rejected"""
+    print("\n🔍 Testing invalid tokens...")
+    with FakeKeyEndpoint() as endpoint:
+        signer = Signer(endpoint, "key-1")
+        # Same kid as the published key, different private key
+        impostor = Signer(endpoint, "key-1", publish=False)
+        verifier = GoogleTokenVerifier(CLIENT_ID, endpoint.url)
+        now = int(time.time())
+        cases = {
+            "wrong audience": signer.token(aud="someone-else.apps.googleusercontent.com"),
+            "wrong issuer": signer.token(iss="https://evil.example.com"),
+            "expired": signer.token(iat=now - 7200, exp=now - 3600),
+            "forged signature": impostor.token(),
+            "not a JWT": "not-a-token",
+        }
+        results = {case: verifier.verify(token) for case, token in cases.items()}
+
+    for case, claims in results.items():
+        print(f"   {case}: {'rejected' if claims is None else 'ACCEPTED'}")
+        assert claims is None, f"{case} token was accepted"
+
+def test_certs_cached():
+    """Certs are fetched once while fresh and tokens are memoized"""
+    print("\n🔍 Testing cert and token caching...")
+    with FakeKeyEndpoint(max_age=3600) as endpoint:
+        signer = Signer(endpoint, "key-1")
+        verifier = GoogleTokenVerifier(CLIENT_ID, endpoint.url)
+        tokens = [signer.token(sub=str(n)) for n in range(5)]
+        for token in tokens + tokens:
+            assert verifier.verify(token) is not None
+        fetches = endpoint.fetches
+        memoized = verifier._tokens.hits
+
+    print(f"   10 verifications of 5 tokens, {fetches} cert fetch(es), {memoized} answered from the token cache")
+    assert fetches == 1, f"expected one cert fetch, got {fetches}"
+    assert memoized == 5, f"expected the repeat verifications to be memoized, got {memoized}"
+
+def test_certs_expire():
+    """Certs are refetched once their Cache-Control lifetime runs out"""
+    print("\n🔍 Testing cert expiry...")
+    with FakeKeyEndpoint(max_age=0) as endpoint:
+        signer = Signer(endpoint, "key-1")
+        verifier = GoogleTokenVerifier(CLIENT_ID, endpoint.url)
+        for n in range(3):
+            assert verifier.verify(signer.token(sub=str(n))) is not None
+        fetches = endpoint.fetches
+
+    print(f"   3 tokens with max-age=0, {fetches} cert fetch(es)")
+    assert fetches == 3, f"expected a fetch per token, got {fetches}"
+
+def test_key_rotation():
+    """A token with a new key id refetches certs, but not more often than the refresh interval"""
+    print("\n🔍 Testing key rotation...")
+    interval = google_tokens.MIN_KID_REFRESH_INTERVAL
+    try:
+        with FakeKeyEndpoint() as endpoint:
+            Signer(endpoint, "key-1")
+            verifier = GoogleTokenVerifier(CLIENT_ID, endpoint.url)
+            verifier.get_certs()
+
+            # Google publishes a new key before signing with it
+            google_tokens.MIN_KID_REFRESH_INTERVAL = 3600
+            rotated = Signer(endpoint, "key-2")
+            too_soon = verifier.verify(rotated.token())
+            fetches_too_soon = endpoint.fetches
+
+            google_tokens.MIN_KID_REFRESH_INTERVAL = 0
+            after_interval = verifier.verify(rotated.token())
+            fetches = endpoint.fetches
+    finally:
+        google_tokens.MIN_KID_REFRESH_INTERVAL = interval
+
+    print(f"   within the interval: {'rejected' if too_soon is None else 'accepted'}, {fetches_too_soon} fetch(es)")
+    print(f"   after the interval: {'rejected' if after_interval is None else 'accepted'}, {fetches} fetch(es)")
+    assert too_soon is None and fetches_too_soon == 1, "unknown key id refetched certs inside the interval"
+    assert after_interval is not None and fetches == 2, "rotated key was not picked up"
+
+def test_verify_async():
+    """verify_async returns the same claims without blocking the event loop"""
+    print("\n🔍 Testing async verification...")
+    with FakeKeyEndpoint() as endpoint:
+        signer = Signer(endpoint, "key-1")
+        verifier = GoogleTokenVerifier(CLIENT_ID, endpoint.url)
+
+        async def verify_many():
+            return await asyncio.gather(*(verifier.verify_async(signer.token(sub=str(n))) for n in range(4)))
+
+        results = asyncio.run(verify_many())
+
+    assert all(claims is not None for claims in results)
+    assert sorted(claims["sub"] for claims in results) == ["0", "1", "2", "3"]
+
+TESTS = [
+    test_valid_token,
+    test_invalid_tokens,
+    test_certs_cached,
+    test_certs_expire,
+    test_key_rotation,
+    test_verify_async,
+]
+
+def run_all_tests():
+    """Run all tests"""
+    print("\n" + "="*60)
+    print("🚀 Starting AgriConnect Google Token Tests")
+    print("="*60)
+
+    failed = 0
+    for test in TESTS:
+        try:
+            test()
+            print(f"\n✅ {test.__doc__} passed!")
+        except AssertionError as e:
+            failed += 1
+            print(f"\n❌ {test.__doc__} failed: {str(e)}")
+
+    print("\n" + "="*60)
+    print(f"🎉 {len(TESTS) - failed}/{len(TESTS)} tests passed")
+    print("="*60)
+    return failed == 0
+
+if __name__ == "__main__":
+    if not run_all_tests():
+        raise SystemExit(1)
@@ -0,0 +1,94 @@
+"""
+Tests for asymmetric access tokens
+Signs tokens with a generated RS256 key ring and checks that verification
+accepts them and rejects unknown or malformed key ids.
+
+    python test_jwt_keys.py
+
+Run from backend/ so the app settings load from .env
+"""
+
+import os
+import tempfile
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+# The key ring is loaded when the app is imported, so the key and settings come first
+KEY = rsa.generate_private_key(public_exponent=65537, key_size=2048).private_bytes(
+    serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+)
+with tempfile.NamedTemporaryFile(suffix=".pem", delete=False) as key_file:
+    key_file.write(KEY)
+os.environ["ALGORITHM"] = "RS256"
+os.environ["JWT_KEYS"] = f"key-1={key_file.name}"
+
+from jose import jwt
+from app.core.security import create_access_token, decode_token
+
+USER_ID = "00000000-0000-0000-0000-000000000001"
+
+def signed(kid) -> str:
+    """A token signed by the active key, with kid set to anything"""
+    return jwt.encode({"sub": USER_ID, "type": "access"}, KEY.decode(), algorithm="RS256", headers={"kid": kid})
+
+def test_round_trip():
+    """A token from create_access_token verifies"""
+    print("\n🔍 Testing a signed token...")
+    payload = decode_token(create_access_token({"sub": USER_ID}))
+
+    print(f"   sub: {payload and payload.get('sub')}")
+    assert payload is not None, "valid token was rejected"
+    assert payload["sub"] == USER_ID
+
+def test_bad_key_ids():
+    """Unknown, missing and non-string key ids are rejected"""
+    print("\n🔍 Testing bad key ids...")
+    cases = {
+        "unknown kid": signed("key-2"),
+        "no kid": jwt.encode({"sub": USER_ID}, KEY.decode(), algorithm="RS256"),
+        "list kid": signed(["key-1"]),
+        "object kid": signed({"id": "key-1"}),
+        "number kid": signed(1),
+    }
+    results = {}
+    for case, token in cases.items():
+        try:
+            results[case] = "rejected" if decode_token(token) is None else "ACCEPTED"
+        except Exception as e:
+            results[case] = f"raised {type(e).__name__}"
+
+    for case, result in results.items():
+        print(f"   {case}: {result}")
+        assert result == "rejected", f"{case} token was {result}"
+
+TESTS = [
+    test_round_trip,
+    test_bad_key_ids,
+]
+
+def run_all_tests():
+    """Run all tests"""
+    print("\n" + "="*60)
+    print("🚀 Starting AgriConnect JWT Key Tests")
+    print("="*60)
+
+    failed = 0
+    for test in TESTS:
+        try:
+            test()
+            print(f"\n✅ {test.__doc__} passed!")
+        except AssertionError as e:
+            failed += 1
+            print(f"\n❌ {test.__doc__} failed: {str(e)}")
+
+    print("\n" + "="*60)
+    print(f"🎉 {len(TESTS) - failed}/{len(TESTS)} tests passed")
+    print("="*60)
+    return failed == 0
+
+if __name__ == "__main__":
+    try:
+        if not run_all_tests():
+            raise SystemExit(1)
+    finally:
+        os.unlink(key_file.name)
@@ -55,7 +55,7 @@ export default function App() {
     const loadProducts = async () => {
       try {
         console.log('Loading products...');
-        const response = await productService.getAllProducts();
+        const response = await productService.getAllProducts({ imageSize: 'card' });
         console.log('Products API response:', response);
         
         if (response.success && response.data) {
@@ -1,6 +1,7 @@
 import React, { useState } from 'react';
-import { View } from '@/types/types';
+import { View, ImageVariants } from '@/types/types';
 import { productService } from '@/services/productService';
+import { uploadService } from '@/services/userService';
 
 interface AddProductProps {
   navigate: (view: View) => void;
@@ -9,6 +10,8 @@ interface AddProductProps {
 const AddProduct: React.FC<AddProductProps> = ({ navigate }) => {
   const [isLoading, setIsLoading] = useState(false);
   const [error, setError] = useState('');
+  const [isUploading, setIsUploading] = useState(false);
+  const [image, setImage] = useState<{ url: string; variants: ImageVariants } | null>(null);
   const [formData, setFormData] = useState({
     name: '',
     category: 'Vegetables',
@@ -30,6 +33,27 @@ const AddProduct: React.FC<AddProductProps> = ({ navigate }) => {
     setError('');
   };
 
+  const handleImageChange = async (e: React.ChangeEvent<HTMLInputElement>) => {
+    const file = e.target.files?.[0];
+    if (!file) return;
+    setIsUploading(true);
+    setError('');
+
+    try {
+      const response = await uploadService.uploadProductImage(file);
+      if (response.success) {
+        setImage({ url: response.data.url, variants: response.data.variants });
+      } else {
+        setError(response.errors?.file || response.message || 'Failed to upload image');
+      }
+    } catch (err: any) {
+      // Oversized files are refused with HTTP 413 and the usual error body
+      setError(err.response?.data?.errors?.file || err.response?.data?.message || 'Failed to upload image');
+    } finally {
+      setIsUploading(false);
+    }
+  };
+
   const handleSubmit = async () => {
     setIsLoading(true);
     setError('');
@@ -44,7 +68,9 @@ const AddProduct: React.FC<AddProductProps> = ({ navigate }) => {
         harvest_date: formData.harvest_date || undefined,
         description: formData.description || undefined,
         location: formData.location || undefined,
-        is_available: formData.is_available
+        is_available: formData.is_available,
+        image_url: image?.url,
+        image_variants: image?.variants
       });
       
       if (response.success) {
@@ -70,10 +96,25 @@ const AddProduct: React.FC<AddProductProps> = ({ navigate }) => {
 
        <main className="flex-1 p-4 pb-24">
            {/* Image Upload */}
-           <div className="w-full aspect-video rounded-2xl border-2 border-dashed border-border-light dark:border-border-dark bg-surface-light dark:bg-surface-dark flex flex-col items-center justify-center text-text-subtle mb-6 cursor-pointer hover:border-primary transition-colors">
-               <span className="material-symbols-outlined text-4xl mb-2">add_a_photo</span>
-               <span className="font-medium">Upload Product Photo</span>
-           </div>
+           <label className="w-full aspect-video rounded-2xl border-2 border-dashed border-border-light dark:border-border-dark bg-surface-light dark:bg-surface-dark flex flex-col items-center justify-center text-text-subtle mb-6 cursor-pointer hover:border-primary transition-colors overflow-hidden">
+               <input 
+                 type="file" 
+                 accept="image/jpeg,image/png,image/webp"
+                 onChange={handleImageChange}
+                 disabled={isUploading}
+                 className="sr-only" 
+               />
+               {isUploading ? (
+                 <span className="h-8 w-8 border-4 border-primary border-t-transparent rounded-full animate-spin"></span>
+               ) : image ? (
+                 <img src={image.variants.card || image.url} className="w-full h-full object-cover" alt="Product" />
+               ) : (
+                 <>
+                   <span className="material-symbols-outlined text-4xl mb-2">add_a_photo</span>
+                   <span className="font-medium">Upload Product Photo</span>
+                 </>
+               )}
+           </label>
 
            {error && (
              <div className="mb-4 p-4 rounded-xl bg-red-500/10 border border-red-500/20 text-red-600 dark:text-red-400 text-sm">
@@ -193,7 +234,7 @@ const AddProduct: React.FC<AddProductProps> = ({ navigate }) => {
        <footer className="p-4 bg-background-light dark:bg-background-dark border-t border-border-light dark:border-border-dark sticky bottom-0">
            <button 
              onClick={handleSubmit} 
-             disabled={isLoading || !formData.name || !formData.price || !formData.stock_quantity}
+             disabled={isLoading || isUploading || !formData.name || !formData.price || !formData.stock_quantity}
              className="w-full bg-primary text-white h-14 rounded-xl font-bold text-lg shadow-lg active:scale-[0.98] transition-transform disabled:opacity-50 disabled:cursor-not-allowed flex items-center justify-center gap-2"
            >
                {isLoading ? (
@@ -20,10 +20,14 @@ const FarmerProducts: React.FC<FarmerProductsProps> = ({ navigate }) => {
     try {
       const user = authService.getCurrentUserFromStorage();
       const response = await productService.getAllProducts({
-        farmerId: user?.id
+        farmerId: user?.id,
+        imageSize: 'thumb'
       });
       if (response.success) {
-        setProducts(response.data.items);
+        setProducts(response.data.items.map((item: any) => ({
+          ...item,
+          image: item.image_url || 'https://images.unsplash.com/photo-1464226184884-fa280b87c399?w=400'
+        })));
       }
     } catch (error) {
       console.error('Failed to load products:', error);
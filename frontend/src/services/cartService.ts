@@ -11,6 +11,13 @@ export const cartService = {
     return response.data;
   },
 
+  async addItemsToCart(items: { productId: string; quantity: number; mode?: 'add' | 'set' }[]) {
+    const response = await apiClient.post('/cart/items:batch', {
+      items: items.map(({ productId, quantity, mode = 'add' }) => ({ product_id: productId, quantity, mode })),
+    });
+    return response.data;
+  },
+
   async updateCartItem(productId: string, quantity: number) {
     const response = await apiClient.put(`/cart/items/${productId}`, { quantity });
     return response.data;
@@ -1,20 +1,32 @@
 import apiClient from './apiClient';
-import { Product } from '../types/types';
+import { Product, ImageSize, ImageVariants } from '../types/types';
+
+// Product fields sent on create/update, including the upload's image variants
+export type ProductInput = Partial<Product> & {
+  harvest_date?: string;
+  is_available?: boolean;
+  image_url?: string;
+  image_variants?: ImageVariants;
+};
 
 export const productService = {
   async getAllProducts(filters?: {
     category?: string;
     search?: string;
     farmerId?: string;
+    sortBy?: 'relevance' | 'recent' | 'price_asc' | 'price_desc' | 'rating';
     page?: number;
     perPage?: number;
+    imageSize?: ImageSize; // Defaults to the catalog card variant
   }) {
     const params = new URLSearchParams();
     if (filters?.category) params.append('category', filters.category);
     if (filters?.search) params.append('search', filters.search);
     if (filters?.farmerId) params.append('farmerId', filters.farmerId);
+    if (filters?.sortBy) params.append('sortBy', filters.sortBy);
     if (filters?.page) params.append('page', filters.page.toString());
     if (filters?.perPage) params.append('perPage', filters.perPage.toString());
+    params.append('imageSize', filters?.imageSize || 'card');
 
     const response = await apiClient.get(`/products?${params.toString()}`);
     return response.data;
@@ -25,12 +37,12 @@ export const productService = {
     return response.data;
   },
 
-  async createProduct(product: Partial<Product>) {
+  async createProduct(product: ProductInput) {
     const response = await apiClient.post('/products', product);
     return response.data;
   },
 
-  async updateProduct(id: string, product: Partial<Product>) {
+  async updateProduct(id: string, product: ProductInput) {
     const response = await apiClient.put(`/products/${id}`, product);
     return response.data;
   },
@@ -17,6 +17,11 @@ export type View =
   | 'farmer-products'
   | 'farmer-wallet';
 
+export type ImageSize = 'thumb' | 'card' | 'full';
+
+// Variant URLs returned by /upload/product-image
+export type ImageVariants = Partial<Record<ImageSize, string>>;
+
 export interface Product {
   id: string;
   name: string;